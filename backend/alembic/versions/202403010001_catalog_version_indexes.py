@@ -0,0 +1,19 @@
+"""Index catalog change timestamps"""
+
+from alembic import op
+
+
+revision = "202403010001"
+down_revision = "202402290001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_drugs_master_last_updated", "drugs_master", ["last_updated"], unique=False)
+    op.create_index("ix_drugs_local_kuwait_extracted_at", "drugs_local_kuwait", ["extracted_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_drugs_local_kuwait_extracted_at", table_name="drugs_local_kuwait")
+    op.drop_index("ix_drugs_master_last_updated", table_name="drugs_master")
@@ -0,0 +1,31 @@
+"""Add batch matcher candidates"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403020001"
+down_revision = "202403010001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "drug_match_candidates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("local_id", sa.Integer(), sa.ForeignKey("drugs_local_kuwait.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("master_id", sa.Integer(), sa.ForeignKey("drugs_master.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("confidence", sa.Numeric(4, 3), nullable=False),
+        sa.Column("method", sa.String(), nullable=False, server_default="batch_matcher"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_drug_match_candidates_id", "drug_match_candidates", ["id"], unique=False)
+    op.create_index("ix_drug_match_candidates_local_id", "drug_match_candidates", ["local_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_drug_match_candidates_local_id", table_name="drug_match_candidates")
+    op.drop_index("ix_drug_match_candidates_id", table_name="drug_match_candidates")
+    op.drop_table("drug_match_candidates")
@@ -0,0 +1,25 @@
+"""Partial index for the unmatched drugs queue"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403030001"
+down_revision = "202403020001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_drugs_local_kuwait_unmatched_name",
+        "drugs_local_kuwait",
+        ["trade_name_ar", "moh_code"],
+        unique=False,
+        postgresql_where=sa.text("matched_drug_id IS NULL"),
+        sqlite_where=sa.text("matched_drug_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_drugs_local_kuwait_unmatched_name", table_name="drugs_local_kuwait")
@@ -0,0 +1,73 @@
+"""Add local RxNorm release tables"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403040001"
+down_revision = "202403030001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rxnorm_releases",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("loaded_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("concept_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_rxnorm_releases_id", "rxnorm_releases", ["id"], unique=False)
+
+    op.create_table(
+        "rxnorm_concepts",
+        sa.Column("rxcui", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("synonym", sa.String(), nullable=True),
+        sa.Column("tty", sa.String(), nullable=False),
+        sa.Column("suppress", sa.String(), nullable=False, server_default="N"),
+    )
+
+    op.create_table(
+        "rxnorm_names",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rxcui", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("name_key", sa.String(), nullable=False),
+        sa.Column("tty", sa.String(), nullable=False),
+        sa.Column("suppress", sa.String(), nullable=False, server_default="N"),
+    )
+    op.create_index("ix_rxnorm_names_rxcui", "rxnorm_names", ["rxcui"], unique=False)
+    op.create_index("ix_rxnorm_names_name_key", "rxnorm_names", ["name_key"], unique=False)
+
+    op.create_table(
+        "rxnorm_attributes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rxcui", sa.String(), nullable=False),
+        sa.Column("atn", sa.String(), nullable=False),
+        sa.Column("atv", sa.String(), nullable=True),
+    )
+    op.create_index("ix_rxnorm_attributes_rxcui", "rxnorm_attributes", ["rxcui"], unique=False)
+
+    op.create_table(
+        "rxnorm_relations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rxcui1", sa.String(), nullable=False),
+        sa.Column("rela", sa.String(), nullable=True),
+        sa.Column("rxcui2", sa.String(), nullable=False),
+    )
+    op.create_index("ix_rxnorm_relations_rxcui1", "rxnorm_relations", ["rxcui1"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rxnorm_relations_rxcui1", table_name="rxnorm_relations")
+    op.drop_table("rxnorm_relations")
+    op.drop_index("ix_rxnorm_attributes_rxcui", table_name="rxnorm_attributes")
+    op.drop_table("rxnorm_attributes")
+    op.drop_index("ix_rxnorm_names_name_key", table_name="rxnorm_names")
+    op.drop_index("ix_rxnorm_names_rxcui", table_name="rxnorm_names")
+    op.drop_table("rxnorm_names")
+    op.drop_table("rxnorm_concepts")
+    op.drop_index("ix_rxnorm_releases_id", table_name="rxnorm_releases")
+    op.drop_table("rxnorm_releases")
@@ -0,0 +1,50 @@
+"""Add sync run and chunk progress tables"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403050001"
+down_revision = "202403040001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False, server_default="running"),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("cursor", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("started_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_sync_runs_id", "sync_runs", ["id"], unique=False)
+    op.create_index("ix_sync_runs_status", "sync_runs", ["status"], unique=False)
+
+    op.create_table(
+        "sync_chunks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("sync_runs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("first_local_id", sa.Integer(), nullable=False),
+        sa.Column("last_local_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("synced", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("run_id", "first_local_id", name="uq_sync_chunks_run_first_local"),
+    )
+    op.create_index("ix_sync_chunks_id", "sync_chunks", ["id"], unique=False)
+    op.create_index("ix_sync_chunks_run_id", "sync_chunks", ["run_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sync_chunks_run_id", table_name="sync_chunks")
+    op.drop_index("ix_sync_chunks_id", table_name="sync_chunks")
+    op.drop_table("sync_chunks")
+    op.drop_index("ix_sync_runs_status", table_name="sync_runs")
+    op.drop_index("ix_sync_runs_id", table_name="sync_runs")
+    op.drop_table("sync_runs")
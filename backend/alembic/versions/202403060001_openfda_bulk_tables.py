@@ -0,0 +1,61 @@
+"""Add local openFDA bulk download tables"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403060001"
+down_revision = "202403050001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "openfda_bulk_files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("last_updated", sa.String(), nullable=True),
+        sa.Column("record_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("loaded_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_openfda_bulk_files_id", "openfda_bulk_files", ["id"], unique=False)
+    op.create_index("ix_openfda_bulk_files_endpoint", "openfda_bulk_files", ["endpoint"], unique=False)
+
+    op.create_table(
+        "openfda_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("record_key", sa.String(), nullable=True),
+        sa.Column("sort_date", sa.String(), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_openfda_records_endpoint", "openfda_records", ["endpoint"], unique=False)
+
+    op.create_table(
+        "openfda_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "record_id",
+            sa.Integer(),
+            sa.ForeignKey("openfda_records.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+    )
+    op.create_index("ix_openfda_keys_record_id", "openfda_keys", ["record_id"], unique=False)
+    op.create_index("ix_openfda_keys_lookup", "openfda_keys", ["endpoint", "kind", "key"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_openfda_keys_lookup", table_name="openfda_keys")
+    op.drop_index("ix_openfda_keys_record_id", table_name="openfda_keys")
+    op.drop_table("openfda_keys")
+    op.drop_index("ix_openfda_records_endpoint", table_name="openfda_records")
+    op.drop_table("openfda_records")
+    op.drop_index("ix_openfda_bulk_files_endpoint", table_name="openfda_bulk_files")
+    op.drop_index("ix_openfda_bulk_files_id", table_name="openfda_bulk_files")
+    op.drop_table("openfda_bulk_files")
@@ -0,0 +1,46 @@
+"""Add local DailyMed SPL tables"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403070001"
+down_revision = "202403060001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dailymed_releases",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("documents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("loaded_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_dailymed_releases_id", "dailymed_releases", ["id"], unique=False)
+
+    op.create_table(
+        "dailymed_spls",
+        sa.Column("set_id", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("product_name", sa.String(), nullable=True),
+        sa.Column("name_key", sa.String(), nullable=True),
+        sa.Column("generic_name", sa.String(), nullable=True),
+        sa.Column("generic_key", sa.String(), nullable=True),
+        sa.Column("strength", sa.String(), nullable=True),
+        sa.Column("dosage_form", sa.String(), nullable=True),
+        sa.Column("effective_time", sa.String(), nullable=True),
+        sa.Column("sections", sa.Text(), nullable=False, server_default="{}"),
+    )
+    op.create_index("ix_dailymed_spls_name_key", "dailymed_spls", ["name_key"], unique=False)
+    op.create_index("ix_dailymed_spls_generic_key", "dailymed_spls", ["generic_key"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dailymed_spls_generic_key", table_name="dailymed_spls")
+    op.drop_index("ix_dailymed_spls_name_key", table_name="dailymed_spls")
+    op.drop_table("dailymed_spls")
+    op.drop_index("ix_dailymed_releases_id", table_name="dailymed_releases")
+    op.drop_table("dailymed_releases")
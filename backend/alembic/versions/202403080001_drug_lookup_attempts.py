@@ -0,0 +1,35 @@
+"""Add the external lookup attempt ledger"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403080001"
+down_revision = "202403070001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "drug_lookup_attempts",
+        sa.Column(
+            "local_id",
+            sa.Integer(),
+            sa.ForeignKey("drugs_local_kuwait.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("outcome", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_attempt_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_drug_lookup_attempts_next_attempt_at", "drug_lookup_attempts", ["next_attempt_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_drug_lookup_attempts_next_attempt_at", table_name="drug_lookup_attempts")
+    op.drop_table("drug_lookup_attempts")
@@ -0,0 +1,34 @@
+"""Move phone-login OTP challenges out of the provenance table"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403090001"
+down_revision = "202403080001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "otp_challenges",
+        sa.Column("request_id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=False),
+        sa.Column("code_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used_at", sa.DateTime(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_otp_challenges_user_id", "otp_challenges", ["user_id"], unique=False)
+    op.create_index("ix_otp_challenges_expires_at", "otp_challenges", ["expires_at"], unique=False)
+    # Old challenges lived for five minutes as provenance notes; nothing reads them any more
+    op.execute("DELETE FROM provenance WHERE entity_type = 'otp'")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_otp_challenges_expires_at", table_name="otp_challenges")
+    op.drop_index("ix_otp_challenges_user_id", table_name="otp_challenges")
+    op.drop_table("otp_challenges")
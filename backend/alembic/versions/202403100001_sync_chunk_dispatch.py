@@ -0,0 +1,18 @@
+"""Record when each sync chunk was last dispatched"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202403100001"
+down_revision = "202403090001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sync_chunks", sa.Column("dispatched_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("sync_chunks", "dispatched_at")
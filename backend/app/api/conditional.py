@@ -0,0 +1,54 @@
+"""Helpers for strong ETags, ``If-None-Match`` and byte ``Range`` handling on catalog endpoints."""
+
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+
+from app.services.catalog import CatalogVersion
+
+
+def catalog_etag(version: CatalogVersion, *parts: object) -> str:
+    """Build a strong ETag from the catalog version plus whatever selects the representation."""
+
+    raw = "|".join([version.token, *("" if part is None else str(part) for part in parts)])
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so a W/ prefix on the client's copy still matches
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive ``(start, end)`` of a single ``bytes=`` range, or ``None`` to send everything."""
+
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # unsupported units and multipart ranges fall back to the full body
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
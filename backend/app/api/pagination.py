@@ -0,0 +1,80 @@
+"""Keyset (cursor) pagination helpers for catalog listings ordered by ``(trade_name_ar, moh_code)``."""
+
+import base64
+import json
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.drug import DrugLocalKuwait
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CatalogKey = Tuple[Optional[str], str]
+Row = TypeVar("Row")
+
+
+def catalog_ordering() -> tuple:
+    # NULL names sort last on every dialect so the keyset predicate below stays valid
+    return (
+        DrugLocalKuwait.trade_name_ar.asc().nulls_last(),
+        DrugLocalKuwait.moh_code.asc(),
+    )
+
+
+def encode_cursor(trade_name_ar: Optional[str], moh_code: str) -> str:
+    raw = json.dumps([trade_name_ar, moh_code], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CatalogKey:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        trade_name_ar, moh_code = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from None
+    if not isinstance(moh_code, str) or not (trade_name_ar is None or isinstance(trade_name_ar, str)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return trade_name_ar, moh_code
+
+
+def keyset_phases(cursor: Optional[CatalogKey]) -> List[ColumnElement]:
+    """Return the predicates selecting rows after ``cursor``, one per phase, in catalog order.
+
+    Named rows come first through a row-value comparison, then the NULL-name tail by
+    ``moh_code``. Each phase is a single range over the ``(trade_name_ar, moh_code)`` index;
+    OR-ing them together would turn the cursor into a filter on deep pages.
+    """
+
+    named = DrugLocalKuwait.trade_name_ar.is_not(None)
+    unnamed = DrugLocalKuwait.trade_name_ar.is_(None)
+    if cursor is None:
+        return [named, unnamed]
+    trade_name_ar, moh_code = cursor
+    if trade_name_ar is None:
+        return [and_(unnamed, DrugLocalKuwait.moh_code > moh_code)]
+    return [tuple_(DrugLocalKuwait.trade_name_ar, DrugLocalKuwait.moh_code) > tuple_(trade_name_ar, moh_code), unnamed]
+
+
+def fetch_keyset_page(
+    fetch: Callable[[ColumnElement, int], Sequence[Row]], cursor: Optional[CatalogKey], limit: int
+) -> List[Row]:
+    """Collect up to ``limit + 1`` rows after ``cursor``; ``fetch(predicate, n)`` runs one phase."""
+
+    rows: List[Row] = []
+    for predicate in keyset_phases(cursor):
+        rows.extend(fetch(predicate, limit + 1 - len(rows)))
+        if len(rows) > limit:
+            break
+    return rows
+
+
+def iter_keyset(fetch: Callable[[ColumnElement], Iterator[Row]], cursor: Optional[CatalogKey]) -> Iterator[Row]:
+    """Yield every row after ``cursor``; ``fetch(predicate)`` streams one phase."""
+
+    for predicate in keyset_phases(cursor):
+        yield from fetch(predicate)
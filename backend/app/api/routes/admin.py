@@ -1,29 +1,102 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, joinedload
 
 from app.api import deps
+from app.api.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    catalog_ordering,
+    decode_cursor,
+    encode_cursor,
+    fetch_keyset_page,
+    keyset_phases,
+)
 from app.models.drug import DrugLocalKuwait, DrugMaster
 from app.models.user import User
 from app.schemas.drug import DrugImportRequest, DrugLocal
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_projection import MASTER_FIELDS, catalog_projection, encode_drug_rows
+from app.services.drug_masters import upsert_masters_by_rx_cui
+from app.services.drug_search import drug_search_index
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
+TOTAL_COUNT_HEADER = "X-Total-Count"
+REMAINING_COUNT_HEADER = "X-Remaining-Count"
+
+
+def _unmatched_filters(dosage_form: Optional[str], source_file: Optional[str]) -> list:
+    # matched_drug_id IS NULL must stay a literal predicate so the partial index applies
+    filters = [DrugLocalKuwait.matched_drug_id.is_(None)]
+    if dosage_form is not None:
+        filters.append(DrugLocalKuwait.dosage_form == dosage_form)
+    if source_file is not None:
+        filters.append(DrugLocalKuwait.source_file == source_file)
+    return filters
+
+
+def _count_unmatched(db: Session, filters: list) -> int:
+    return db.execute(select(func.count()).select_from(DrugLocalKuwait).where(*filters)).scalar_one()
+
+
 @router.get("/drugs/unmatched", response_model=List[DrugLocal])
 def list_unmatched_drugs(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    dosage_form: Optional[str] = Query(None),
+    source_file: Optional[str] = Query(None),
+    fast: bool = Query(False, description="Encode column tuples directly, skipping ORM and model validation"),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_superuser),
-) -> List[DrugLocal]:
+):
     del current_user
-    drugs = (
-        db.query(DrugLocalKuwait)
-        .filter(DrugLocalKuwait.matched_drug_id.is_(None))
-        .order_by(DrugLocalKuwait.trade_name_ar.asc(), DrugLocalKuwait.moh_code.asc())
-        .all()
+    after = decode_cursor(cursor) if cursor else None
+    filters = _unmatched_filters(dosage_form, source_file)
+
+    if fast:
+        connection = db.connection()
+        rows = fetch_keyset_page(
+            lambda predicate, n: connection.execute(
+                catalog_projection().where(*filters, predicate).order_by(*catalog_ordering()).limit(n)
+            ).all(),
+            after,
+            limit,
+        )
+    else:
+        rows = fetch_keyset_page(
+            lambda predicate, n: db.query(DrugLocalKuwait)
+            .filter(*filters, predicate)
+            .order_by(*catalog_ordering())
+            .limit(n)
+            .all(),
+            after,
+            limit,
+        )
+    page = rows[:limit]
+
+    # Every count is an index-only scan of the partial index; the first page reuses the total.
+    total = _count_unmatched(db, filters)
+    after_total = (
+        sum(_count_unmatched(db, [*filters, predicate]) for predicate in keyset_phases(after))
+        if after is not None
+        else total
     )
-    return drugs
+    remaining = after_total - len(page)
+    headers = {TOTAL_COUNT_HEADER: str(total), REMAINING_COUNT_HEADER: str(remaining)}
+    if len(rows) > limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].trade_name_ar, page[-1].moh_code)
+
+    if fast:
+        return Response(content=encode_drug_rows(page), media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return page
 
 
 @router.post("/drugs/import", response_model=List[DrugLocal], status_code=status.HTTP_201_CREATED)
@@ -33,39 +106,66 @@ def import_drugs(
     current_user: User = Depends(deps.get_current_active_superuser),
 ) -> List[DrugLocal]:
     del current_user
-    imported: List[DrugLocalKuwait] = []
-
-    for item in payload.items:
-        local = db.query(DrugLocalKuwait).filter(DrugLocalKuwait.id == item.local_id).first()
-        if not local:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Local drug {item.local_id} not found")
-
-        master_data = item.master.dict()
-        master: DrugMaster
-        if master_data.get("rx_cui"):
-            master = (
-                db.query(DrugMaster)
-                .filter(DrugMaster.rx_cui == master_data["rx_cui"])
-                .first()
-            )
-            if master:
-                for key, value in master_data.items():
-                    if value is not None:
-                        setattr(master, key, value)
-            else:
-                master = DrugMaster(**master_data)
-                db.add(master)
-                db.flush()
+    local_ids = [item.local_id for item in payload.items]
+    existing = set(db.execute(select(DrugLocalKuwait.id).where(DrugLocalKuwait.id.in_(local_ids))).scalars())
+    for local_id in local_ids:
+        if local_id not in existing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Local drug {local_id} not found")
+
+    # Always move last_updated so the catalog version changes even when only the link does
+    now = datetime.utcnow()
+    by_rx_cui: Dict[str, dict] = {}
+    anonymous: List[Tuple[int, dict]] = []
+    for position, item in enumerate(payload.items):
+        # Every row carries the same keys so each statement stays a single executemany batch
+        master_data = {name: getattr(item.master, name) for name in MASTER_FIELDS}
+        master_data["last_updated"] = now
+        rx_cui = master_data.get("rx_cui")
+        if not rx_cui:
+            anonymous.append((position, master_data))
+        elif rx_cui in by_rx_cui:
+            # Later items in the batch win field by field, as if applied one after another
+            by_rx_cui[rx_cui].update({key: value for key, value in master_data.items() if value is not None})
         else:
-            master = DrugMaster(**master_data)
-            db.add(master)
-            db.flush()
+            by_rx_cui[rx_cui] = master_data
 
-        local.matched_drug_id = master.id
-        local.match_confidence = item.match_confidence
-        imported.append(local)
+    # Only non-null incoming values overwrite, matching the field-by-field merge of a review
+    master_ids = upsert_masters_by_rx_cui(db, list(by_rx_cui.values())) if by_rx_cui else {}
+    anonymous_ids: Dict[int, int] = {}
+    if anonymous:
+        result = db.execute(
+            insert(DrugMaster.__table__).returning(DrugMaster.__table__.c.id, sort_by_parameter_order=True),
+            [master_data for _, master_data in anonymous],
+        )
+        anonymous_ids = {position: master_id for (position, _), master_id in zip(anonymous, result.scalars())}
 
+    links = {
+        item.local_id: {
+            "id": item.local_id,
+            "matched_drug_id": anonymous_ids[position] if position in anonymous_ids else master_ids[item.master.rx_cui],
+            "match_confidence": item.match_confidence,
+        }
+        for position, item in enumerate(payload.items)
+    }
+    if links:
+        db.execute(update(DrugLocalKuwait), list(links.values()))
     db.commit()
-    for local in imported:
-        db.refresh(local)
-    return imported
+
+    loaded = (
+        db.query(DrugLocalKuwait)
+        .options(joinedload(DrugLocalKuwait.matched_drug))
+        .filter(DrugLocalKuwait.id.in_(local_ids))
+        .all()
+    )
+    by_id = {local.id: local for local in loaded}
+    drug_search_index.refresh_rows(db, list(by_id))
+    catalog_cache.invalidate()
+    return [by_id[local_id] for local_id in local_ids]
+
+
+@router.get("/catalog/cache", response_model=Dict[str, int])
+def catalog_cache_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Dict[str, int]:
+    del current_user
+    return catalog_cache.stats()
@@ -1,46 +1,319 @@
-from typing import List
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import or_
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, or_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query as OrmQuery, Session, joinedload
 
 from app.api import deps
+from app.api.conditional import catalog_etag, etag_matches, not_modified, parse_byte_range
+from app.api.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    CatalogKey,
+    catalog_ordering,
+    decode_cursor,
+    encode_cursor,
+    fetch_keyset_page,
+    iter_keyset,
+)
+from app.core.config import get_settings
 from app.models.drug import DrugLocalKuwait, DrugMaster
 from app.models.user import User
-from app.schemas.drug import DrugLocal
+from app.schemas.drug import DrugCatalogChanges, DrugLocal
+from app.services.catalog import (
+    collect_catalog_changes,
+    decode_change_cursor,
+    encode_change_cursor,
+    get_catalog_version,
+    snapshot_change_cursor,
+)
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_export import build_catalog_export_if_idle, current_catalog_export, latest_catalog_export
+from app.services.catalog_projection import catalog_projection, encode_drug_row, encode_drug_rows
+from app.services.drug_search import drug_search_index
 
 router = APIRouter(prefix="/drugs", tags=["drugs"])
+settings = get_settings()
+
+STREAM_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _visible_filter():
+    return or_(
+        DrugLocalKuwait.matched_drug_id.is_(None),
+        DrugMaster.verified_status == "verified",
+    )
+
+
+def _visible_drugs_query(db: Session) -> OrmQuery:
+    return (
+        db.query(DrugLocalKuwait)
+        .outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+        .options(joinedload(DrugLocalKuwait.matched_drug))
+        .filter(_visible_filter())
+        .order_by(*catalog_ordering())
+    )
+
+
+def _visible_rows_stmt(predicate) -> Select:
+    return catalog_projection().where(_visible_filter(), predicate).order_by(*catalog_ordering())
+
+
+def _iter_drug_documents(bind: Engine | Connection, after: Optional[CatalogKey], fast: bool) -> Iterator[bytes]:
+    # The request-scoped session is closed before the body is sent, so streaming uses its own.
+    with Session(bind=bind) as session:
+        if fast:
+            connection = session.connection()
+            rows = iter_keyset(
+                lambda predicate: connection.execute(
+                    _visible_rows_stmt(predicate).execution_options(yield_per=STREAM_BATCH_SIZE)
+                ),
+                after,
+            )
+            for row in rows:
+                yield encode_drug_row(row)
+            return
+
+        drugs = iter_keyset(
+            lambda predicate: _visible_drugs_query(session).filter(predicate).yield_per(STREAM_BATCH_SIZE), after
+        )
+        for drug in drugs:
+            yield DrugLocal.model_validate(drug, from_attributes=True).model_dump_json().encode("utf-8")
+
+
+def _stream_drugs(bind: Engine | Connection, after: Optional[CatalogKey], fast: bool = False) -> Iterator[bytes]:
+    for document in _iter_drug_documents(bind, after, fast):
+        yield document + b"\n"
+
+
+def _stream_drug_array(bind: Engine | Connection, fast: bool = False) -> Iterator[bytes]:
+    separator = b"["
+    for document in _iter_drug_documents(bind, None, fast):
+        yield separator + document
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
 
 
 @router.get("", response_model=List[DrugLocal])
 def list_drugs(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description=f"Page size; {DEFAULT_PAGE_SIZE} when paging with a cursor"
+    ),
+    stream: bool = Query(False, description="Stream every remaining row as NDJSON instead of one page"),
+    fast: bool = Query(False, description="Encode column tuples directly, skipping ORM and model validation"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-) -> List[DrugLocal]:
+):
     del current_user  # authentication side-effect only
-    query = (
-        db.query(DrugLocalKuwait)
-        .outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
-        .options(joinedload(DrugLocalKuwait.matched_drug))
-        .order_by(DrugLocalKuwait.trade_name_ar.asc(), DrugLocalKuwait.moh_code.asc())
-    )
-    query = query.filter(
-        or_(
-            DrugLocalKuwait.matched_drug_id.is_(None),
-            DrugMaster.verified_status == "verified",
+    after = decode_cursor(cursor) if cursor else None
+    # Without a cursor or limit the whole catalog comes back, as it did before paging existed
+    paged = cursor is not None or limit is not None
+    limit = limit or DEFAULT_PAGE_SIZE
+
+    representation = "ndjson" if stream else limit if paged else "all"
+    etag = catalog_etag(get_catalog_version(db), "list", cursor, representation)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    if stream:
+        return StreamingResponse(
+            _stream_drugs(db.get_bind(), after, fast=fast),
+            media_type="application/x-ndjson",
+            headers={"ETag": etag},
+        )
+    if not paged:
+        return StreamingResponse(
+            _stream_drug_array(db.get_bind(), fast=fast), media_type="application/json", headers={"ETag": etag}
+        )
+
+    if fast:
+        connection = db.connection()
+        rows = fetch_keyset_page(
+            lambda predicate, n: connection.execute(_visible_rows_stmt(predicate).limit(n)).all(), after, limit
         )
+        headers = {"ETag": etag}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].trade_name_ar, rows[-1].moh_code)
+        return Response(content=encode_drug_rows(rows), media_type="application/json", headers=headers)
+
+    drugs = fetch_keyset_page(
+        lambda predicate, n: _visible_drugs_query(db).filter(predicate).limit(n).all(), after, limit
     )
-    drugs = query.all()
+
+    if len(drugs) > limit:
+        drugs = drugs[:limit]
+        last = drugs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.trade_name_ar, last.moh_code)
     return drugs
 
 
+@router.get("/search", response_model=List[DrugLocal])
+def search_drugs(
+    q: str = Query(..., min_length=2, max_length=100, description="Arabic or English name prefix"),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> List[DrugLocal]:
+    del current_user
+    drug_search_index.ensure_current(db)
+    # The index refreshes every 30s; the final fetch re-checks visibility so a drug hidden or
+    # deleted since then is never returned, and those rows are re-indexed before one retry.
+    for _ in range(2):
+        drug_ids = drug_search_index.search(q, limit=limit)
+        if not drug_ids:
+            return []
+        drugs = _visible_drugs_query(db).filter(DrugLocalKuwait.id.in_(drug_ids)).all()
+        by_id = {drug.id: drug for drug in drugs}
+        stale = [drug_id for drug_id in drug_ids if drug_id not in by_id]
+        if not stale:
+            break
+        drug_search_index.refresh_rows(db, stale)
+    return [by_id[drug_id] for drug_id in drug_ids if drug_id in by_id]
+
+
+def _encode_snapshot_page(key: CatalogKey, since: str) -> str:
+    # Every snapshot page carries the change cursor taken before its first page
+    return f"{encode_cursor(*key)}.{since}"
+
+
+def _decode_snapshot_page(page: str) -> Tuple[CatalogKey, str]:
+    key, _, since = page.partition(".")
+    if not since:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return decode_cursor(key), since
+
+
+@router.get("/changes", response_model=DrugCatalogChanges)
+def list_drug_changes(
+    response: Response,
+    since: Optional[str] = Query(None, description="Cursor from the previous response; omit for a full snapshot"),
+    page: Optional[str] = Query(None, description="X-Next-Cursor of the previous snapshot page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    del current_user
+    if since is not None:
+        try:
+            since_cursor = decode_change_cursor(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from None
+        return collect_catalog_changes(db, since_cursor)
+
+    # Full snapshot, one keyset page at a time; the cursor predates the first page so
+    # writes made while the client pages through are delivered by the next delta
+    after, change_cursor = _decode_snapshot_page(page) if page else (None, None)
+    if change_cursor is None:
+        change_cursor = encode_change_cursor(snapshot_change_cursor(db))
+    drugs = fetch_keyset_page(
+        lambda predicate, n: _visible_drugs_query(db).filter(predicate).limit(n).all(), after, limit
+    )
+    if len(drugs) > limit:
+        drugs = drugs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_snapshot_page(
+            (drugs[-1].trade_name_ar, drugs[-1].moh_code), change_cursor
+        )
+    return DrugCatalogChanges(
+        cursor=change_cursor,
+        added=[DrugLocal.model_validate(drug, from_attributes=True) for drug in drugs],
+    )
+
+
+def _read_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(EXPORT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _build_export_in_background(bind: Engine | Connection) -> None:
+    # The request-scoped session is closed once the response is sent, so the build uses its own.
+    with Session(bind=bind) as session:
+        build_catalog_export_if_idle(session, settings.catalog_export_dir)
+
+
+@router.get("/export", response_class=Response)
+def export_drugs(
+    background_tasks: BackgroundTasks,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Response:
+    """Serve the binary catalog snapshot described in :mod:`app.services.catalog_export`."""
+
+    del current_user
+    _, export = current_catalog_export(db, settings.catalog_export_dir)
+    if export is None:
+        # Serve the previous version while the current one is built after this response
+        background_tasks.add_task(_build_export_in_background, db.get_bind())
+        export = latest_catalog_export(settings.catalog_export_dir)
+        if export is None:
+            raise HTTPException(
+                status_code=503, detail="Catalog export is being built", headers={"Retry-After": "5"}
+            )
+    etag = f'"{export.sha256}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "X-Content-SHA256": export.sha256,
+        "X-Catalog-Version": export.version_token,
+    }
+    byte_range = parse_byte_range(range_header, export.size)
+    if byte_range is None:
+        start, end, status_code = 0, export.size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{export.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_file_range(export.path, start, end),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
 @router.get("/{drug_id}", response_model=DrugLocal)
 def get_drug(
     drug_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-) -> DrugLocal:
+):
     del current_user
+    # The ETag must follow the database, not the cache's periodic version check, so this
+    # index-only version read stays; the cache saves the row fetch and serialization
+    version = get_catalog_version(db)
+    etag = catalog_etag(version, "drug", drug_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    cached = catalog_cache.get(db, drug_id, version)
+    if cached is not None:
+        if not cached.visible:
+            raise HTTPException(status_code=404, detail="Drug not verified")
+        return Response(content=cached.payload, media_type="application/json", headers={"ETag": etag})
+
     drug = (
         db.query(DrugLocalKuwait)
         .options(joinedload(DrugLocalKuwait.matched_drug))
@@ -51,4 +324,5 @@ def get_drug(
         raise HTTPException(status_code=404, detail="Drug not found")
     if drug.matched_drug_id is not None and drug.verified_status != "verified":
         raise HTTPException(status_code=404, detail="Drug not verified")
+    response.headers["ETag"] = etag
     return drug
@@ -15,6 +15,7 @@ from app.schemas.schedule import (
     DrugSchedule as DrugScheduleSchema,
     DrugScheduleCreate,
 )
+from app.services.catalog_cache import catalog_cache
 
 router = APIRouter(tags=["schedules"])
 
@@ -61,10 +62,15 @@ def create_patient_schedule(
     if not current_user.is_superuser and patient.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
 
-    drug = db.query(DrugLocalKuwait).filter(DrugLocalKuwait.id == schedule_in.drug_id).first()
-    if not drug:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drug not found")
-    if drug.matched_drug_id is not None and drug.verified_status != "verified":
+    cached = catalog_cache.get(db, schedule_in.drug_id)
+    if cached is None:
+        drug = db.query(DrugLocalKuwait).filter(DrugLocalKuwait.id == schedule_in.drug_id).first()
+        if not drug:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drug not found")
+        verified = drug.matched_drug_id is None or drug.verified_status == "verified"
+    else:
+        verified = cached.visible
+    if not verified:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Drug not verified")
 
     schedule = DrugSchedule(**schedule_in.dict())
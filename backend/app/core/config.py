@@ -20,6 +20,20 @@ class Settings(BaseSettings):
     )
     secret_key: str = Field("super-secret-key", env="SECRET_KEY")
     access_token_expire_minutes: int = Field(60, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    otp_max_attempts: int = Field(5, env="OTP_MAX_ATTEMPTS")
+    otp_retention_hours: int = Field(24, env="OTP_RETENTION_HOURS")
+    catalog_export_dir: str = Field("var/catalog_exports", env="CATALOG_EXPORT_DIR")
+    http_cache_path: str = Field("var/http_cache.sqlite3", env="HTTP_CACHE_PATH")
+    http_cache_max_entries: int = Field(50_000, env="HTTP_CACHE_MAX_ENTRIES")
+    rxnorm_max_concurrency: int = Field(8, env="RXNORM_MAX_CONCURRENCY")
+    dailymed_max_concurrency: int = Field(4, env="DAILYMED_MAX_CONCURRENCY")
+    openfda_max_concurrency: int = Field(4, env="OPENFDA_MAX_CONCURRENCY")
+    sync_chunk_size: int = Field(500, env="SYNC_CHUNK_SIZE")
+    sync_chunk_stale_seconds: int = Field(3600, env="SYNC_CHUNK_STALE_SECONDS")
+    sync_metrics_path: str = Field("var/metrics/sync.prom", env="SYNC_METRICS_PATH")
+    sync_retry_base_hours: float = Field(24.0, env="SYNC_RETRY_BASE_HOURS")
+    sync_retry_max_days: float = Field(30.0, env="SYNC_RETRY_MAX_DAYS")
+    kuwait_catalog_path: str = Field("var/moh/catalog.csv", env="KUWAIT_CATALOG_PATH")
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,7 @@
+from pathlib import Path
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.api.router import api_router
 from app.core.config import get_settings
@@ -7,7 +10,18 @@ settings = get_settings()
 app = FastAPI(title=settings.app_name, debug=settings.debug)
 app.include_router(api_router)
 
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
 
 @app.get("/health", tags=["health"])
 def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+def sync_metrics() -> PlainTextResponse:
+    """Metrics of the last sync run, as written by the worker to ``SYNC_METRICS_PATH``."""
+
+    path = Path(settings.sync_metrics_path) if settings.sync_metrics_path else None
+    body = path.read_text(encoding="utf-8") if path is not None and path.is_file() else ""
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
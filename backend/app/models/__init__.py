@@ -1,8 +1,13 @@
 from app.db.base import Base  # noqa: F401
-from app.models.drug import DrugLocalKuwait, DrugMaster  # noqa: F401
+from app.models.dailymed import DailyMedRelease, DailyMedSPL  # noqa: F401
+from app.models.drug import DrugLocalKuwait, DrugMatchCandidate, DrugMaster  # noqa: F401
+from app.models.openfda import OpenFDABulkFile, OpenFDAKey, OpenFDARecord  # noqa: F401
+from app.models.otp import OTPChallengeRecord  # noqa: F401
 from app.models.patient import Patient  # noqa: F401
 from app.models.provenance import Provenance  # noqa: F401
+from app.models.rxnorm import RxNormAttribute, RxNormConcept, RxNormName, RxNormRelation, RxNormRelease  # noqa: F401
 from app.models.schedule import DoseLog, DrugSchedule  # noqa: F401
+from app.models.sync import DrugLookupAttempt, SyncChunk, SyncRun  # noqa: F401
 from app.models.user import User  # noqa: F401
 
 __all__ = [
@@ -11,7 +16,22 @@ __all__ = [
     "Patient",
     "DrugMaster",
     "DrugLocalKuwait",
+    "DrugMatchCandidate",
     "DrugSchedule",
     "DoseLog",
     "Provenance",
+    "RxNormRelease",
+    "RxNormConcept",
+    "RxNormName",
+    "RxNormAttribute",
+    "RxNormRelation",
+    "DailyMedRelease",
+    "DailyMedSPL",
+    "OpenFDABulkFile",
+    "OpenFDARecord",
+    "OpenFDAKey",
+    "SyncRun",
+    "SyncChunk",
+    "DrugLookupAttempt",
+    "OTPChallengeRecord",
 ]
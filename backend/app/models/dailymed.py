@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.db.base import Base
+
+
+class DailyMedRelease(Base):
+    """A DailyMed SPL release zip (full or incremental) loaded into ``dailymed_spls``."""
+
+    __tablename__ = "dailymed_releases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_name = Column(String, nullable=False)
+    documents = Column(Integer, nullable=False, default=0)
+    loaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DailyMedSPL(Base):
+    """Latest loaded version of one SPL document set."""
+
+    __tablename__ = "dailymed_spls"
+
+    set_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    title = Column(Text, nullable=True)
+    product_name = Column(String, nullable=True)
+    name_key = Column(String, nullable=True, index=True)
+    generic_name = Column(String, nullable=True)
+    generic_key = Column(String, nullable=True, index=True)
+    strength = Column(String, nullable=True)
+    dosage_form = Column(String, nullable=True)
+    effective_time = Column(String, nullable=True)
+    # JSON object of the key label sections (indications_and_usage, warnings, ...)
+    sections = Column(Text, nullable=False, default="{}")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String, text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -21,13 +21,22 @@ class DrugMaster(Base):
     source_url = Column(String, nullable=True)
     source_version = Column(String, nullable=True)
     verified_status = Column(String, nullable=False, default="unverified")
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
 
     local_variants = relationship("DrugLocalKuwait", back_populates="matched_drug")
 
 
 class DrugLocalKuwait(Base):
     __tablename__ = "drugs_local_kuwait"
+    __table_args__ = (
+        Index(
+            "ix_drugs_local_kuwait_unmatched_name",
+            "trade_name_ar",
+            "moh_code",
+            postgresql_where=text("matched_drug_id IS NULL"),
+            sqlite_where=text("matched_drug_id IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     moh_code = Column(String, unique=True, nullable=False)
@@ -36,7 +45,7 @@ class DrugLocalKuwait(Base):
     strength = Column(String, nullable=True)
     dosage_form = Column(String, nullable=True)
     source_file = Column(String, nullable=True)
-    extracted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    extracted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     matched_drug_id = Column(Integer, ForeignKey("drugs_master.id"), nullable=True)
     match_confidence = Column(Numeric(4, 3), nullable=True)
 
@@ -56,3 +65,18 @@ class DrugLocalKuwait(Base):
     @property
     def trade_name_en(self) -> Optional[str]:
         return self.matched_drug.trade_name_en if self.matched_drug else None
+
+
+class DrugMatchCandidate(Base):
+    __tablename__ = "drug_match_candidates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    local_id = Column(Integer, ForeignKey("drugs_local_kuwait.id", ondelete="CASCADE"), nullable=False, index=True)
+    master_id = Column(Integer, ForeignKey("drugs_master.id", ondelete="CASCADE"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    confidence = Column(Numeric(4, 3), nullable=False)
+    method = Column(String, nullable=False, default="batch_matcher")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    local = relationship("DrugLocalKuwait")
+    master = relationship("DrugMaster")
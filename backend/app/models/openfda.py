@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.db.base import Base
+
+
+class OpenFDABulkFile(Base):
+    """One bulk download partition loaded into the local openFDA tables."""
+
+    __tablename__ = "openfda_bulk_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String, nullable=False, index=True)
+    file_name = Column(String, nullable=False)
+    last_updated = Column(String, nullable=True)
+    record_count = Column(Integer, nullable=False, default=0)
+    loaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class OpenFDARecord(Base):
+    __tablename__ = "openfda_records"
+
+    id = Column(Integer, primary_key=True)
+    endpoint = Column(String, nullable=False, index=True)
+    # label id, NDC product_id or enforcement recall_number
+    record_key = Column(String, nullable=True)
+    # effective_time / marketing_start_date / report_date; newest first, like the API's best match
+    sort_date = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)
+
+
+class OpenFDAKey(Base):
+    __tablename__ = "openfda_keys"
+    __table_args__ = (Index("ix_openfda_keys_lookup", "endpoint", "kind", "key"),)
+
+    id = Column(Integer, primary_key=True)
+    record_id = Column(Integer, ForeignKey("openfda_records.id", ondelete="CASCADE"), nullable=False, index=True)
+    endpoint = Column(String, nullable=False)
+    # brand, generic, ndc, or word (a token of an enforcement product description)
+    kind = Column(String, nullable=False)
+    key = Column(String, nullable=False)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.db.base import Base
+
+
+class OTPChallengeRecord(Base):
+    """One phone-login code; verification consumes it with a single conditional UPDATE."""
+
+    __tablename__ = "otp_challenges"
+
+    request_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    phone_number = Column(String, nullable=False)
+    code_hash = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+    # Wrong codes entered so far; the challenge is dead once this reaches OTP_MAX_ATTEMPTS
+    attempts = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db.base import Base
+
+
+class RxNormRelease(Base):
+    __tablename__ = "rxnorm_releases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(String, nullable=False)
+    loaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    concept_count = Column(Integer, nullable=False, default=0)
+
+
+class RxNormConcept(Base):
+    __tablename__ = "rxnorm_concepts"
+
+    rxcui = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    synonym = Column(String, nullable=True)
+    tty = Column(String, nullable=False)
+    suppress = Column(String, nullable=False, default="N")
+
+
+class RxNormName(Base):
+    __tablename__ = "rxnorm_names"
+
+    id = Column(Integer, primary_key=True)
+    rxcui = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
+    name_key = Column(String, nullable=False, index=True)
+    tty = Column(String, nullable=False)
+    suppress = Column(String, nullable=False, default="N")
+
+
+class RxNormAttribute(Base):
+    __tablename__ = "rxnorm_attributes"
+
+    id = Column(Integer, primary_key=True)
+    rxcui = Column(String, nullable=False, index=True)
+    atn = Column(String, nullable=False)
+    atv = Column(String, nullable=True)
+
+
+class RxNormRelation(Base):
+    __tablename__ = "rxnorm_relations"
+
+    id = Column(Integer, primary_key=True)
+    rxcui1 = Column(String, nullable=False, index=True)
+    rela = Column(String, nullable=True)
+    rxcui2 = Column(String, nullable=False)
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class SyncRun(Base):
+    """One pass of the external-source backfill over every unmatched local drug."""
+
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default="running", index=True)
+    chunk_size = Column(Integer, nullable=False)
+    # Highest drugs_local_kuwait.id already assigned to a chunk
+    cursor = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    chunks = relationship("SyncChunk", back_populates="run", order_by="SyncChunk.first_local_id")
+
+
+class SyncChunk(Base):
+    __tablename__ = "sync_chunks"
+    __table_args__ = (UniqueConstraint("run_id", "first_local_id", name="uq_sync_chunks_run_first_local"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("sync_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    first_local_id = Column(Integer, nullable=False)
+    last_local_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    synced = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    # Set when a coordinator queues the chunk; a dispatch newer than started_at is still queued
+    dispatched_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    run = relationship("SyncRun", back_populates="chunks")
+
+
+class DrugLookupAttempt(Base):
+    """Outcome of the latest external lookup of one local drug, used to back off dead names."""
+
+    __tablename__ = "drug_lookup_attempts"
+
+    local_id = Column(Integer, ForeignKey("drugs_local_kuwait.id", ondelete="CASCADE"), primary_key=True)
+    # The local name the lookup was derived from; a different name on the row makes it eligible again
+    name = Column(String, nullable=True)
+    outcome = Column(String, nullable=False)
+    # Consecutive lookups that found nothing; transient errors do not count
+    attempts = Column(Integer, nullable=False, default=0)
+    last_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, nullable=True, index=True)
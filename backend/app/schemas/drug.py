@@ -55,6 +55,16 @@ class DrugLocal(DrugLocalBase):
         orm_mode = True
 
 
+class DrugCatalogChanges(BaseModel):
+    cursor: str
+    added: List[DrugLocal] = Field(default_factory=list)
+    updated: List[DrugLocal] = Field(default_factory=list)
+    removed: List[int] = Field(default_factory=list)
+
+    class Config:
+        orm_mode = True
+
+
 class DrugSimple(BaseModel):
     id: int
     moh_code: str
@@ -1,7 +1,14 @@
 """External service clients for drug data ingestion."""
 
-from .dailymed_client import DailyMedClient  # noqa: F401
-from .openfda_client import OpenFDAClient  # noqa: F401
-from .rxnorm_client import RxNormClient  # noqa: F401
+from .dailymed_client import AsyncDailyMedClient, DailyMedClient  # noqa: F401
+from .openfda_client import AsyncOpenFDAClient, OpenFDAClient  # noqa: F401
+from .rxnorm_client import AsyncRxNormClient, RxNormClient  # noqa: F401
 
-__all__ = ["RxNormClient", "DailyMedClient", "OpenFDAClient"]
+__all__ = [
+    "RxNormClient",
+    "DailyMedClient",
+    "OpenFDAClient",
+    "AsyncRxNormClient",
+    "AsyncDailyMedClient",
+    "AsyncOpenFDAClient",
+]
@@ -0,0 +1,171 @@
+"""Catalog-wide change tracking for the Kuwait drug list."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import FrozenSet, List, Optional, Set
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+
+# How long a catalog write may take to commit after stamping its rows
+CHANGE_OVERLAP = timedelta(seconds=60)
+# Most overlap fingerprints a change cursor carries before it settles at the high-water mark
+CHANGE_SEEN_LIMIT = 200
+
+
+@dataclass(frozen=True)
+class CatalogVersion:
+    """High-water marks of the two timestamps every catalog write moves forward."""
+
+    master_updated_at: Optional[datetime]
+    local_extracted_at: Optional[datetime]
+
+    @property
+    def token(self) -> str:
+        master = self.master_updated_at.isoformat() if self.master_updated_at else ""
+        local = self.local_extracted_at.isoformat() if self.local_extracted_at else ""
+        return hashlib.sha256(f"{master}|{local}".encode("ascii")).hexdigest()[:32]
+
+
+def get_catalog_version(db: Session) -> CatalogVersion:
+    """Read the current catalog version with two index-backed ``max()`` lookups and no ORM loading."""
+
+    stmt = select(
+        select(func.max(DrugMaster.last_updated)).scalar_subquery(),
+        select(func.max(DrugLocalKuwait.extracted_at)).scalar_subquery(),
+    )
+    master_updated_at, local_extracted_at = db.execute(stmt).one()
+    return CatalogVersion(master_updated_at=master_updated_at, local_extracted_at=local_extracted_at)
+
+
+@dataclass(frozen=True)
+class ChangeCursor:
+    """Where a change feed reader stands.
+
+    Rows stamped at or before ``settled_at`` have all been delivered. Rows stamped later are
+    read again on the next call, because a transaction that stamped a row earlier can commit
+    after a later-stamped row was already served. ``seen`` holds the fingerprints of the rows
+    in that overlap that were already delivered, so they are not sent twice.
+    """
+
+    settled_at: Optional[datetime]
+    seen: FrozenSet[str] = frozenset()
+
+
+def change_fingerprint(local_id: int, extracted_at: Optional[datetime], master_updated_at: Optional[datetime]) -> str:
+    stamps = "|".join(stamp.isoformat() if stamp else "" for stamp in (extracted_at, master_updated_at))
+    return f"{local_id}:{hashlib.sha256(stamps.encode('ascii')).hexdigest()[:8]}"
+
+
+def encode_change_cursor(cursor: ChangeCursor) -> str:
+    payload = [cursor.settled_at.isoformat() if cursor.settled_at else None, sorted(cursor.seen)]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_change_cursor(cursor: str) -> ChangeCursor:
+    """Parse a cursor produced by :func:`encode_change_cursor`; raises ``ValueError`` when malformed."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        first, second = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if isinstance(second, list):
+            return ChangeCursor(
+                settled_at=datetime.fromisoformat(first) if first else None,
+                seen=frozenset(str(fingerprint) for fingerprint in second),
+            )
+        # Cursors issued before the overlap window held the two catalog high-water marks
+        stamps = [datetime.fromisoformat(stamp) for stamp in (first, second) if stamp]
+        return ChangeCursor(settled_at=min(stamps) if stamps else None)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid change cursor: {cursor!r}") from exc
+
+
+@dataclass
+class CatalogChanges:
+    cursor: str
+    version: CatalogVersion
+    next_cursor: ChangeCursor
+    added: List[DrugLocalKuwait] = field(default_factory=list)
+    updated: List[DrugLocalKuwait] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+
+
+def _settle(horizon: datetime, in_overlap: Set[str], version: CatalogVersion) -> ChangeCursor:
+    if len(in_overlap) > CHANGE_SEEN_LIMIT:
+        # A bulk write landed inside the overlap; settle at the high-water mark instead of
+        # carrying every fingerprint, accepting the strict cutoff for this one step
+        marks = [mark for mark in (version.master_updated_at, version.local_extracted_at) if mark]
+        return ChangeCursor(settled_at=max([horizon, *marks]))
+    return ChangeCursor(settled_at=horizon, seen=frozenset(in_overlap))
+
+
+def snapshot_change_cursor(db: Session, now: Optional[datetime] = None) -> ChangeCursor:
+    """Cursor for a reader about to take a full snapshot; read it before the snapshot itself."""
+
+    horizon = (now or datetime.utcnow()) - CHANGE_OVERLAP
+    version = get_catalog_version(db)
+    rows = db.execute(
+        select(DrugLocalKuwait.id, DrugLocalKuwait.extracted_at, DrugMaster.last_updated)
+        .outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+        .where(or_(DrugLocalKuwait.extracted_at > horizon, DrugMaster.last_updated > horizon))
+        .limit(CHANGE_SEEN_LIMIT + 1)
+    )
+    return _settle(horizon, {change_fingerprint(*row) for row in rows}, version)
+
+
+def collect_catalog_changes(db: Session, since: ChangeCursor, now: Optional[datetime] = None) -> CatalogChanges:
+    """Return local drugs that appeared, changed or stopped being visible after ``since``.
+
+    A row is touched when its own ``extracted_at`` or its master's ``last_updated`` is after
+    ``since.settled_at``. Touched rows already listed in ``since.seen`` are skipped. Touched
+    rows that are still visible (unmatched, or matched to a verified master) are reported as
+    added or updated; the rest become tombstones in ``removed``.
+    """
+
+    now = now or datetime.utcnow()
+    version = get_catalog_version(db)
+    query = (
+        db.query(DrugLocalKuwait, DrugMaster.last_updated)
+        .outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+        .options(joinedload(DrugLocalKuwait.matched_drug))
+        .order_by(DrugLocalKuwait.id.asc())
+    )
+    settled_at = since.settled_at
+    if settled_at is not None:
+        query = query.filter(or_(DrugLocalKuwait.extracted_at > settled_at, DrugMaster.last_updated > settled_at))
+
+    # Rows stamped after the new horizon are read again next time; remember which were sent
+    horizon = max(now - CHANGE_OVERLAP, settled_at) if settled_at is not None else now - CHANGE_OVERLAP
+    added: List[DrugLocalKuwait] = []
+    updated: List[DrugLocalKuwait] = []
+    removed: List[int] = []
+    in_overlap = set()
+    for local, master_updated_at in query:
+        fingerprint = change_fingerprint(local.id, local.extracted_at, master_updated_at)
+        if max(local.extracted_at, master_updated_at or local.extracted_at) > horizon:
+            in_overlap.add(fingerprint)
+        if fingerprint in since.seen:
+            continue
+        if local.matched_drug_id is not None and local.verified_status != "verified":
+            removed.append(local.id)
+        elif settled_at is None or local.extracted_at > settled_at:
+            added.append(local)
+        else:
+            updated.append(local)
+
+    next_cursor = _settle(horizon, in_overlap, version)
+    return CatalogChanges(
+        cursor=encode_change_cursor(next_cursor),
+        version=version,
+        next_cursor=next_cursor,
+        added=added,
+        updated=updated,
+        removed=removed,
+    )
@@ -0,0 +1,208 @@
+"""Per-worker cache of the visible drug catalog, keyed by local drug id."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.drug import DrugLocalKuwait
+from app.schemas.drug import DrugLocal
+from app.services.catalog import (
+    CatalogVersion,
+    ChangeCursor,
+    collect_catalog_changes,
+    get_catalog_version,
+    snapshot_change_cursor,
+)
+
+VERSION_CHECK_INTERVAL_SECONDS = 10.0
+LOAD_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class CachedDrug:
+    visible: bool
+    payload: Optional[bytes]
+
+
+def _set_bit(bitmap: bytearray, index: int, value: bool) -> None:
+    byte, bit = divmod(index, 8)
+    if byte >= len(bitmap):
+        bitmap.extend(b"\x00" * (byte - len(bitmap) + 1))
+    if value:
+        bitmap[byte] |= 1 << bit
+    else:
+        bitmap[byte] &= ~(1 << bit) & 0xFF
+
+
+def _get_bit(bitmap: bytearray, index: int) -> bool:
+    if index < 0:
+        return False  # divmod would wrap a negative id onto another drug's bit
+    byte, bit = divmod(index, 8)
+    return byte < len(bitmap) and bool(bitmap[byte] >> bit & 1)
+
+
+class _Entries:
+    """Serialized payloads plus presence/visibility bitmaps, keyed by local drug id."""
+
+    def __init__(self) -> None:
+        self.payloads: Dict[int, bytes] = {}
+        self.present = bytearray()
+        self.visible = bytearray()
+
+    def put(self, drug_id: int, payload: Optional[bytes]) -> None:
+        """Record ``drug_id`` as known: visible with ``payload``, or hidden when it is ``None``."""
+
+        _set_bit(self.present, drug_id, True)
+        _set_bit(self.visible, drug_id, payload is not None)
+        if payload is not None:
+            self.payloads[drug_id] = payload
+        else:
+            self.payloads.pop(drug_id, None)
+
+    def get(self, drug_id: int) -> Optional[CachedDrug]:
+        visible = _get_bit(self.visible, drug_id)
+        payload = self.payloads.get(drug_id) if visible else None
+        if not _get_bit(self.present, drug_id) or (visible and payload is None):
+            return None
+        return CachedDrug(visible=visible, payload=payload)
+
+
+def _serialize(local: DrugLocalKuwait) -> bytes:
+    return DrugLocal.model_validate(local, from_attributes=True).model_dump_json().encode("utf-8")
+
+
+class CatalogCache:
+    """Serialized ``DrugLocal`` JSON for visible drugs plus presence/visibility bitmaps.
+
+    The cache loads once per worker, then at most every ``version_check_interval`` seconds
+    compares the stored catalog version with the database and applies only the delta from
+    :func:`collect_catalog_changes`. Callers that pass the version they just read catch up
+    immediately instead; ``get_drug`` does, because its ETag must follow the database. A hit
+    then saves the joined row fetch, model validation and JSON encoding, not the version read.
+
+    Loads and refreshes read and serialize without holding the lookup lock and swap the
+    result in at the end, so lookups and ``stats`` only ever wait for that swap. One thread
+    updates at a time; others needing the update wait for it on a separate lock.
+    """
+
+    def __init__(self, version_check_interval: float = VERSION_CHECK_INTERVAL_SECONDS) -> None:
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._entries = _Entries()
+        self._version: Optional[CatalogVersion] = None
+        self._cursor: Optional[ChangeCursor] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.refreshes = 0
+
+    def invalidate(self) -> None:
+        """Force a version check on the next access; unchanged versions keep the loaded data."""
+
+        with self._lock:
+            self._checked_at = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = _Entries()
+            self._version = None
+            self._cursor = None
+            self._checked_at = 0.0
+
+    def _stale(self, version: Optional[CatalogVersion]) -> bool:
+        if self._version is None:
+            return True
+        if version is not None and version != self._version:
+            return True
+        return time.monotonic() - self._checked_at >= self.version_check_interval
+
+    def current_version(self, db: Session, version: Optional[CatalogVersion] = None) -> CatalogVersion:
+        """Return the cached version, catching up first when it is stale.
+
+        Passing the ``version`` just read from the database catches up immediately when it
+        differs; otherwise the database is only rechecked every ``version_check_interval``.
+        """
+
+        with self._lock:
+            if not self._stale(version):
+                return self._version
+        with self._update_lock:
+            # Another thread may have caught up while this one waited
+            with self._lock:
+                stale = self._stale(version)
+                known_version, cursor = self._version, self._cursor
+            if stale and known_version is None:
+                self._load(db)
+            elif stale:
+                self._refresh(db, known_version, cursor)
+            with self._lock:
+                return self._version
+
+    def get(self, db: Session, drug_id: int, version: Optional[CatalogVersion] = None) -> Optional[CachedDrug]:
+        """Return the cached state of ``drug_id`` or ``None`` when the caller must ask the database."""
+
+        self.current_version(db, version)
+        with self._lock:
+            cached = self._entries.get(drug_id)
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return cached
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "entries": len(self._entries.payloads),
+            }
+
+    def _load(self, db: Session) -> None:
+        cursor = snapshot_change_cursor(db)
+        version = get_catalog_version(db)
+        entries = _Entries()
+        query = db.query(DrugLocalKuwait).options(joinedload(DrugLocalKuwait.matched_drug))
+        for local in query.yield_per(LOAD_BATCH_SIZE):
+            visible = local.matched_drug_id is None or local.verified_status == "verified"
+            entries.put(local.id, _serialize(local) if visible else None)
+        with self._lock:
+            self._entries = entries
+            self._version = version
+            self._cursor = cursor
+            self._checked_at = time.monotonic()
+            self.loads += 1
+
+    def _refresh(self, db: Session, known_version: CatalogVersion, cursor: ChangeCursor) -> None:
+        version = get_catalog_version(db)
+        marks = [mark for mark in (version.master_updated_at, version.local_extracted_at) if mark]
+        # Writes inside the overlap may still be committing behind an unchanged version
+        settling = bool(marks) and (cursor.settled_at is None or cursor.settled_at < max(marks))
+        if version == known_version and not settling:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return
+
+        changes = collect_catalog_changes(db, cursor)
+        updates = [(local.id, _serialize(local)) for local in (*changes.added, *changes.updated)]
+        with self._lock:
+            for drug_id, payload in updates:
+                self._entries.put(drug_id, payload)
+            for drug_id in changes.removed:
+                self._entries.put(drug_id, None)
+            self._version = changes.version
+            self._cursor = changes.next_cursor
+            self._checked_at = time.monotonic()
+            self.refreshes += 1
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,247 @@
+"""Compact binary snapshot of the visible catalog for bootstrapping offline mobile databases.
+
+File layout (all integers little-endian)::
+
+    magic          8 bytes   b"MOHCAT01"
+    catalog token  32 bytes  ASCII hex of :attr:`CatalogVersion.token`
+    row count      uint32
+    column count   uint16
+    body length    uint32    compressed size of the body that follows
+    body           zlib-compressed column blocks
+
+Each column block is ``name`` (uint16 length + UTF-8), a kind byte and the data:
+
+* ``KIND_INT``: ``row count`` int64 values, ``0`` meaning NULL.
+* ``KIND_DICT``: a dictionary (uint32 size, then uint32 length + UTF-8 per entry) followed by
+  ``row count`` uint32 codes; code ``0`` means NULL and code ``n`` is dictionary entry ``n - 1``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.services.catalog import get_catalog_version
+
+MAGIC = b"MOHCAT01"
+KIND_INT = 1
+KIND_DICT = 2
+_HEADER = struct.Struct("<8s32sIHI")
+_KEEP_EXPORTS = 2
+
+EXPORT_COLUMNS: Tuple[Tuple[str, Any, int], ...] = (
+    ("id", DrugLocalKuwait.id, KIND_INT),
+    ("moh_code", DrugLocalKuwait.moh_code, KIND_DICT),
+    ("trade_name_ar", DrugLocalKuwait.trade_name_ar, KIND_DICT),
+    ("generic_name", DrugLocalKuwait.generic_name, KIND_DICT),
+    ("strength", DrugLocalKuwait.strength, KIND_DICT),
+    ("dosage_form", DrugLocalKuwait.dosage_form, KIND_DICT),
+    ("extracted_at", DrugLocalKuwait.extracted_at, KIND_DICT),
+    ("match_confidence", DrugLocalKuwait.match_confidence, KIND_DICT),
+    ("matched_drug_id", DrugLocalKuwait.matched_drug_id, KIND_INT),
+    ("rx_cui", DrugMaster.rx_cui, KIND_DICT),
+    ("trade_name_en", DrugMaster.trade_name_en, KIND_DICT),
+    ("master_generic_name", DrugMaster.generic_name, KIND_DICT),
+    ("master_strength", DrugMaster.strength, KIND_DICT),
+    ("master_dosage_form", DrugMaster.dosage_form, KIND_DICT),
+    ("verified_status", DrugMaster.verified_status, KIND_DICT),
+)
+
+
+@dataclass(frozen=True)
+class CatalogExport:
+    path: Path
+    version_token: str
+    sha256: str
+    size: int
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _little_endian(column: array) -> array:
+    if sys.byteorder == "big":  # pragma: no cover - big-endian hosts
+        column.byteswap()
+    return column
+
+
+def _pack_text(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    return struct.pack("<I", len(encoded)) + encoded
+
+
+def _encode_column(name: str, kind: int, values: List[Any]) -> bytes:
+    encoded_name = name.encode("utf-8")
+    parts = [struct.pack("<H", len(encoded_name)), encoded_name, struct.pack("<B", kind)]
+    if kind == KIND_INT:
+        column = array("q", (value or 0 for value in values))
+    else:
+        dictionary: Dict[str, int] = {}
+        column = array("I")
+        for value in values:
+            text = _as_text(value)
+            column.append(0 if text is None else dictionary.setdefault(text, len(dictionary) + 1))
+        parts.append(struct.pack("<I", len(dictionary)))
+        parts.extend(_pack_text(text) for text in dictionary)
+    parts.append(_little_endian(column).tobytes())
+    return b"".join(parts)
+
+
+def encode_catalog(version_token: str, rows: List[Tuple[Any, ...]]) -> bytes:
+    body = b"".join(
+        _encode_column(name, kind, [row[position] for row in rows])
+        for position, (name, _, kind) in enumerate(EXPORT_COLUMNS)
+    )
+    compressed = zlib.compress(body, 9)
+    header = _HEADER.pack(MAGIC, version_token.encode("ascii"), len(rows), len(EXPORT_COLUMNS), len(compressed))
+    return header + compressed
+
+
+def decode_catalog(data: bytes) -> Tuple[str, List[Dict[str, Any]]]:
+    """Inverse of :func:`encode_catalog`; returns the catalog token and rows as dictionaries."""
+
+    magic, token, row_count, column_count, body_length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a catalog export")
+    body = zlib.decompress(data[_HEADER.size : _HEADER.size + body_length])
+
+    columns: Dict[str, List[Any]] = {}
+    offset = 0
+    for _ in range(column_count):
+        (name_length,) = struct.unpack_from("<H", body, offset)
+        offset += 2
+        name = body[offset : offset + name_length].decode("utf-8")
+        offset += name_length
+        kind = body[offset]
+        offset += 1
+        if kind == KIND_INT:
+            values = _little_endian(array("q", body[offset : offset + 8 * row_count]))
+            offset += 8 * row_count
+            columns[name] = [value or None for value in values]
+            continue
+        (dictionary_size,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        dictionary: List[Optional[str]] = [None]
+        for _ in range(dictionary_size):
+            (length,) = struct.unpack_from("<I", body, offset)
+            offset += 4
+            dictionary.append(body[offset : offset + length].decode("utf-8"))
+            offset += length
+        codes = _little_endian(array("I", body[offset : offset + 4 * row_count]))
+        offset += 4 * row_count
+        columns[name] = [dictionary[code] for code in codes]
+
+    rows = [{name: values[index] for name, values in columns.items()} for index in range(row_count)]
+    return token.decode("ascii"), rows
+
+
+def _export_rows(db: Session) -> List[Tuple[Any, ...]]:
+    stmt = (
+        select(*(column for _, column, _ in EXPORT_COLUMNS))
+        .outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+        .where(or_(DrugLocalKuwait.matched_drug_id.is_(None), DrugMaster.verified_status == "verified"))
+        .order_by(DrugLocalKuwait.id.asc())
+    )
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+_build_lock = threading.Lock()
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    # Write-then-rename so concurrent readers never see a partial or mismatched file
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as handle:
+        handle.write(data)
+    os.replace(handle.name, path)
+
+
+def _load_export(path: Path) -> Optional[CatalogExport]:
+    """Describe a finished export on disk, or ``None`` when its body or digest is missing."""
+
+    try:
+        digest = path.with_suffix(".sha256").read_text(encoding="ascii").strip()
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return None
+    return CatalogExport(path=path, version_token=path.stem.removeprefix("catalog-"), sha256=digest, size=size)
+
+
+def _build_export(db: Session, target_dir: Path, token: str) -> CatalogExport:
+    path = target_dir / f"catalog-{token}.bin"
+    target_dir.mkdir(parents=True, exist_ok=True)
+    data = encode_catalog(token, _export_rows(db))
+    # The body goes first: an export only counts once its digest exists, and both are renamed
+    # into place, so a reader or a crash never pairs a body with a missing or stale digest
+    _write_atomically(path, data)
+    _write_atomically(path.with_suffix(".sha256"), hashlib.sha256(data).hexdigest().encode("ascii"))
+    _prune_exports(target_dir, keep=path)
+    return _load_export(path)
+
+
+def current_catalog_export(db: Session, directory: str | os.PathLike) -> Tuple[str, Optional[CatalogExport]]:
+    """Return the current catalog token and its export, if that export has been built."""
+
+    token = get_catalog_version(db).token
+    return token, _load_export(Path(directory) / f"catalog-{token}.bin")
+
+
+def latest_catalog_export(directory: str | os.PathLike) -> Optional[CatalogExport]:
+    """Return the newest finished export of any catalog version."""
+
+    exports = []
+    for path in Path(directory).glob("catalog-*.bin"):
+        export = _load_export(path)
+        if export is not None:
+            try:
+                exports.append((path.stat().st_mtime, export))
+            except FileNotFoundError:
+                continue  # pruned by a concurrent build
+    return max(exports, key=lambda item: item[0])[1] if exports else None
+
+
+def ensure_catalog_export(db: Session, directory: str | os.PathLike) -> CatalogExport:
+    """Return the export for the current catalog version, building it only if it is missing."""
+
+    token, export = current_catalog_export(db, directory)
+    if export is not None:
+        return export
+    with _build_lock:
+        return _load_export(Path(directory) / f"catalog-{token}.bin") or _build_export(db, Path(directory), token)
+
+
+def build_catalog_export_if_idle(db: Session, directory: str | os.PathLike) -> Optional[CatalogExport]:
+    """Build the current export unless another build is already running; for background use."""
+
+    if not _build_lock.acquire(blocking=False):
+        return None
+    try:
+        token, export = current_catalog_export(db, directory)
+        return export or _build_export(db, Path(directory), token)
+    finally:
+        _build_lock.release()
+
+
+def _prune_exports(directory: Path, keep: Path) -> None:
+    exports = sorted(directory.glob("catalog-*.bin"), key=lambda candidate: candidate.stat().st_mtime, reverse=True)
+    for stale in [candidate for candidate in exports if candidate != keep][_KEEP_EXPORTS - 1 :]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".sha256").unlink(missing_ok=True)
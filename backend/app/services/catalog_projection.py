@@ -0,0 +1,106 @@
+"""ORM-free projection of catalog rows encoded straight to ``DrugLocal``-shaped JSON bytes.
+
+Large listings spend most of their time hydrating identity-mapped ORM objects and validating
+each one through pydantic. This path selects plain column tuples and hands them to orjson
+(stdlib ``json`` when orjson is not installed), producing the same JSON documents as the
+``response_model=DrugLocal`` path.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Row
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+
+try:  # pragma: no cover - optional speed-up
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover
+    orjson = None
+
+LOCAL_FIELDS = ("moh_code", "trade_name_ar", "generic_name", "strength", "dosage_form", "source_file")
+MASTER_FIELDS = (
+    "rx_cui",
+    "trade_name_en",
+    "trade_name_ar",
+    "generic_name",
+    "strength",
+    "dosage_form",
+    "source",
+    "source_url",
+    "source_version",
+    "verified_status",
+)
+
+
+def catalog_projection() -> Select:
+    """Select every column a ``DrugLocal`` document needs, joined to its master when matched."""
+
+    return select(
+        *(getattr(DrugLocalKuwait, name) for name in LOCAL_FIELDS),
+        DrugLocalKuwait.match_confidence,
+        DrugLocalKuwait.id,
+        DrugLocalKuwait.extracted_at,
+        DrugLocalKuwait.matched_drug_id,
+        *(getattr(DrugMaster, name).label(f"master_{name}") for name in MASTER_FIELDS),
+        DrugMaster.id.label("master_id"),
+        DrugMaster.last_updated.label("master_last_updated"),
+    ).outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+
+
+_LOCAL_COUNT = len(LOCAL_FIELDS)
+_MASTER_START = _LOCAL_COUNT + 4
+_MASTER_COUNT = len(MASTER_FIELDS)
+
+
+def _row_document(row: Row) -> Dict[str, Any]:
+    # Positional access follows the column order of catalog_projection()
+    document: Dict[str, Any] = dict(zip(LOCAL_FIELDS, row[:_LOCAL_COUNT]))
+    match_confidence, drug_id, extracted_at, matched_drug_id = row[_LOCAL_COUNT:_MASTER_START]
+    document["match_confidence"] = match_confidence
+    document["id"] = drug_id
+    document["extracted_at"] = extracted_at
+    document["matched_drug_id"] = matched_drug_id
+
+    master_values = row[_MASTER_START : _MASTER_START + _MASTER_COUNT]
+    master_id, master_last_updated = row[_MASTER_START + _MASTER_COUNT :]
+    if master_id is None:
+        document["verified_status"] = "unverified"
+        document["matched_drug"] = None
+        return document
+
+    master: Dict[str, Any] = dict(zip(MASTER_FIELDS, master_values))
+    master["id"] = master_id
+    master["last_updated"] = master_last_updated
+    document["verified_status"] = master["verified_status"] or "unverified"
+    document["matched_drug"] = master
+    return document
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_drug_rows(rows: Iterable[Row]) -> bytes:
+    """Encode projected rows as a JSON array of ``DrugLocal`` documents."""
+
+    return dumps([_row_document(row) for row in rows])
+
+
+def encode_drug_row(row: Row) -> bytes:
+    return dumps(_row_document(row))
@@ -9,56 +9,26 @@ from operator import attrgetter
 from typing import Any, Dict, Optional
 
 import httpx
-from cachetools import TTLCache, cachedmethod
+from cachetools import cachedmethod
 
 from app.models.drug import DrugMaster
 from app.models.provenance import Provenance
+from app.services.http_cache import DAY, ResponseCache, ttl_rules
+from app.services.http_client import AsyncJSONClient, JSONClient
 
 LOGGER = logging.getLogger(__name__)
 
 
-class DailyMedClient:
-    def __init__(
-        self,
-        base_url: str = "https://dailymed.nlm.nih.gov/dailymed/services/v2",
-        timeout: float = 10.0,
-        cache_ttl_seconds: int = 3600,
-    ) -> None:
-        self.base_url = base_url.rstrip("/")
-        self._client = httpx.Client(
-            base_url=self.base_url,
-            timeout=timeout,
-            headers={"User-Agent": "moh-medication-app/1.0"},
-        )
-        self._cache: TTLCache = TTLCache(maxsize=256, ttl=cache_ttl_seconds)
-
-    def close(self) -> None:
-        self._client.close()
-
-    def __enter__(self) -> "DailyMedClient":
-        return self
-
-    def __exit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
-        self.close()
-
-    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        response = self._client.get(path, params=params)
-        response.raise_for_status()
-        return response.json()
-
-    @cachedmethod(attrgetter("_cache"))
-    def list_drug_names(self) -> Dict[str, Any]:
-        return self._get("/drugnames.json")
-
-    @cachedmethod(attrgetter("_cache"))
-    def get_spl_details(self, set_id: str) -> Dict[str, Any]:
-        return self._get(f"/spls/{set_id}.json")
+class DailyMedNormalizer:
+    """Response normalization shared by the synchronous and asyncio DailyMed clients."""
 
-    @cachedmethod(attrgetter("_cache"))
-    def search_spls(self, drug_name: str) -> Dict[str, Any]:
-        return self._get("/spls.json", params={"drug_name": drug_name})
+    UPSTREAM = "dailymed"
+    CACHE_TTLS = ttl_rules(
+        (r"/spls/[^/]+\.json", 7 * DAY),
+        (r"/spls\.json|/drugnames\.json", DAY),
+    )
 
-    # Normalization ---------------------------------------------------------
+    base_url: str
 
     def normalize_spl_to_drug(self, spl_response: Dict[str, Any]) -> DrugMaster:
         entries = spl_response.get("data") if spl_response else None
@@ -98,6 +68,37 @@ class DailyMedClient:
             notes=json.dumps(notes_payload, ensure_ascii=False),
         )
 
+
+class DailyMedClient(DailyMedNormalizer, JSONClient):
+    def __init__(
+        self,
+        base_url: str = "https://dailymed.nlm.nih.gov/dailymed/services/v2",
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        transport: Optional[httpx.BaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        super().__init__(
+            base_url,
+            timeout,
+            cache_ttl_seconds,
+            cache_maxsize=256,
+            transport=transport,
+            response_cache=response_cache,
+        )
+
+    @cachedmethod(attrgetter("_cache"))
+    def list_drug_names(self) -> Dict[str, Any]:
+        return self._get("/drugnames.json")
+
+    @cachedmethod(attrgetter("_cache"))
+    def get_spl_details(self, set_id: str) -> Dict[str, Any]:
+        return self._get(f"/spls/{set_id}.json")
+
+    @cachedmethod(attrgetter("_cache"))
+    def search_spls(self, drug_name: str) -> Dict[str, Any]:
+        return self._get("/spls.json", params={"drug_name": drug_name})
+
     def safe_get_spl(self, drug_name: str) -> Optional[Dict[str, Any]]:
         try:
             search = self.search_spls(drug_name)
@@ -111,3 +112,49 @@ class DailyMedClient:
         except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
             LOGGER.warning("DailyMed lookup failed for %s: %s", drug_name, exc)
         return None
+
+
+class AsyncDailyMedClient(DailyMedNormalizer, AsyncJSONClient):
+    """Asyncio variant of :class:`DailyMedClient` for concurrent sync runs."""
+
+    def __init__(
+        self,
+        base_url: str = "https://dailymed.nlm.nih.gov/dailymed/services/v2",
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        max_concurrency: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        super().__init__(
+            base_url,
+            timeout,
+            cache_ttl_seconds,
+            cache_maxsize=256,
+            max_concurrency=max_concurrency,
+            transport=transport,
+            response_cache=response_cache,
+        )
+
+    async def list_drug_names(self) -> Dict[str, Any]:
+        return await self._get("/drugnames.json")
+
+    async def get_spl_details(self, set_id: str) -> Dict[str, Any]:
+        return await self._get(f"/spls/{set_id}.json")
+
+    async def search_spls(self, drug_name: str) -> Dict[str, Any]:
+        return await self._get("/spls.json", params={"drug_name": drug_name})
+
+    async def safe_get_spl(self, drug_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            search = await self.search_spls(drug_name)
+            entries = search.get("data") if search else None
+            set_id = None
+            if isinstance(entries, list) and entries:
+                set_id = entries[0].get("setid")
+            if not set_id:
+                return None
+            return await self.get_spl_details(set_id)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("DailyMed lookup failed for %s: %s", drug_name, exc)
+        return None
@@ -0,0 +1,311 @@
+"""Local copy of the DailyMed SPL releases and a resolver that answers like the DailyMed API.
+
+DailyMed publishes full and incremental releases as zips of per-document zips, each holding
+one SPL XML file plus its images. :func:`load_dailymed_release` walks the nested archives and
+:func:`parse_spl` stream-parses each document with ``iterparse``, clearing every top-level
+section once it has been read, so memory stays flat per document. The latest version of each
+set id is kept with its product, strength, dosage form and key label sections, which lets
+:class:`LocalDailyMedResolver` build DailyMed provenance without network calls.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.dailymed import DailyMedRelease, DailyMedSPL
+from app.models.drug import DrugMaster
+from app.models.provenance import Provenance
+from app.services.dailymed_client import DailyMedNormalizer
+from app.services.rxnorm_local import name_key
+
+LOGGER = logging.getLogger(__name__)
+
+V3 = "{urn:hl7-org:v3}"
+INSERT_BATCH_SIZE = 500
+
+# LOINC section codes kept from each label
+SECTION_CODES: Dict[str, str] = {
+    "34066-1": "boxed_warning",
+    "34067-9": "indications_and_usage",
+    "34068-7": "dosage_and_administration",
+    "34070-3": "contraindications",
+    "34071-1": "warnings",
+    "43685-7": "warnings_and_precautions",
+    "34084-4": "adverse_reactions",
+}
+ACTIVE_INGREDIENT_CLASSES = frozenset({"ACTIB", "ACTIM", "ACTIR"})
+
+
+@dataclass
+class SPLDocument:
+    set_id: str
+    version: int
+    title: Optional[str] = None
+    effective_time: Optional[str] = None
+    product_name: Optional[str] = None
+    generic_name: Optional[str] = None
+    strength: Optional[str] = None
+    dosage_form: Optional[str] = None
+    sections: Dict[str, str] = field(default_factory=dict)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(element: Optional[ElementTree.Element]) -> Optional[str]:
+    if element is None:
+        return None
+    # Join text nodes with spaces so line breaks and block markup do not glue words together
+    return " ".join(" ".join(element.itertext()).split()) or None
+
+
+def _quantity(element: Optional[ElementTree.Element]) -> Optional[str]:
+    if element is None or not element.get("value"):
+        return None
+    unit = element.get("unit")
+    return element.get("value") if unit in (None, "1") else f"{element.get('value')} {unit}"
+
+
+def _product(element: ElementTree.Element) -> Dict[str, Optional[str]]:
+    strengths: List[str] = []
+    for ingredient in element.findall(f"{V3}ingredient"):
+        if ingredient.get("classCode") not in ACTIVE_INGREDIENT_CLASSES:
+            continue
+        amount = _quantity(ingredient.find(f"{V3}quantity/{V3}numerator"))
+        per = _quantity(ingredient.find(f"{V3}quantity/{V3}denominator"))
+        if amount:
+            strengths.append(amount if per in (None, "1") else f"{amount}/{per}")
+    form = element.find(f"{V3}formCode")
+    return {
+        "product_name": _text(element.find(f"{V3}name")),
+        "generic_name": _text(element.find(f"{V3}asEntityWithGeneric/{V3}genericMedicine/{V3}name")),
+        "strength": "; ".join(strengths) or None,
+        "dosage_form": form.get("displayName") if form is not None else None,
+    }
+
+
+def parse_spl(source: IO[bytes]) -> Optional[SPLDocument]:
+    """Extract the fields stored locally from one SPL document; ``None`` if it has no set id."""
+
+    path: List[str] = []
+    header: Dict[str, Optional[str]] = {}
+    product: Optional[Dict[str, Optional[str]]] = None
+    sections: Dict[str, str] = {}
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        tag = _local_name(element.tag)
+        if event == "start":
+            path.append(tag)
+            continue
+        depth = len(path)
+        path.pop()
+        if depth == 2:
+            if tag == "setId":
+                header["set_id"] = element.get("root")
+            elif tag == "versionNumber":
+                header["version"] = element.get("value")
+            elif tag == "effectiveTime":
+                header["effective_time"] = element.get("value")
+            elif tag == "title":
+                header["title"] = _text(element)
+        elif tag == "manufacturedProduct" and path[-1:] == ["manufacturedProduct"] and product is None:
+            product = _product(element)
+        elif tag == "section":
+            code = element.find(f"{V3}code")
+            key = SECTION_CODES.get(code.get("code", "")) if code is not None else None
+            if key and key not in sections:
+                text = _text(element)
+                if text:
+                    sections[key] = text
+            if path[-2:] == ["structuredBody", "component"]:
+                # Nested sections were read as they ended; drop this subtree before the next one
+                element.clear()
+
+    if not header.get("set_id"):
+        return None
+    version = header.get("version")
+    return SPLDocument(
+        set_id=header["set_id"],
+        version=int(version) if version and version.isdigit() else 0,
+        title=header.get("title"),
+        effective_time=header.get("effective_time"),
+        sections=sections,
+        **(product or {}),
+    )
+
+
+def iter_release_documents(path: str | os.PathLike) -> Iterator[SPLDocument]:
+    """Yield every SPL in a release zip, whether nested in per-document zips or stored directly."""
+
+    with zipfile.ZipFile(path) as release:
+        for member in release.infolist():
+            if member.filename.endswith(".zip"):
+                # One document's zip (XML plus images) is small enough to open from memory
+                with zipfile.ZipFile(io.BytesIO(release.read(member))) as nested:
+                    for inner in nested.namelist():
+                        if inner.endswith(".xml"):
+                            yield from _parse_member(nested, inner)
+            elif member.filename.endswith(".xml"):
+                yield from _parse_member(release, member.filename)
+
+
+def _parse_member(archive: zipfile.ZipFile, name: str) -> Iterator[SPLDocument]:
+    try:
+        with archive.open(name) as stream:
+            document = parse_spl(stream)
+    except ElementTree.ParseError as exc:
+        LOGGER.warning("Skipping unreadable SPL %s: %s", name, exc)
+        return
+    if document is not None:
+        yield document
+
+
+@dataclass(frozen=True)
+class DailyMedLoadStats:
+    file_name: str
+    documents: int
+    stored: int
+
+
+def _row(document: SPLDocument) -> Dict[str, Any]:
+    return {
+        "set_id": document.set_id,
+        "version": document.version,
+        "title": document.title,
+        "product_name": document.product_name,
+        "name_key": name_key(document.product_name) if document.product_name else None,
+        "generic_name": document.generic_name,
+        "generic_key": name_key(document.generic_name) if document.generic_name else None,
+        "strength": document.strength,
+        "dosage_form": document.dosage_form,
+        "effective_time": document.effective_time,
+        "sections": json.dumps(document.sections, ensure_ascii=False),
+    }
+
+
+def load_dailymed_release(session: Session, path: str | os.PathLike) -> DailyMedLoadStats:
+    """Upsert the SPLs of a full or incremental release, keeping the newest version of each set id."""
+
+    batch: Dict[str, Dict[str, Any]] = {}
+    documents = stored = 0
+
+    def flush() -> int:
+        existing = dict(
+            session.execute(select(DailyMedSPL.set_id, DailyMedSPL.version).where(DailyMedSPL.set_id.in_(batch))).all()
+        )
+        rows = [row for set_id, row in batch.items() if row["version"] >= existing.get(set_id, -1)]
+        if rows:
+            session.execute(delete(DailyMedSPL).where(DailyMedSPL.set_id.in_([row["set_id"] for row in rows])))
+            session.execute(insert(DailyMedSPL.__table__), rows)
+        batch.clear()
+        return len(rows)
+
+    for document in iter_release_documents(path):
+        documents += 1
+        current = batch.get(document.set_id)
+        if current is None or document.version >= current["version"]:
+            batch[document.set_id] = _row(document)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            stored += flush()
+    if batch:
+        stored += flush()
+
+    file_name = Path(path).name
+    session.add(DailyMedRelease(file_name=file_name, documents=documents))
+    session.commit()
+    return DailyMedLoadStats(file_name, documents, stored)
+
+
+class LocalDailyMedResolver(DailyMedNormalizer):
+    """Answers the DailyMed lookups used by the sync job from the loaded SPL releases.
+
+    Names match an SPL's product or generic name case-insensitively; the most recently
+    effective label wins, as DailyMed lists the current label first.
+    """
+
+    def __init__(self, session: Session, base_url: str = "https://dailymed.nlm.nih.gov/dailymed/services/v2") -> None:
+        # base_url only feeds the source_url recorded on provenance and normalized drugs
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+
+    @staticmethod
+    def is_loaded(session: Session) -> bool:
+        return session.execute(select(DailyMedRelease.id).limit(1)).first() is not None
+
+    def _matching(self, drug_name: str, limit: int) -> List[DailyMedSPL]:
+        key = name_key(drug_name)
+        return (
+            self.session.execute(
+                select(DailyMedSPL)
+                .where(or_(DailyMedSPL.name_key == key, DailyMedSPL.generic_key == key))
+                .order_by(DailyMedSPL.effective_time.desc().nulls_last(), DailyMedSPL.set_id)
+                .limit(limit)
+            )
+            .scalars()
+            .all()
+        )
+
+    @staticmethod
+    def _details(spl: DailyMedSPL) -> Dict[str, Any]:
+        sections = json.loads(spl.sections or "{}")
+        # Labels in the newer PLR format fold warnings into "Warnings and Precautions"
+        sections.setdefault("warnings", sections.get("warnings_and_precautions"))
+        return {
+            "setid": spl.set_id,
+            "title": spl.title,
+            "version": spl.version,
+            "generic_name": spl.generic_name,
+            "strength": spl.strength,
+            "dosage_form": spl.dosage_form,
+            "effective_time": spl.effective_time,
+            **sections,
+        }
+
+    def search_spls(self, drug_name: str, limit: int = 100) -> Dict[str, Any]:
+        return {
+            "data": [
+                {"setid": spl.set_id, "title": spl.title, "spl_version": spl.version, "published_date": spl.effective_time}
+                for spl in self._matching(drug_name, limit)
+            ]
+        }
+
+    def get_spl_details(self, set_id: str) -> Dict[str, Any]:
+        spl = self.session.get(DailyMedSPL, set_id)
+        return {"data": [self._details(spl)]} if spl is not None else {}
+
+    def safe_get_spl(self, drug_name: str) -> Optional[Dict[str, Any]]:
+        matches = self._matching(drug_name, 1)
+        return {"data": [self._details(matches[0])]} if matches else None
+
+
+class AsyncLocalDailyMedResolver:
+    """Awaitable facade over :class:`LocalDailyMedResolver` for the asyncio sync pipeline."""
+
+    def __init__(self, resolver: LocalDailyMedResolver) -> None:
+        self.resolver = resolver
+
+    async def __aenter__(self) -> "AsyncLocalDailyMedResolver":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def safe_get_spl(self, drug_name: str) -> Optional[Dict[str, Any]]:
+        return self.resolver.safe_get_spl(drug_name)
+
+    def normalize_spl_to_drug(self, spl_response: Dict[str, Any]) -> DrugMaster:
+        return self.resolver.normalize_spl_to_drug(spl_response)
+
+    def create_provenance(self, entity_type: str, spl_response: Dict[str, Any]) -> Provenance:
+        return self.resolver.create_provenance(entity_type, spl_response)
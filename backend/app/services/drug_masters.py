@@ -0,0 +1,42 @@
+"""Concurrency-safe writes to the master catalog, shared by the admin import and the external sync."""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugMaster
+from app.services.catalog_projection import MASTER_FIELDS
+
+
+def dialect_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def upsert_masters_by_rx_cui(db: Session, rows: List[dict], overwrite: bool = True) -> Dict[str, int]:
+    """Insert or update masters keyed by ``rx_cui`` in one statement; returns ``rx_cui -> id``.
+
+    With ``overwrite`` non-null incoming values replace stored ones; without it they only fill
+    fields that are still empty. ``rows`` must have distinct ``rx_cui`` values. Writers racing
+    to insert the same ``rx_cui`` all end up on the one row instead of failing on the unique
+    constraint.
+    """
+
+    table = DrugMaster.__table__
+    stmt = dialect_insert(db)(table)
+    assignments = {
+        name: func.coalesce(stmt.excluded[name], table.c[name])
+        if overwrite
+        else func.coalesce(table.c[name], stmt.excluded[name])
+        for name in MASTER_FIELDS
+        if name != "rx_cui"
+    }
+    assignments["last_updated"] = stmt.excluded.last_updated
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.rx_cui], set_=assignments)
+    result = db.execute(stmt.returning(table.c.rx_cui, table.c.id), rows)
+    return {rx_cui: master_id for rx_cui, master_id in result}
@@ -0,0 +1,323 @@
+"""Offline matcher that scores unmatched Kuwait drugs against every ``DrugMaster`` row.
+
+Names are normalized (case, Arabic variants, strength and dosage-form tokens removed) and
+blocked by generic-name token so each local drug is only compared with masters sharing a
+meaningful token. Candidates are scored on trigram similarity of the names, agreement of the
+parsed strengths and the canonical dosage form, and the best ``top_k`` per drug are written to
+``drug_match_candidates`` in one batch for pharmacist review.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import multiprocessing
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugLocalKuwait, DrugMatchCandidate, DrugMaster
+from app.services.drug_search import normalize_text
+
+LOGGER = logging.getLogger(__name__)
+
+_STRENGTH = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mg|mcg|µg|ug|g|ml|iu|units?|%)(?![a-z])")
+_UNIT_SCALE = {
+    "g": ("mg", 1000.0),
+    "mcg": ("mg", 0.001),
+    "µg": ("mg", 0.001),
+    "ug": ("mg", 0.001),
+    "unit": ("iu", 1.0),
+    "units": ("iu", 1.0),
+}
+
+DOSAGE_FORM_SYNONYMS: Dict[str, str] = {
+    "tab": "tablet",
+    "tabs": "tablet",
+    "tablet": "tablet",
+    "tablets": "tablet",
+    "حبوب": "tablet",
+    "اقراص": "tablet",
+    "cap": "capsule",
+    "caps": "capsule",
+    "capsule": "capsule",
+    "capsules": "capsule",
+    "كبسول": "capsule",
+    "كبسولات": "capsule",
+    "syr": "syrup",
+    "syrup": "syrup",
+    "شراب": "syrup",
+    "susp": "suspension",
+    "suspension": "suspension",
+    "معلق": "suspension",
+    "inj": "injection",
+    "injection": "injection",
+    "حقن": "injection",
+    "حقنه": "injection",
+    "inh": "inhaler",
+    "inhaler": "inhaler",
+    "بخاخ": "inhaler",
+    "cream": "cream",
+    "كريم": "cream",
+    "oint": "ointment",
+    "ointment": "ointment",
+    "مرهم": "ointment",
+    "drops": "drops",
+    "قطره": "drops",
+    "sol": "solution",
+    "solution": "solution",
+    "محلول": "solution",
+}
+_FILLER_TOKENS = frozenset({"film", "coated", "oral", "extended", "release", "er", "sr", "xr", "مجم", "ملجم", "مغ"})
+
+MIN_NAME_SIMILARITY = 0.3
+MAX_BLOCK_SIZE = 5000
+BLOCK_PREFIX_LENGTH = 4
+NAME_WEIGHT, STRENGTH_WEIGHT, FORM_WEIGHT = 0.7, 0.2, 0.1
+
+Strengths = FrozenSet[Tuple[float, str]]
+
+
+def _fold(value: Optional[str]) -> str:
+    return unicodedata.normalize("NFKC", value).casefold() if value else ""
+
+
+def parse_strengths(value: Optional[str]) -> Strengths:
+    """Extract ``(amount, unit)`` pairs with grams and micrograms scaled to milligrams."""
+
+    parsed = set()
+    for amount, unit in _STRENGTH.findall(_fold(value)):
+        unit, scale = _UNIT_SCALE.get(unit, (unit, 1.0))
+        parsed.add((round(float(amount.replace(",", ".")) * scale, 4), unit))
+    return frozenset(parsed)
+
+
+def normalize_dosage_form(value: Optional[str]) -> Optional[str]:
+    normalized = normalize_text(value)
+    if not normalized:
+        return None
+    for token in normalized.split():
+        if token in DOSAGE_FORM_SYNONYMS:
+            return DOSAGE_FORM_SYNONYMS[token]
+    return normalized
+
+
+def normalize_generic_name(value: Optional[str]) -> str:
+    """Normalize a drug name and drop strength, dosage-form and filler tokens."""
+
+    text = normalize_text(_STRENGTH.sub(" ", _fold(value)))
+    tokens = [
+        token
+        for token in text.split()
+        if token not in DOSAGE_FORM_SYNONYMS and token not in _FILLER_TOKENS and not token.replace(".", "").isdigit()
+    ]
+    return " ".join(tokens)
+
+
+def _trigram_set(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def _jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+def _agreement(left: object, right: object) -> float:
+    if not left or not right:
+        return 0.5  # unknown on either side neither helps nor hurts
+    return 1.0 if left == right else 0.0
+
+
+def _blocking_keys(names: Iterable[str]) -> Iterator[str]:
+    for name in names:
+        for token in name.split():
+            if len(token) >= 3:
+                yield token
+                # Prefix keys keep misspelled variants ("amoxicilin") in the same block
+                yield f"{token[:BLOCK_PREFIX_LENGTH]}*"
+
+
+@dataclass(frozen=True)
+class _Profile:
+    drug_id: int
+    names: Tuple[FrozenSet[str], ...]
+    tokens: FrozenSet[str]
+    strengths: Strengths
+    dosage_form: Optional[str]
+
+
+def _profile(drug_id: int, names: Iterable[Optional[str]], strength: Optional[str], dosage_form: Optional[str]) -> _Profile:
+    normalized = [name for name in (normalize_generic_name(raw) for raw in names) if name]
+    return _Profile(
+        drug_id=drug_id,
+        names=tuple(_trigram_set(name) for name in normalized),
+        tokens=frozenset(_blocking_keys(normalized)),
+        strengths=parse_strengths(strength),
+        dosage_form=normalize_dosage_form(dosage_form),
+    )
+
+
+@dataclass(frozen=True)
+class MatchCandidate:
+    local_id: int
+    master_id: int
+    rank: int
+    confidence: float
+
+
+MasterRow = Tuple[int, Optional[str], Optional[str], Optional[str], Optional[str]]
+LocalRow = Tuple[int, Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+class BatchMatcher:
+    """Holds the blocked master profiles; one instance is built per worker process."""
+
+    def __init__(self, masters: Sequence[MasterRow]) -> None:
+        self._masters: Dict[int, _Profile] = {}
+        self._blocks: Dict[str, List[int]] = {}
+        for master_id, generic_name, trade_name_en, strength, dosage_form in masters:
+            profile = _profile(master_id, (generic_name, trade_name_en), strength, dosage_form)
+            self._masters[master_id] = profile
+            for token in profile.tokens:
+                self._blocks.setdefault(token, []).append(master_id)
+
+    def _candidates(self, local: _Profile) -> Set[int]:
+        blocks = sorted((self._blocks.get(token, []) for token in local.tokens), key=len)
+        candidates: Set[int] = set()
+        for index, block in enumerate(blocks):
+            # Very common tokens ("sodium", "acid") only widen the search when nothing rarer matched
+            if index and len(block) > MAX_BLOCK_SIZE:
+                break
+            candidates.update(block)
+        return candidates
+
+    def score(self, local: _Profile, master: _Profile) -> float:
+        name = max((_jaccard(left, right) for left in local.names for right in master.names), default=0.0)
+        if name < MIN_NAME_SIMILARITY:
+            return 0.0
+        return (
+            NAME_WEIGHT * name
+            + STRENGTH_WEIGHT * _agreement(local.strengths, master.strengths)
+            + FORM_WEIGHT * _agreement(local.dosage_form, master.dosage_form)
+        )
+
+    def match(self, locals_: Iterable[LocalRow], top_k: int, min_confidence: float) -> List[MatchCandidate]:
+        results: List[MatchCandidate] = []
+        for local_id, trade_name_ar, generic_name, strength, dosage_form in locals_:
+            local = _profile(local_id, (generic_name, trade_name_ar), strength, dosage_form)
+            scored = (
+                (self.score(local, self._masters[master_id]), master_id) for master_id in self._candidates(local)
+            )
+            best = heapq.nlargest(top_k, (item for item in scored if item[0] >= min_confidence))
+            results.extend(
+                MatchCandidate(local_id=local_id, master_id=master_id, rank=rank, confidence=round(confidence, 3))
+                for rank, (confidence, master_id) in enumerate(best, start=1)
+            )
+        return results
+
+
+_WORKER_MATCHER: Optional[BatchMatcher] = None
+
+
+def _init_worker(masters: Sequence[MasterRow]) -> None:
+    global _WORKER_MATCHER
+    _WORKER_MATCHER = BatchMatcher(masters)
+
+
+def _match_chunk(args: Tuple[Sequence[LocalRow], int, float]) -> List[MatchCandidate]:
+    chunk, top_k, min_confidence = args
+    assert _WORKER_MATCHER is not None
+    return _WORKER_MATCHER.match(chunk, top_k, min_confidence)
+
+
+def _chunks(rows: Sequence[LocalRow], size: int) -> Iterator[Sequence[LocalRow]]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def match_catalog(
+    masters: Sequence[MasterRow],
+    locals_: Sequence[LocalRow],
+    top_k: int = 3,
+    min_confidence: float = 0.5,
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+) -> List[MatchCandidate]:
+    """Score ``locals_`` against ``masters`` using a process pool sized to the machine by default."""
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # Daemonic processes (e.g. Celery prefork children) may not start a pool of their own
+        LOGGER.info("Running batch matcher in-process; pools are unavailable in daemonic workers")
+        workers = 1
+    if workers == 1 or len(locals_) <= chunk_size:
+        return BatchMatcher(masters).match(locals_, top_k, min_confidence)
+
+    results: List[MatchCandidate] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(masters,)) as pool:
+        jobs = ((chunk, top_k, min_confidence) for chunk in _chunks(locals_, chunk_size))
+        for chunk_results in pool.map(_match_chunk, jobs):
+            results.extend(chunk_results)
+    return results
+
+
+def run_batch_match(
+    session: Session,
+    top_k: int = 3,
+    min_confidence: float = 0.5,
+    workers: Optional[int] = None,
+) -> int:
+    """Replace the matcher's candidates for every unmatched local drug; returns rows written."""
+
+    masters = session.execute(
+        select(DrugMaster.id, DrugMaster.generic_name, DrugMaster.trade_name_en, DrugMaster.strength, DrugMaster.dosage_form)
+    ).all()
+    unmatched = select(
+        DrugLocalKuwait.id,
+        DrugLocalKuwait.trade_name_ar,
+        DrugLocalKuwait.generic_name,
+        DrugLocalKuwait.strength,
+        DrugLocalKuwait.dosage_form,
+    ).where(DrugLocalKuwait.matched_drug_id.is_(None))
+    locals_ = session.execute(unmatched).all()
+
+    candidates = match_catalog(
+        [tuple(row) for row in masters],
+        [tuple(row) for row in locals_],
+        top_k=top_k,
+        min_confidence=min_confidence,
+        workers=workers,
+    )
+
+    session.execute(
+        delete(DrugMatchCandidate)
+        .where(DrugMatchCandidate.method == "batch_matcher")
+        .where(DrugMatchCandidate.local_id.in_(select(DrugLocalKuwait.id).where(DrugLocalKuwait.matched_drug_id.is_(None))))
+    )
+    if candidates:
+        session.execute(
+            insert(DrugMatchCandidate),
+            [
+                {
+                    "local_id": candidate.local_id,
+                    "master_id": candidate.master_id,
+                    "rank": candidate.rank,
+                    "confidence": Decimal(str(candidate.confidence)),
+                    "method": "batch_matcher",
+                }
+                for candidate in candidates
+            ],
+        )
+    session.commit()
+    return len(candidates)
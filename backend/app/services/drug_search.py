@@ -0,0 +1,247 @@
+"""In-process Arabic/English name index backing ``GET /drugs/search``."""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+
+_ARABIC_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]")
+_TATWEEL = "\u0640"
+_ARABIC_FOLDS = str.maketrans(
+    {
+        "آ": "ا",  # alef with madda
+        "أ": "ا",  # alef with hamza above
+        "إ": "ا",  # alef with hamza below
+        "ٱ": "ا",  # alef wasla
+        "ى": "ي",  # alef maksura -> ya
+        "ئ": "ي",  # ya with hamza
+        "ؤ": "و",  # waw with hamza
+        "ة": "ه",  # ta marbuta -> ha
+    }
+)
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+MIN_TRIGRAM_SIMILARITY = 0.5
+REFRESH_INTERVAL_SECONDS = 30.0
+# Rows committed by long transactions (the sync job) can carry timestamps older than the watermark.
+REFRESH_OVERLAP = timedelta(minutes=15)
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Fold Arabic orthographic variants and Latin case so spellings compare equal."""
+
+    if not value:
+        return ""
+    text = unicodedata.normalize("NFKC", value)
+    text = _ARABIC_DIACRITICS.sub("", text).replace(_TATWEEL, "")
+    text = text.translate(_ARABIC_FOLDS).casefold()
+    return " ".join(_NON_WORD.sub(" ", text).replace("_", " ").split())
+
+
+def _trigrams(text: str, pad_end: bool = True) -> Set[str]:
+    padded = f"  {text} " if pad_end else f"  {text}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class _Document:
+    text: str
+    tokens: Set[str]
+    trigrams: Set[str]
+    visible: bool
+
+
+class DrugSearchIndex:
+    """Token-prefix plus trigram index over local trade names, generic names and master English names.
+
+    The index is loaded lazily on the first search of each worker and kept current by re-indexing
+    only rows whose ``extracted_at`` or matched master ``last_updated`` moved past the watermark.
+    """
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._documents: Dict[int, _Document] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._sorted_tokens: List[str] = []
+        self._trigram_postings: Dict[str, Set[int]] = {}
+        self._loaded = False
+        self._watermark: Optional[datetime] = None
+        self._last_refresh = 0.0
+
+    # Maintenance -----------------------------------------------------------
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+            self._postings.clear()
+            self._sorted_tokens.clear()
+            self._trigram_postings.clear()
+            self._loaded = False
+            self._watermark = None
+            self._last_refresh = 0.0
+
+    def ensure_current(self, db: Session) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._index_rows(db, None)
+                self._sorted_tokens = sorted(self._postings)
+                self._loaded = True
+            elif time.monotonic() - self._last_refresh >= self.refresh_interval:
+                since = self._watermark - REFRESH_OVERLAP if self._watermark else None
+                self._index_rows(db, since)
+
+    def refresh_rows(self, db: Session, drug_ids: Iterable[int]) -> None:
+        """Re-index specific local drugs, dropping the ones that no longer exist."""
+
+        ids = list(drug_ids)
+        with self._lock:
+            if not self._loaded or not ids:
+                return
+            found = self._index_rows(db, None, ids)
+            for drug_id in set(ids) - found:
+                document = self._documents.get(drug_id)
+                if document is not None:
+                    self._remove(drug_id, document)
+
+    def _index_rows(self, db: Session, since: Optional[datetime], ids: Optional[List[int]] = None) -> Set[int]:
+        stmt = select(
+            DrugLocalKuwait.id,
+            DrugLocalKuwait.trade_name_ar,
+            DrugLocalKuwait.generic_name,
+            DrugLocalKuwait.matched_drug_id,
+            DrugMaster.trade_name_en,
+            DrugMaster.verified_status,
+            DrugLocalKuwait.extracted_at,
+            DrugMaster.last_updated,
+        ).outerjoin(DrugMaster, DrugMaster.id == DrugLocalKuwait.matched_drug_id)
+        if ids is not None:
+            stmt = stmt.where(DrugLocalKuwait.id.in_(ids))
+        elif since is not None:
+            stmt = stmt.where(or_(DrugLocalKuwait.extracted_at > since, DrugMaster.last_updated > since))
+
+        indexed: Set[int] = set()
+        for row in db.execute(stmt):
+            indexed.add(row.id)
+            visible = row.matched_drug_id is None or row.verified_status == "verified"
+            self._put(row.id, (row.trade_name_ar, row.generic_name, row.trade_name_en), visible)
+            for stamp in (row.extracted_at, row.last_updated):
+                if stamp is not None and (self._watermark is None or stamp > self._watermark):
+                    self._watermark = stamp
+        self._last_refresh = time.monotonic()
+        return indexed
+
+    def _put(self, drug_id: int, names: Iterable[Optional[str]], visible: bool) -> None:
+        text = " ".join(filter(None, (normalize_text(name) for name in names)))
+        existing = self._documents.get(drug_id)
+        if existing is not None:
+            if existing.text == text:
+                existing.visible = visible
+                return
+            self._remove(drug_id, existing)
+
+        document = _Document(text=text, tokens=set(text.split()), trigrams=_trigrams(text), visible=visible)
+        self._documents[drug_id] = document
+        for token in document.tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                if self._loaded:  # the initial load sorts all tokens once at the end
+                    bisect.insort(self._sorted_tokens, token)
+            postings.add(drug_id)
+        for trigram in document.trigrams:
+            self._trigram_postings.setdefault(trigram, set()).add(drug_id)
+
+    def _remove(self, drug_id: int, document: _Document) -> None:
+        for token in document.tokens:
+            postings = self._postings[token]
+            postings.discard(drug_id)
+            if not postings:
+                del self._postings[token]
+                del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+        for trigram in document.trigrams:
+            postings = self._trigram_postings[trigram]
+            postings.discard(drug_id)
+            if not postings:
+                del self._trigram_postings[trigram]
+        del self._documents[drug_id]
+
+    # Lookup ----------------------------------------------------------------
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        matches: Set[int] = set()
+        tokens = self._sorted_tokens
+        position = bisect.bisect_left(tokens, prefix)
+        while position < len(tokens) and tokens[position].startswith(prefix):
+            matches |= self._postings[tokens[position]]
+            position += 1
+        return matches
+
+    def _prefix_rank(self, drug_id: int, normalized: str) -> tuple:
+        text = self._documents[drug_id].text
+        return (not text.startswith(normalized), len(text), drug_id)
+
+    def search(self, query: str, limit: int = 20) -> List[int]:
+        """Return visible drug ids ranked by prefix match first, then trigram similarity."""
+
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+
+        with self._lock:
+            prefix_hits: Optional[Set[int]] = None
+            for token in normalized.split():
+                matches = self._prefix_matches(token)
+                prefix_hits = matches if prefix_hits is None else prefix_hits & matches
+                if not prefix_hits:
+                    break
+            ranked = heapq.nsmallest(
+                limit,
+                (drug_id for drug_id in prefix_hits or () if self._documents[drug_id].visible),
+                key=lambda drug_id: self._prefix_rank(drug_id, normalized),
+            )
+            if len(ranked) >= limit or len(normalized) < 3:
+                return ranked
+
+            return ranked + self._trigram_matches(normalized, limit - len(ranked), set(ranked))
+
+    def _trigram_matches(self, normalized: str, limit: int, exclude: Set[int]) -> List[int]:
+        query_trigrams = sorted(
+            _trigrams(normalized, pad_end=False),
+            key=lambda trigram: len(self._trigram_postings.get(trigram, ())),
+        )
+        required = math.ceil(len(query_trigrams) * MIN_TRIGRAM_SIMILARITY)
+        # A document sharing `required` trigrams must contain one of the rarest
+        # len - required + 1 of them, so only those postings produce candidates.
+        candidates: Set[int] = set()
+        for trigram in query_trigrams[: len(query_trigrams) - required + 1]:
+            candidates |= self._trigram_postings.get(trigram, set())
+
+        scored = []
+        for drug_id in candidates - exclude:
+            document = self._documents[drug_id]
+            if not document.visible:
+                continue
+            hits = sum(1 for trigram in query_trigrams if trigram in document.trigrams)
+            if hits >= required:
+                scored.append((-hits, len(document.text), drug_id))
+        return [drug_id for *_, drug_id in heapq.nsmallest(limit, scored)]
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+drug_search_index = DrugSearchIndex()
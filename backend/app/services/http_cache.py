@@ -0,0 +1,206 @@
+"""Persistent response cache shared by the external API clients across runs and workers.
+
+Entries are JSON payloads keyed by method, absolute URL and sorted query parameters. Each
+client supplies the TTL per endpoint, so slow-moving resources (RxNorm versions, concept
+properties, SPL documents) survive between daily runs while searches expire sooner.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Pattern, Sequence, Tuple
+from urllib.parse import urlencode
+
+from app.core.config import get_settings
+
+TTLRule = Tuple[Pattern[str], int]
+
+HOUR = 3600
+DAY = 24 * HOUR
+EVICTION_INTERVAL = 100
+
+
+def ttl_rules(*rules: Tuple[str, int]) -> Tuple[TTLRule, ...]:
+    return tuple((re.compile(pattern), ttl) for pattern, ttl in rules)
+
+
+def endpoint_ttl(rules: Sequence[TTLRule], path: str, default: int) -> int:
+    for pattern, ttl in rules:
+        if pattern.fullmatch(path):
+            return ttl
+    return default
+
+
+def response_cache_key(method: str, base_url: str, path: str, params: Optional[Dict[str, Any]]) -> str:
+    query = urlencode(sorted((params or {}).items()))
+    return f"{method.upper()} {base_url}{path}?{query}"
+
+
+class ResponseCache(ABC):
+    """Interface for response caches; implementations must be safe to share between threads."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached payload, or ``None`` when it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store ``value`` for ``ttl`` seconds."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored entries, expired ones included until evicted."""
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": len(self),
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with per-entry expiry; useful for tests and single-run scripts."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            self.writes += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """File-backed LRU cache that every worker process on the host can share.
+
+    SQLite in WAL mode handles the cross-process locking; each thread keeps its own
+    connection. Reads bump ``accessed_at`` so eviction drops the least recently used rows
+    once ``max_entries`` is exceeded, after first dropping anything already expired.
+    """
+
+    def __init__(self, path: str | os.PathLike, max_entries: int = 50_000) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        now = time.time()
+        with self._lock:
+            self.writes += 1
+            evict = self.writes % EVICTION_INTERVAL == 0
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            if evict:
+                self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        # Checked every EVICTION_INTERVAL writes, so the table may briefly overshoot max_entries
+        evicted = connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        evicted += connection.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+@lru_cache
+def shared_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured by ``HTTP_CACHE_PATH``; an empty path disables it."""
+
+    settings = get_settings()
+    if not settings.http_cache_path:
+        return None
+    return SQLiteResponseCache(settings.http_cache_path, max_entries=settings.http_cache_max_entries)
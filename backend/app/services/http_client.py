@@ -0,0 +1,202 @@
+"""Shared HTTP plumbing for the synchronous and asyncio external API clients."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Sequence, Tuple, TypeVar
+
+import httpx
+from cachetools import TTLCache
+
+from app.services.http_cache import ResponseCache, TTLRule, endpoint_ttl, response_cache_key
+from app.services.http_resilience import AsyncResilientTransport, ResilientTransport
+from app.services.sync_metrics import lookup_cache_hit, lookup_request, record_cache, record_request
+
+USER_AGENT = "moh-medication-app/1.0"
+
+T = TypeVar("T")
+
+
+def cache_key(path: str, params: Optional[Dict[str, Any]]) -> Tuple[Hashable, ...]:
+    return (path, tuple(sorted((params or {}).items())))
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent awaits for the same key onto one underlying call.
+
+    Callers arriving while a call for their key is running share its result (or exception).
+    With ``remember`` the finished task is kept, so later callers reuse it as well; that is
+    how one sync run makes each distinct request once. Waiters are shielded, so cancelling one
+    caller does not cancel the call the others are waiting on.
+    """
+
+    def __init__(self, remember: bool = False) -> None:
+        self.remember = remember
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            if not self.remember:
+                task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class _ResponseCaching:
+    """Looks responses up in the optional persistent :class:`ResponseCache` before the network.
+
+    Subclasses list ``CACHE_TTLS`` rules (path regex, seconds) for endpoints whose data
+    changes more slowly than ``cache_ttl_seconds``, and name their ``UPSTREAM`` so they share
+    its rate limit and circuit breaker (see :mod:`app.services.http_resilience`).
+    """
+
+    CACHE_TTLS: Sequence[TTLRule] = ()
+    UPSTREAM = "default"
+
+    base_url: str
+    cache_ttl_seconds: int
+    response_cache: Optional[ResponseCache]
+
+    def _cached_response(self, path: str, params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(response_cache_key("GET", self.base_url, path, params))
+        record_cache(self.UPSTREAM, "persistent", cached is not None)
+        return cached
+
+    def _store_response(self, path: str, params: Optional[Dict[str, Any]], payload: Dict[str, Any]) -> None:
+        if self.response_cache is not None:
+            ttl = endpoint_ttl(self.CACHE_TTLS, path, self.cache_ttl_seconds)
+            self.response_cache.set(response_cache_key("GET", self.base_url, path, params), payload, ttl)
+
+
+class JSONClient(_ResponseCaching):
+    """``httpx.Client`` wrapper; per-method ``@cachedmethod`` caches use ``self._cache``.
+
+    Without an explicit ``transport`` requests go through :class:`ResilientTransport`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        cache_maxsize: int = 256,
+        transport: Optional[httpx.BaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.response_cache = response_cache
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            headers={"User-Agent": USER_AGENT},
+            transport=transport or ResilientTransport(self.UPSTREAM),
+        )
+        self._cache: TTLCache = TTLCache(maxsize=cache_maxsize, ttl=cache_ttl_seconds)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
+        self.close()
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        cached = self._cached_response(path, params)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        try:
+            response = self._client.get(path, params=params)
+        except httpx.HTTPError:
+            record_request(self.UPSTREAM, path, started, "error")
+            raise
+        record_request(self.UPSTREAM, path, started, response.status_code)
+        response.raise_for_status()
+        payload = response.json()
+        self._store_response(path, params, payload)
+        return payload
+
+
+class AsyncJSONClient(_ResponseCaching):
+    """``httpx.AsyncClient`` wrapper with a response TTL cache and a per-upstream concurrency cap.
+
+    Each client instance owns its semaphore, so one instance per upstream limits how many
+    requests are in flight against that upstream regardless of how many lookups run at once.
+    Identical requests issued while one is already in flight wait for that response instead
+    of going out again. Without an explicit ``transport`` requests go through
+    :class:`AsyncResilientTransport`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        cache_maxsize: int = 256,
+        max_concurrency: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.response_cache = response_cache
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            headers={"User-Agent": USER_AGENT},
+            transport=transport or AsyncResilientTransport(self.UPSTREAM),
+        )
+        self._cache: TTLCache = TTLCache(maxsize=cache_maxsize, ttl=cache_ttl_seconds)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: SingleFlight[Dict[str, Any]] = SingleFlight()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = cache_key(path, params)
+        cached = self._cache.get(key)
+        record_cache(self.UPSTREAM, "memory", cached is not None)
+        if cached is None:
+            cached = self._cached_response(path, params)
+        if cached is not None:
+            lookup_cache_hit()
+            self._cache[key] = cached
+            return cached
+        return await self._in_flight.do(key, lambda: self._fetch(key, path, params))
+
+    async def _fetch(self, key: Hashable, path: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        async with self._semaphore:
+            # Timed inside the semaphore so waiting for a slot is not counted as latency
+            started = time.perf_counter()
+            try:
+                with lookup_request():
+                    response = await self._client.get(path, params=params)
+            except httpx.HTTPError:
+                record_request(self.UPSTREAM, path, started, "error")
+                raise
+            record_request(self.UPSTREAM, path, started, response.status_code)
+        response.raise_for_status()
+        payload = response.json()
+        self._cache[key] = payload
+        self._store_response(path, params, payload)
+        return payload
@@ -0,0 +1,308 @@
+"""Rate limiting, retries and circuit breaking for the external drug APIs.
+
+Both transports wrap a real httpx transport and are installed by :class:`JSONClient` and
+:class:`AsyncJSONClient`. The token bucket and circuit breaker for an upstream are shared by
+every client in the process, so concurrent lookups draw from one allowance per API. A
+``Retry-After`` answer pauses the whole bucket rather than just the request that got it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.services.sync_metrics import lookup_paused
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests_per_second: float
+    burst: int
+
+
+# RxNav allows 20 requests/second per IP and openFDA 240/minute per IP. DailyMed does not
+# publish a figure, so it gets a conservative share of the NLM allowance.
+UPSTREAM_LIMITS: Dict[str, RateLimit] = {
+    "rxnorm": RateLimit(requests_per_second=20.0, burst=20),
+    "openfda": RateLimit(requests_per_second=4.0, burst=4),
+    "dailymed": RateLimit(requests_per_second=5.0, burst=5),
+}
+DEFAULT_LIMIT = RateLimit(requests_per_second=5.0, burst=5)
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without touching the network while an upstream's breaker is open."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and sleep for the returned delay."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Withhold tokens for ``seconds``, e.g. after the upstream answered with Retry-After."""
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets one probe through after ``reset_timeout``."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_request(self, upstream: str) -> bool:
+        """Admit a request or raise :class:`CircuitOpenError`; returns ``True`` for the half-open probe.
+
+        The caller must :meth:`release` a probe once it is done, whatever its outcome.
+        """
+
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{upstream} circuit is open")
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """End a probe that finished without recording an outcome, e.g. cancelled or crashed.
+
+        The breaker stays open and the next request after the timeout probes again.
+        """
+
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    # Longest Retry-After worth holding a request open for; beyond it the answer is returned
+    retry_after_budget: float = 60.0
+
+    def delay(self, attempt: int) -> float:
+        # Full jitter keeps concurrent retries from hitting the upstream in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def upstream_bucket(upstream: str) -> TokenBucket:
+    with _registry_lock:
+        if upstream not in _buckets:
+            limit = UPSTREAM_LIMITS.get(upstream, DEFAULT_LIMIT)
+            _buckets[upstream] = TokenBucket(limit.requests_per_second, limit.burst)
+        return _buckets[upstream]
+
+
+def upstream_breaker(upstream: str) -> CircuitBreaker:
+    with _registry_lock:
+        return _breakers.setdefault(upstream, CircuitBreaker())
+
+
+class _ResilienceMixin:
+    def __init__(
+        self,
+        upstream: str,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        self.upstream = upstream
+        self.bucket = bucket or upstream_bucket(upstream)
+        self.breaker = breaker or upstream_breaker(upstream)
+        self.retry = retry or RetryPolicy()
+
+    def _attempts(self, request: httpx.Request) -> int:
+        return self.retry.max_attempts if request.method in IDEMPOTENT_METHODS else 1
+
+    def _should_retry(self, response: httpx.Response) -> bool:
+        """Record the outcome of ``response`` and report whether it is worth retrying.
+
+        A ``Retry-After`` always pauses the upstream for its full length; when that is longer
+        than the policy's ``retry_after_budget`` the response is handed back instead.
+        """
+
+        if response.status_code >= 500 and response.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            # Throttling means the upstream is up, so a 429 also closes the breaker
+            self.breaker.record_success()
+        if response.status_code not in RETRY_STATUSES:
+            return False
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            # The next reserve() waits this out, and so does every other caller of the upstream
+            self.bucket.pause(retry_after)
+            if retry_after > self.retry.retry_after_budget:
+                return False
+        return True
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and parse_retry_after(response.headers.get("Retry-After")) is not None:
+            return 0.0  # already applied to the bucket by _should_retry
+        return self.retry.delay(attempt)
+
+
+class ResilientTransport(_ResilienceMixin, httpx.BaseTransport):
+    """Synchronous transport applying the upstream's rate limit, retries and circuit breaker."""
+
+    def __init__(
+        self,
+        upstream: str,
+        inner: Optional[httpx.BaseTransport] = None,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        super().__init__(upstream, bucket, breaker, retry)
+        self.inner = inner or httpx.HTTPTransport()
+        self._sleep = sleep
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempts = self._attempts(request)
+        for attempt in range(attempts):
+            probe = self.breaker.before_request(self.upstream)
+            try:
+                delay = self.bucket.reserve()
+                if delay:
+                    self._sleep(delay)
+                try:
+                    response = self.inner.handle_request(request)
+                except httpx.TransportError:
+                    self.breaker.record_failure()
+                    if attempt + 1 == attempts:
+                        raise
+                    self._sleep(self._backoff(attempt))
+                    continue
+                if not self._should_retry(response) or attempt + 1 == attempts:
+                    return response
+                response.close()
+                self._sleep(self._backoff(attempt, response))
+            finally:
+                if probe:
+                    self.breaker.release()
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncResilientTransport(_ResilienceMixin, httpx.AsyncBaseTransport):
+    """Asyncio counterpart of :class:`ResilientTransport`."""
+
+    def __init__(
+        self,
+        upstream: str,
+        inner: Optional[httpx.AsyncBaseTransport] = None,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        super().__init__(upstream, bucket, breaker, retry)
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self._sleep = sleep
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempts = self._attempts(request)
+        for attempt in range(attempts):
+            probe = self.breaker.before_request(self.upstream)
+            try:
+                delay = self.bucket.reserve()
+                if delay:
+                    with lookup_paused():
+                        await self._sleep(delay)
+                try:
+                    response = await self.inner.handle_async_request(request)
+                except httpx.TransportError:
+                    self.breaker.record_failure()
+                    if attempt + 1 == attempts:
+                        raise
+                    await self._sleep(self._backoff(attempt))
+                    continue
+                if not self._should_retry(response) or attempt + 1 == attempts:
+                    return response
+                await response.aclose()
+                await self._sleep(self._backoff(attempt, response))
+            finally:
+                if probe:
+                    self.breaker.release()
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
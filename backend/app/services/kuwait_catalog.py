@@ -0,0 +1,212 @@
+"""Streaming loader for the MOH Kuwait drug catalog exports (CSV or XLSX).
+
+Rows are read one at a time, their headers mapped onto ``DrugLocalKuwait`` columns whatever
+language or spelling the export uses, and their values normalized. Every existing
+``moh_code`` is loaded once with its current fields, so each row is classified as new,
+changed or unchanged without a query, and inserts and updates go out in executemany
+batches. Memory is bounded by the existing key set and one batch, not by the file.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugLocalKuwait
+from app.services.drug_search import normalize_text
+
+LOGGER = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 1000
+FIELDS: Tuple[str, ...] = ("trade_name_ar", "generic_name", "strength", "dosage_form")
+
+# Normalized header spellings seen in MOH exports, per DrugLocalKuwait column
+HEADER_ALIASES: Dict[str, str] = {
+    alias: column
+    for column, aliases in {
+        "moh_code": ("moh code", "code", "item code", "drug code", "رمز الوزاره", "الرمز", "رقم الصنف"),
+        "trade_name_ar": (
+            "trade name ar",
+            "trade name arabic",
+            "arabic name",
+            "trade name",
+            "الاسم التجاري",
+            "الاسم التجاري عربي",
+        ),
+        "generic_name": ("generic name", "generic", "scientific name", "الاسم العلمي", "الماده الفعاله"),
+        "strength": ("strength", "concentration", "التركيز", "القوه"),
+        "dosage_form": ("dosage form", "form", "pharmaceutical form", "الشكل الصيدلاني", "الشكل"),
+    }.items()
+    for alias in aliases
+}
+
+Fingerprint = Tuple[Optional[str], ...]
+
+_TABLE = DrugLocalKuwait.__table__
+_UPDATE_BY_ID = (
+    update(_TABLE)
+    .where(_TABLE.c.id == bindparam("local_id"))
+    .values({column: bindparam(column) for column in (*FIELDS, "source_file", "extracted_at")})
+)
+
+
+@dataclass(frozen=True)
+class KuwaitCatalogLoadStats:
+    file_name: str
+    rows: int
+    new: int
+    changed: int
+    unchanged: int
+    # Rows without a moh_code
+    skipped: int
+    # Repeats of a moh_code already seen earlier in the same file; the first one wins
+    duplicates: int
+
+
+def _columns(header: Sequence[Any]) -> List[Optional[str]]:
+    columns = [HEADER_ALIASES.get(normalize_text(str(name))) if name is not None else None for name in header]
+    if "moh_code" not in columns:
+        raise ValueError(f"No MOH code column among headers {list(header)}")
+    return columns
+
+
+def _records(rows: Iterator[Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    for header in rows:
+        if any(cell not in (None, "") for cell in header):
+            break
+    else:
+        return
+    columns = _columns(header)
+    for row in rows:
+        yield {column: value for column, value in zip(columns, row) if column}
+
+
+def iter_csv_records(path: str | os.PathLike) -> Iterator[Dict[str, Any]]:
+    # utf-8-sig drops the byte-order mark Excel writes at the start of exported CSVs
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        yield from _records(csv.reader(handle))
+
+
+def iter_xlsx_records(path: str | os.PathLike) -> Iterator[Dict[str, Any]]:
+    # Imported before the generator starts so a missing openpyxl fails the call, not the first row
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise RuntimeError(
+            f"Reading XLSX catalogs such as {path} requires openpyxl (pip install openpyxl); "
+            "export the catalog as CSV or install it"
+        ) from exc
+
+    def records() -> Iterator[Dict[str, Any]]:
+        # read_only streams rows from the sheet XML instead of building the whole workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from _records(workbook.worksheets[0].iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    return records()
+
+
+def iter_catalog_records(path: str | os.PathLike) -> Iterator[Dict[str, Any]]:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return iter_csv_records(path)
+    if suffix in (".xlsx", ".xlsm"):
+        return iter_xlsx_records(path)
+    raise ValueError(f"Unsupported catalog file type: {path}")
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet cells turn numeric codes into floats
+    text = " ".join(unicodedata.normalize("NFKC", str(value)).split())
+    return text or None
+
+
+def normalize_record(record: Dict[str, Any]) -> Optional[Dict[str, Optional[str]]]:
+    """Trimmed, NFKC-normalized catalog fields; ``None`` for rows without a MOH code."""
+
+    moh_code = _clean(record.get("moh_code"))
+    if not moh_code:
+        return None
+    return {"moh_code": moh_code, **{field: _clean(record.get(field)) for field in FIELDS}}
+
+
+def _fingerprint(row: Dict[str, Optional[str]]) -> Fingerprint:
+    return tuple(row[field] for field in FIELDS)
+
+
+def load_catalog_records(
+    session: Session,
+    records: Iterable[Dict[str, Any]],
+    source_file: str,
+    batch_size: int = WRITE_BATCH_SIZE,
+) -> KuwaitCatalogLoadStats:
+    """Insert new and update changed catalog rows by ``moh_code``, then commit."""
+
+    existing: Dict[str, Tuple[int, Fingerprint]] = {
+        moh_code: (local_id, tuple(fields))
+        for local_id, moh_code, *fields in session.execute(
+            select(DrugLocalKuwait.id, DrugLocalKuwait.moh_code, *(getattr(DrugLocalKuwait, f) for f in FIELDS))
+        )
+    }
+    seen = set()
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    rows = new = changed = unchanged = skipped = duplicates = 0
+    extracted_at = datetime.utcnow()
+
+    def flush() -> None:
+        if inserts:
+            session.execute(insert(_TABLE), inserts)
+            inserts.clear()
+        if updates:
+            session.execute(_UPDATE_BY_ID, updates)
+            updates.clear()
+
+    for record in records:
+        rows += 1
+        row = normalize_record(record)
+        if row is None:
+            skipped += 1
+            continue
+        moh_code = row["moh_code"]
+        if moh_code in seen:
+            duplicates += 1
+            continue
+        seen.add(moh_code)
+        current = existing.get(moh_code)
+        if current is None:
+            inserts.append({**row, "source_file": source_file, "extracted_at": extracted_at})
+            new += 1
+        elif current[1] != _fingerprint(row):
+            fields = {field: row[field] for field in FIELDS}
+            updates.append({"local_id": current[0], **fields, "source_file": source_file, "extracted_at": extracted_at})
+            changed += 1
+        else:
+            unchanged += 1
+        if len(inserts) + len(updates) >= batch_size:
+            flush()
+    flush()
+    session.commit()
+    return KuwaitCatalogLoadStats(source_file, rows, new, changed, unchanged, skipped, duplicates)
+
+
+def load_kuwait_catalog(
+    session: Session, path: str | os.PathLike, batch_size: int = WRITE_BATCH_SIZE
+) -> KuwaitCatalogLoadStats:
+    stats = load_catalog_records(session, iter_catalog_records(path), Path(path).name, batch_size)
+    LOGGER.info("Loaded Kuwait catalog %s: %s", stats.file_name, stats)
+    return stats
@@ -0,0 +1,90 @@
+"""English query names for local drugs, resolved before any external lookup.
+
+RxNorm, DailyMed and openFDA only know English names, so sending an Arabic trade name spends
+every request of a lookup on a guaranteed miss. :class:`NameResolver` turns each local drug
+into the best English query it can: a Latin trade or generic name cleaned of strength and
+dosage-form tokens, or the English name that earlier matches linked to the same Arabic name.
+Drugs with no usable English query are skipped instead of looked up.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.services.drug_matcher import normalize_generic_name
+
+_ARABIC = re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]")
+_LATIN = re.compile(r"[a-z]")
+
+
+def is_english(value: str) -> bool:
+    return bool(_LATIN.search(value)) and not _ARABIC.search(value)
+
+
+def english_query(value: Optional[str]) -> Optional[str]:
+    """``value`` without strength, dosage-form and filler tokens, if what is left is Latin."""
+
+    cleaned = normalize_generic_name(value)
+    return cleaned if cleaned and is_english(cleaned) else None
+
+
+class NameResolver:
+    """Maps local drugs to English query names using a dictionary learned from matched pairs.
+
+    The dictionary is keyed by the normalized Arabic name. When matched drugs disagree, the
+    English name most of them were linked to wins.
+    """
+
+    def __init__(self, dictionary: Optional[Dict[str, str]] = None) -> None:
+        self.dictionary: Dict[str, str] = dictionary or {}
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[Optional[str], Optional[str]]]) -> "NameResolver":
+        """Build the dictionary from ``(local name, master English name)`` pairs."""
+
+        votes: Dict[str, Counter] = {}
+        for local_name, english_name in pairs:
+            key = normalize_generic_name(local_name)
+            english = english_query(english_name)
+            if key and english and _ARABIC.search(key):
+                votes.setdefault(key, Counter())[english] += 1
+        return cls(
+            {key: min(counts.items(), key=lambda item: (-item[1], item[0]))[0] for key, counts in votes.items()}
+        )
+
+    @classmethod
+    def from_session(cls, session: Session) -> "NameResolver":
+        rows = session.execute(
+            select(
+                DrugLocalKuwait.trade_name_ar,
+                DrugLocalKuwait.generic_name,
+                DrugMaster.trade_name_en,
+                DrugMaster.generic_name,
+            ).join(DrugMaster, DrugLocalKuwait.matched_drug_id == DrugMaster.id)
+        )
+
+        def pairs() -> Iterable[Tuple[Optional[str], Optional[str]]]:
+            for trade_name_ar, local_generic, trade_name_en, master_generic in rows:
+                yield trade_name_ar, trade_name_en or master_generic
+                yield local_generic, master_generic
+
+        return cls.from_pairs(pairs())
+
+    def translate(self, value: Optional[str]) -> Optional[str]:
+        return self.dictionary.get(normalize_generic_name(value)) if value else None
+
+    def query_name(self, local: DrugLocalKuwait) -> Optional[str]:
+        """Best English query for ``local``: its own Latin names first, then learned translations."""
+
+        return (
+            english_query(local.trade_name_ar)
+            or self.translate(local.trade_name_ar)
+            or english_query(local.generic_name)
+            or self.translate(local.generic_name)
+        )
@@ -9,58 +9,24 @@ from operator import attrgetter
 from typing import Any, Dict, Optional
 
 import httpx
-from cachetools import TTLCache, cachedmethod
+from cachetools import cachedmethod
 
 from app.models.provenance import Provenance
+from app.services.http_cache import DAY, HOUR, ResponseCache, ttl_rules
+from app.services.http_client import AsyncJSONClient, JSONClient
 
 LOGGER = logging.getLogger(__name__)
 
 
-class OpenFDAClient:
-    def __init__(
-        self,
-        base_url: str = "https://api.fda.gov/drug",
-        timeout: float = 10.0,
-        cache_ttl_seconds: int = 3600,
-    ) -> None:
-        self.base_url = base_url.rstrip("/")
-        self._client = httpx.Client(
-            base_url=self.base_url,
-            timeout=timeout,
-            headers={"User-Agent": "moh-medication-app/1.0"},
-        )
-        self._cache: TTLCache = TTLCache(maxsize=256, ttl=cache_ttl_seconds)
-
-    def close(self) -> None:
-        self._client.close()
-
-    def __enter__(self) -> "OpenFDAClient":
-        return self
-
-    def __exit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
-        self.close()
-
-    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        response = self._client.get(path, params=params)
-        response.raise_for_status()
-        return response.json()
+class OpenFDANormalizer:
+    """Response normalization shared by the synchronous and asyncio openFDA clients."""
 
-    @cachedmethod(attrgetter("_cache"))
-    def get_drug_label(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
-        query = f"brand_name:{drug_name}"
-        return self._get("/label.json", params={"search": query, "limit": limit})
-
-    @cachedmethod(attrgetter("_cache"))
-    def get_drug_enforcement(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
-        query = f"product_description:{drug_name}"
-        return self._get("/enforcement.json", params={"search": query, "limit": limit})
-
-    @cachedmethod(attrgetter("_cache"))
-    def get_ndc(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
-        query = f"brand_name:{drug_name}"
-        return self._get("/ndc.json", params={"search": query, "limit": limit})
-
-    # Normalization ---------------------------------------------------------
+    UPSTREAM = "openfda"
+    # Recalls are the time-sensitive source, so enforcement entries expire within the day
+    CACHE_TTLS = ttl_rules(
+        (r"/label\.json|/ndc\.json", DAY),
+        (r"/enforcement\.json", 6 * HOUR),
+    )
 
     def create_label_provenance(self, entity_type: str, label_response: Dict[str, Any]) -> Optional[Provenance]:
         results = label_response.get("results") if label_response else None
@@ -122,6 +88,40 @@ class OpenFDAClient:
             notes=json.dumps(notes_payload, ensure_ascii=False),
         )
 
+
+class OpenFDAClient(OpenFDANormalizer, JSONClient):
+    def __init__(
+        self,
+        base_url: str = "https://api.fda.gov/drug",
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        transport: Optional[httpx.BaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        super().__init__(
+            base_url,
+            timeout,
+            cache_ttl_seconds,
+            cache_maxsize=256,
+            transport=transport,
+            response_cache=response_cache,
+        )
+
+    @cachedmethod(attrgetter("_cache"))
+    def get_drug_label(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"brand_name:{drug_name}"
+        return self._get("/label.json", params={"search": query, "limit": limit})
+
+    @cachedmethod(attrgetter("_cache"))
+    def get_drug_enforcement(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"product_description:{drug_name}"
+        return self._get("/enforcement.json", params={"search": query, "limit": limit})
+
+    @cachedmethod(attrgetter("_cache"))
+    def get_ndc(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"brand_name:{drug_name}"
+        return self._get("/ndc.json", params={"search": query, "limit": limit})
+
     # Convenience wrappers --------------------------------------------------
 
     def safe_label_lookup(self, drug_name: str) -> Optional[Provenance]:
@@ -147,3 +147,64 @@ class OpenFDAClient:
         except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
             LOGGER.warning("openFDA NDC lookup failed for %s: %s", drug_name, exc)
         return None
+
+
+class AsyncOpenFDAClient(OpenFDANormalizer, AsyncJSONClient):
+    """Asyncio variant of :class:`OpenFDAClient` for concurrent sync runs."""
+
+    def __init__(
+        self,
+        base_url: str = "https://api.fda.gov/drug",
+        timeout: float = 10.0,
+        cache_ttl_seconds: int = 3600,
+        max_concurrency: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        super().__init__(
+            base_url,
+            timeout,
+            cache_ttl_seconds,
+            cache_maxsize=256,
+            max_concurrency=max_concurrency,
+            transport=transport,
+            response_cache=response_cache,
+        )
+
+    async def get_drug_label(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"brand_name:{drug_name}"
+        return await self._get("/label.json", params={"search": query, "limit": limit})
+
+    async def get_drug_enforcement(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"product_description:{drug_name}"
+        return await self._get("/enforcement.json", params={"search": query, "limit": limit})
+
+    async def get_ndc(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        query = f"brand_name:{drug_name}"
+        return await self._get("/ndc.json", params={"search": query, "limit": limit})
+
+    # Convenience wrappers --------------------------------------------------
+
+    async def safe_label_lookup(self, drug_name: str) -> Optional[Provenance]:
+        try:
+            label = await self.get_drug_label(drug_name, limit=1)
+            return self.create_label_provenance("drug_master", label)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("openFDA label lookup failed for %s: %s", drug_name, exc)
+        return None
+
+    async def safe_enforcement_lookup(self, drug_name: str) -> Optional[Provenance]:
+        try:
+            enforcement = await self.get_drug_enforcement(drug_name, limit=1)
+            return self.create_enforcement_provenance("drug_master", enforcement)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("openFDA enforcement lookup failed for %s: %s", drug_name, exc)
+        return None
+
+    async def safe_ndc_lookup(self, drug_name: str) -> Optional[Provenance]:
+        try:
+            ndc = await self.get_ndc(drug_name, limit=1)
+            return self.create_ndc_provenance("drug_master", ndc)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("openFDA NDC lookup failed for %s: %s", drug_name, exc)
+        return None
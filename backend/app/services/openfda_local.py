@@ -0,0 +1,399 @@
+"""Local copy of the openFDA drug bulk downloads and a resolver that answers like the API.
+
+openFDA publishes each endpoint as zipped JSON partitions (``drug-label-0001-of-0012.json.zip``)
+shaped ``{"meta": {...}, "results": [...]}``. :func:`iter_json_array` decodes the ``results``
+array one record at a time, so memory stays bounded by the largest single record rather than
+the file. :func:`load_openfda_bulk` keeps the fields the provenance helpers read and indexes
+each record by brand name, generic name and product NDC. :class:`LocalOpenFDAResolver` then
+answers the lookups the sync job makes with payloads shaped like the API's.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from sqlalchemy import delete, distinct, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.openfda import OpenFDABulkFile, OpenFDAKey, OpenFDARecord
+from app.models.provenance import Provenance
+from app.services.openfda_client import AsyncOpenFDAClient, OpenFDANormalizer
+from app.services.rxnorm_local import name_key
+
+READ_SIZE = 1 << 20
+INSERT_BATCH_SIZE = 2000
+ENDPOINTS = ("label", "ndc", "enforcement")
+NAME_KINDS = ("brand", "generic")
+
+_FILE_ENDPOINT = re.compile(r"drug-(label|ndc|enforcement)-")
+_WORD = re.compile(r"\w+")
+_WHITESPACE = " \t\r\n"
+
+
+class _JSONStream:
+    """Text buffer over ``stream`` that decodes one JSON value at a time with ``raw_decode``."""
+
+    def __init__(self, stream: TextIO, read_size: int) -> None:
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(self.read_size)
+        if not chunk:
+            return False
+        # Drop everything already consumed so the buffer only ever holds the current value
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buffer) and self._fill():
+                continue  # a number at the end of the buffer may continue in the next chunk
+            self.pos = end
+            return value
+
+
+def iter_json_array(
+    stream: TextIO,
+    field: str = "results",
+    meta: Optional[Dict[str, Any]] = None,
+    read_size: int = READ_SIZE,
+) -> Iterator[Any]:
+    """Yield the items of the top-level ``field`` array of a JSON object one at a time.
+
+    The other top-level members are decoded whole and stored in ``meta`` when given.
+    """
+
+    reader = _JSONStream(stream, read_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == field:
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() != ",":
+                        reader.expect("]")
+                        break
+                    reader.pos += 1
+        else:
+            value = reader.value()
+            if meta is not None:
+                meta[key] = value
+        if reader.peek() != ",":
+            reader.expect("}")
+            return
+        reader.pos += 1
+
+
+def endpoint_for_file(path: str | os.PathLike) -> str:
+    match = _FILE_ENDPOINT.search(Path(path).name)
+    if not match:
+        raise ValueError(f"Cannot tell the openFDA endpoint of {path}; expected drug-<endpoint>-*.json.zip")
+    return match.group(1)
+
+
+def _values(value: Any) -> List[str]:
+    if not value:
+        return []
+    return [item for item in (value if isinstance(value, list) else [value]) if isinstance(item, str) and item]
+
+
+def _openfda_subset(record: Dict[str, Any]) -> Dict[str, List[str]]:
+    openfda = record.get("openfda") or {}
+    return {name: _values(openfda.get(name)) for name in ("brand_name", "generic_name", "product_ndc")}
+
+
+def _name_keys(openfda: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    keys = [("brand", name_key(value)) for value in openfda["brand_name"]]
+    keys.extend(("generic", name_key(value)) for value in openfda["generic_name"])
+    keys.extend(("ndc", value.strip()) for value in openfda["product_ndc"])
+    return keys
+
+
+Extracted = Tuple[Optional[str], Optional[str], Dict[str, Any], List[Tuple[str, str]]]
+
+
+def _extract_label(record: Dict[str, Any]) -> Extracted:
+    openfda = _openfda_subset(record)
+    payload = {
+        field: record.get(field)
+        for field in ("id", "set_id", "effective_time", "warnings", "adverse_reactions", "boxed_warning")
+    }
+    payload["openfda"] = openfda
+    return record.get("id"), record.get("effective_time"), payload, _name_keys(openfda)
+
+
+def _extract_ndc(record: Dict[str, Any]) -> Extracted:
+    payload = {
+        field: record.get(field)
+        for field in (
+            "product_id",
+            "product_ndc",
+            "brand_name",
+            "generic_name",
+            "labeler_name",
+            "marketing_start_date",
+            "dosage_form",
+        )
+    }
+    keys = _name_keys(
+        {
+            "brand_name": _values(record.get("brand_name")),
+            "generic_name": _values(record.get("generic_name")),
+            "product_ndc": _values(record.get("product_ndc")),
+        }
+    )
+    return record.get("product_id"), record.get("marketing_start_date"), payload, keys
+
+
+def _extract_enforcement(record: Dict[str, Any]) -> Extracted:
+    openfda = _openfda_subset(record)
+    payload = {
+        field: record.get(field)
+        for field in (
+            "recall_number",
+            "status",
+            "distribution_pattern",
+            "reason_for_recall",
+            "report_date",
+            "product_description",
+        )
+    }
+    payload["openfda"] = openfda
+    keys = _name_keys(openfda)
+    # The API searches product_description as free text, so every word is indexed
+    words = dict.fromkeys(_WORD.findall(name_key(record.get("product_description") or "")))
+    keys.extend(("word", word) for word in words)
+    return record.get("recall_number"), record.get("report_date"), payload, keys
+
+
+EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Extracted]] = {
+    "label": _extract_label,
+    "ndc": _extract_ndc,
+    "enforcement": _extract_enforcement,
+}
+
+
+@dataclass(frozen=True)
+class OpenFDALoadStats:
+    endpoint: str
+    file_name: str
+    last_updated: Optional[str]
+    records: int
+    keys: int
+
+
+def _iter_archive(path: Path, meta: Dict[str, Any], read_size: int) -> Iterator[Dict[str, Any]]:
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.namelist():
+            if not member.endswith(".json"):
+                continue
+            with archive.open(member) as raw:
+                yield from iter_json_array(io.TextIOWrapper(raw, encoding="utf-8"), meta=meta, read_size=read_size)
+
+
+def load_openfda_bulk(
+    session: Session,
+    paths: Iterable[str | os.PathLike],
+    read_size: int = READ_SIZE,
+) -> List[OpenFDALoadStats]:
+    """Replace the local records of every endpoint in ``paths`` with those files, in one transaction.
+
+    Pass every partition of an endpoint together; endpoints not among ``paths`` are left alone.
+    """
+
+    files = [Path(path) for path in paths]
+    endpoints = {path: endpoint_for_file(path) for path in files}
+    for endpoint in set(endpoints.values()):
+        session.execute(delete(OpenFDAKey).where(OpenFDAKey.endpoint == endpoint))
+        session.execute(delete(OpenFDARecord).where(OpenFDARecord.endpoint == endpoint))
+        session.execute(delete(OpenFDABulkFile).where(OpenFDABulkFile.endpoint == endpoint))
+
+    # Ids are assigned here so key rows can be batched alongside their records
+    next_id = (session.execute(select(func.max(OpenFDARecord.id))).scalar() or 0) + 1
+    stats: List[OpenFDALoadStats] = []
+    for path in files:
+        endpoint = endpoints[path]
+        extract = EXTRACTORS[endpoint]
+        meta: Dict[str, Any] = {}
+        records: List[Dict[str, Any]] = []
+        keys: List[Dict[str, Any]] = []
+        record_count = key_count = 0
+
+        def flush() -> None:
+            if records:
+                session.execute(insert(OpenFDARecord.__table__), records)
+            if keys:
+                session.execute(insert(OpenFDAKey.__table__), keys)
+            records.clear()
+            keys.clear()
+
+        for record in _iter_archive(path, meta, read_size):
+            record_key, sort_date, payload, record_keys = extract(record)
+            records.append(
+                {
+                    "id": next_id,
+                    "endpoint": endpoint,
+                    "record_key": record_key,
+                    "sort_date": sort_date,
+                    "payload": json.dumps(payload, ensure_ascii=False),
+                }
+            )
+            record_keys = [(kind, key) for kind, key in dict.fromkeys(record_keys) if key]
+            keys.extend({"record_id": next_id, "endpoint": endpoint, "kind": kind, "key": key} for kind, key in record_keys)
+            next_id += 1
+            record_count += 1
+            key_count += len(record_keys)
+            if len(records) >= INSERT_BATCH_SIZE:
+                flush()
+        flush()
+
+        last_updated = (meta.get("meta") or {}).get("last_updated")
+        session.add(
+            OpenFDABulkFile(endpoint=endpoint, file_name=path.name, last_updated=last_updated, record_count=record_count)
+        )
+        stats.append(OpenFDALoadStats(endpoint, path.name, last_updated, record_count, key_count))
+
+    session.commit()
+    return stats
+
+
+class LocalOpenFDAResolver(OpenFDANormalizer):
+    """Answers the openFDA lookups used by the sync job from the loaded bulk downloads.
+
+    Name lookups match brand or generic names case-insensitively; enforcement lookups also
+    match recalls whose product description contains every word of the name, like the API's
+    ``product_description`` search.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    @staticmethod
+    def loaded_endpoints(session: Session) -> List[str]:
+        return list(session.execute(select(OpenFDABulkFile.endpoint).distinct()).scalars())
+
+    @classmethod
+    def is_loaded(cls, session: Session) -> bool:
+        return bool(cls.loaded_endpoints(session))
+
+    def _results(self, endpoint: str, *conditions, limit: int) -> Dict[str, Any]:
+        matches = or_(*(OpenFDARecord.id.in_(condition) for condition in conditions))
+        payloads = self.session.execute(
+            select(OpenFDARecord.payload)
+            .where(OpenFDARecord.endpoint == endpoint, matches)
+            .order_by(OpenFDARecord.sort_date.desc().nulls_last(), OpenFDARecord.id)
+            .limit(limit)
+        ).scalars()
+        return {"results": [json.loads(payload) for payload in payloads]}
+
+    @staticmethod
+    def _keyed(endpoint: str, kinds: Sequence[str], keys: Sequence[str]):
+        return select(OpenFDAKey.record_id).where(
+            OpenFDAKey.endpoint == endpoint, OpenFDAKey.kind.in_(kinds), OpenFDAKey.key.in_(keys)
+        )
+
+    def _by_name(self, endpoint: str, drug_name: str):
+        return self._keyed(endpoint, NAME_KINDS, [name_key(drug_name)])
+
+    def get_drug_label(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        return self._results("label", self._by_name("label", drug_name), limit=limit)
+
+    def get_ndc(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        return self._results("ndc", self._by_name("ndc", drug_name), limit=limit)
+
+    def get_drug_enforcement(self, drug_name: str, limit: int = 5) -> Dict[str, Any]:
+        words = list(dict.fromkeys(_WORD.findall(name_key(drug_name))))
+        conditions = [self._by_name("enforcement", drug_name)]
+        if words:
+            conditions.append(
+                self._keyed("enforcement", ("word",), words)
+                .group_by(OpenFDAKey.record_id)
+                .having(func.count(distinct(OpenFDAKey.key)) == len(words))
+            )
+        return self._results("enforcement", *conditions, limit=limit)
+
+    def get_by_product_ndc(self, endpoint: str, product_ndc: str, limit: int = 5) -> Dict[str, Any]:
+        return self._results(endpoint, self._keyed(endpoint, ("ndc",), [product_ndc.strip()]), limit=limit)
+
+    def safe_label_lookup(self, drug_name: str) -> Optional[Provenance]:
+        return self.create_label_provenance("drug_master", self.get_drug_label(drug_name, limit=1))
+
+    def safe_enforcement_lookup(self, drug_name: str) -> Optional[Provenance]:
+        return self.create_enforcement_provenance("drug_master", self.get_drug_enforcement(drug_name, limit=1))
+
+    def safe_ndc_lookup(self, drug_name: str) -> Optional[Provenance]:
+        return self.create_ndc_provenance("drug_master", self.get_ndc(drug_name, limit=1))
+
+
+class AsyncLocalOpenFDAResolver:
+    """Awaitable facade answering from the local tables for every endpoint that has been loaded.
+
+    Endpoints without a bulk load fall through to ``fallback``, the API client.
+    """
+
+    def __init__(self, resolver: LocalOpenFDAResolver, fallback: AsyncOpenFDAClient) -> None:
+        self.resolver = resolver
+        self.fallback = fallback
+        self.endpoints = frozenset(resolver.loaded_endpoints(resolver.session))
+
+    async def __aenter__(self) -> "AsyncLocalOpenFDAResolver":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.fallback.aclose()
+
+    async def safe_label_lookup(self, drug_name: str) -> Optional[Provenance]:
+        if "label" in self.endpoints:
+            return self.resolver.safe_label_lookup(drug_name)
+        return await self.fallback.safe_label_lookup(drug_name)
+
+    async def safe_enforcement_lookup(self, drug_name: str) -> Optional[Provenance]:
+        if "enforcement" in self.endpoints:
+            return self.resolver.safe_enforcement_lookup(drug_name)
+        return await self.fallback.safe_enforcement_lookup(drug_name)
+
+    async def safe_ndc_lookup(self, drug_name: str) -> Optional[Provenance]:
+        if "ndc" in self.endpoints:
+            return self.resolver.safe_ndc_lookup(drug_name)
+        return await self.fallback.safe_ndc_lookup(drug_name)
@@ -0,0 +1,110 @@
+"""Phone-login OTP challenges stored one row per ``request_id``.
+
+Verification touches a single row by primary key. One conditional ``UPDATE`` reserves an
+attempt, and only matches while the challenge is unused, unexpired and under the attempt
+limit. A second conditional ``UPDATE`` consumes it. Two concurrent verifications of the same
+code therefore cannot both succeed, and no lock is held on anything but that row. Expired
+challenges are deleted by :func:`purge_challenges`.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.security import get_password_hash, verify_password
+from app.models.otp import OTPChallengeRecord
+
+settings = get_settings()
+OTP_EXPIRATION_MINUTES = 5
+
+_TABLE = OTPChallengeRecord.__table__
+
+
+def issue_challenge(
+    session: Session, user_id: int, phone_number: str, now: Optional[datetime] = None
+) -> Tuple[OTPChallengeRecord, str]:
+    """Store a new challenge for ``user_id`` and return it with its plain code."""
+
+    now = now or datetime.utcnow()
+    code = f"{uuid4().int % 1000000:06d}"
+    challenge = OTPChallengeRecord(
+        request_id=uuid4().hex,
+        user_id=user_id,
+        phone_number=phone_number,
+        code_hash=get_password_hash(code),
+        created_at=now,
+        expires_at=now + timedelta(minutes=OTP_EXPIRATION_MINUTES),
+        attempts=0,
+    )
+    session.add(challenge)
+    session.commit()
+    return challenge, code
+
+
+def _rejection(session: Session, request_id: str, user_id: int, now: datetime) -> str:
+    challenge = session.get(OTPChallengeRecord, request_id)
+    if challenge is None or challenge.user_id != user_id:
+        return "Invalid request"
+    if challenge.used_at is not None:
+        return "OTP already used"
+    if challenge.expires_at < now:
+        return "OTP expired"
+    return "OTP locked after too many attempts"
+
+
+def consume_challenge(
+    session: Session, request_id: str, user_id: int, code: str, now: Optional[datetime] = None
+) -> OTPChallengeRecord:
+    """Mark the challenge used if ``code`` matches; raise ``ValueError`` with the reason otherwise.
+
+    Every guess reserves one of the ``OTP_MAX_ATTEMPTS`` attempts in the same statement that
+    checks the limit, before the code is compared. Parallel guesses therefore cannot get more
+    than the limit evaluated between them.
+    """
+
+    now = now or datetime.utcnow()
+    code_hash = session.execute(
+        update(_TABLE)
+        .where(
+            _TABLE.c.request_id == request_id,
+            _TABLE.c.user_id == user_id,
+            _TABLE.c.used_at.is_(None),
+            _TABLE.c.expires_at >= now,
+            _TABLE.c.attempts < settings.otp_max_attempts,
+        )
+        .values(attempts=_TABLE.c.attempts + 1)
+        .returning(_TABLE.c.code_hash)
+    ).scalar_one_or_none()
+    session.commit()
+    if code_hash is None:
+        raise ValueError(_rejection(session, request_id, user_id, now))
+    if not verify_password(code, code_hash):
+        raise ValueError("Invalid OTP")
+
+    # Compare-and-set: a concurrent verification that got here first leaves nothing to match
+    result = session.execute(
+        update(_TABLE)
+        .where(_TABLE.c.request_id == request_id, _TABLE.c.used_at.is_(None), _TABLE.c.expires_at >= now)
+        .values(used_at=now)
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        raise ValueError("OTP already used")
+    session.commit()
+    return session.get(OTPChallengeRecord, request_id, populate_existing=True)
+
+
+def purge_challenges(session: Session, now: Optional[datetime] = None, retention: Optional[timedelta] = None) -> int:
+    """Delete challenges that expired more than ``retention`` ago (``OTP_RETENTION_HOURS`` by default)."""
+
+    now = now or datetime.utcnow()
+    retention = timedelta(hours=settings.otp_retention_hours) if retention is None else retention
+    result = session.execute(delete(_TABLE).where(_TABLE.c.expires_at < now - retention))
+    session.commit()
+    return result.rowcount
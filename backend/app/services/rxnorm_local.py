@@ -0,0 +1,258 @@
+"""Local copy of the monthly RxNorm release and a resolver that answers like the REST API.
+
+:func:`load_rxnorm_release` streams ``RXNCONSO.RRF``, ``RXNSAT.RRF`` and ``RXNREL.RRF`` from
+an unpacked release (the ``rrf`` directory of ``RxNorm_full_*.zip``), keeps the rows whose
+source is ``RXNORM`` and bulk-inserts them in batches. :class:`LocalRxNormResolver` exposes the
+:class:`~app.services.rxnorm_client.RxNormClient` methods the sync job uses and returns
+payloads shaped like the RxNav responses, so the normalization helpers work unchanged.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.drug import DrugMaster
+from app.models.provenance import Provenance
+from app.models.rxnorm import RxNormAttribute, RxNormConcept, RxNormName, RxNormRelation, RxNormRelease
+from app.services.rxnorm_client import RxNormNormalizer
+
+INSERT_BATCH_SIZE = 5000
+SOURCE = "RXNORM"
+
+# Column positions in the RRF files (see the RxNorm technical documentation)
+CONSO_RXCUI, CONSO_SAB, CONSO_TTY, CONSO_STR, CONSO_SUPPRESS = 0, 11, 12, 14, 16
+SAT_RXCUI, SAT_ATN, SAT_SAB, SAT_ATV = 0, 8, 9, 10
+REL_RXCUI1, REL_RXCUI2, REL_RELA, REL_SAB = 0, 4, 7, 10
+
+# Synonym term types never name a concept; everything else in RXNORM is the concept's own name
+SYNONYM_TTYS = frozenset({"SY", "TMSY", "PSN"})
+
+
+def name_key(name: str) -> str:
+    """Case- and whitespace-insensitive key, mirroring RxNav's exact-match normalization."""
+
+    return " ".join(name.split()).casefold()
+
+
+def iter_rrf(path: Path) -> Iterator[List[str]]:
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            # Every RRF row ends with a trailing "|" before the newline
+            yield line.rstrip("\r\n").split("|")
+
+
+@dataclass(frozen=True)
+class RxNormLoadStats:
+    version: str
+    concepts: int
+    names: int
+    attributes: int
+    relations: int
+
+
+def _insert_batches(session: Session, model, rows: Iterator[Dict[str, Any]]) -> int:
+    table = model.__table__
+    batch: List[Dict[str, Any]] = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def load_rxnorm_release(
+    session: Session,
+    directory: str | os.PathLike,
+    version: Optional[str] = None,
+) -> RxNormLoadStats:
+    """Replace the local RxNorm tables with the release in ``directory`` in one transaction."""
+
+    rrf_dir = Path(directory)
+    if version is None:
+        # Releases unpack as RxNorm_full_MMDDYYYY/rrf/*.RRF; name the version after that folder
+        release_dir = rrf_dir.resolve()
+        version = (release_dir.parent if release_dir.name.lower() == "rrf" else release_dir).name
+
+    for model in (RxNormConcept, RxNormName, RxNormAttribute, RxNormRelation):
+        session.execute(delete(model))
+
+    concepts: Dict[str, Dict[str, Any]] = {}
+
+    def names() -> Iterator[Dict[str, Any]]:
+        for fields in iter_rrf(rrf_dir / "RXNCONSO.RRF"):
+            if fields[CONSO_SAB] != SOURCE:
+                continue
+            rxcui, tty, name, suppress = (
+                fields[CONSO_RXCUI],
+                fields[CONSO_TTY],
+                fields[CONSO_STR],
+                fields[CONSO_SUPPRESS],
+            )
+            concept = concepts.setdefault(
+                rxcui,
+                {"rxcui": rxcui, "name": None, "synonym": None, "tty": None, "suppress": suppress},
+            )
+            if tty == "SY" and concept["synonym"] is None:
+                concept["synonym"] = name
+            elif tty not in SYNONYM_TTYS:
+                concept.update(name=name, tty=tty, suppress=suppress)
+            yield {"rxcui": rxcui, "name": name, "name_key": name_key(name), "tty": tty, "suppress": suppress}
+
+    def attributes() -> Iterator[Dict[str, Any]]:
+        for fields in iter_rrf(rrf_dir / "RXNSAT.RRF"):
+            if fields[SAT_SAB] == SOURCE:
+                yield {"rxcui": fields[SAT_RXCUI], "atn": fields[SAT_ATN], "atv": fields[SAT_ATV] or None}
+
+    def relations() -> Iterator[Dict[str, Any]]:
+        for fields in iter_rrf(rrf_dir / "RXNREL.RRF"):
+            if fields[REL_SAB] == SOURCE and fields[REL_RXCUI1] and fields[REL_RXCUI2]:
+                yield {"rxcui1": fields[REL_RXCUI1], "rela": fields[REL_RELA] or None, "rxcui2": fields[REL_RXCUI2]}
+
+    name_count = _insert_batches(session, RxNormName, names())
+    # Concepts that only carry synonym atoms fall back to their synonym as the name
+    concept_rows = (
+        {**concept, "name": concept["name"] or concept["synonym"], "tty": concept["tty"] or "SY"}
+        for concept in concepts.values()
+    )
+    concept_count = _insert_batches(session, RxNormConcept, concept_rows)
+    attribute_count = _insert_batches(session, RxNormAttribute, attributes())
+    relation_count = _insert_batches(session, RxNormRelation, relations())
+
+    session.add(RxNormRelease(version=version, concept_count=concept_count))
+    session.commit()
+    return RxNormLoadStats(version, concept_count, name_count, attribute_count, relation_count)
+
+
+class LocalRxNormResolver(RxNormNormalizer):
+    """Answers the RxNorm lookups used by the sync job from the locally loaded release."""
+
+    def __init__(self, session: Session, base_url: str = "https://rxnav.nlm.nih.gov/REST") -> None:
+        # base_url only feeds the source_url recorded on normalized drugs
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+
+    @staticmethod
+    def is_loaded(session: Session) -> bool:
+        return session.execute(select(RxNormRelease.id).limit(1)).first() is not None
+
+    def find_rxcui_by_string(self, drug_name: str) -> Dict[str, Any]:
+        rows = self.session.execute(
+            select(RxNormName.rxcui, RxNormName.suppress)
+            .where(RxNormName.name_key == name_key(drug_name))
+            .order_by(RxNormName.rxcui)
+        ).all()
+        # Active concepts first, like RxNav which hides obsolete ones from exact matches
+        rxcuis = list(dict.fromkeys(rxcui for rxcui, suppress in sorted(rows, key=lambda row: row.suppress != "N")))
+        id_group: Dict[str, Any] = {"name": drug_name}
+        if rxcuis:
+            id_group["rxnormId"] = rxcuis
+        return {"idGroup": id_group}
+
+    def get_rx_concept_properties(self, rxcui: str) -> Dict[str, Any]:
+        concept = self.session.get(RxNormConcept, rxcui)
+        if concept is None:
+            return {}
+        return {"properties": self._concept_properties(concept)}
+
+    def get_all_properties(self, rxcui: str) -> Dict[str, Any]:
+        attributes = self.session.execute(
+            select(RxNormAttribute.atn, RxNormAttribute.atv).where(RxNormAttribute.rxcui == rxcui)
+        ).all()
+        names = self.session.execute(select(RxNormName.tty, RxNormName.name).where(RxNormName.rxcui == rxcui)).all()
+        props = [{"propCategory": "ATTRIBUTES", "propName": atn, "propValue": atv} for atn, atv in attributes]
+        props.extend({"propCategory": "NAMES", "propName": tty, "propValue": name} for tty, name in names)
+        return {"propConceptGroup": {"propConcept": props}} if props else {}
+
+    def get_related_by_type(self, rxcui: str, tty: str) -> Dict[str, Any]:
+        wanted: Sequence[str] = tty.split()
+        related = (
+            self.session.execute(
+                select(RxNormConcept)
+                .join(RxNormRelation, RxNormRelation.rxcui2 == RxNormConcept.rxcui)
+                .where(RxNormRelation.rxcui1 == rxcui, RxNormConcept.tty.in_(wanted))
+                .order_by(RxNormConcept.rxcui)
+            )
+            .scalars()
+            .unique()
+            .all()
+        )
+        groups = [
+            {
+                "tty": group_tty,
+                "conceptProperties": [self._concept_properties(c) for c in related if c.tty == group_tty],
+            }
+            for group_tty in wanted
+        ]
+        return {"relatedGroup": {"rxcui": rxcui, "termType": wanted, "conceptGroup": groups}}
+
+    def get_ndcs(self, rxcui: str) -> Dict[str, Any]:
+        ndcs = self.session.execute(
+            select(RxNormAttribute.atv)
+            .where(RxNormAttribute.rxcui == rxcui, RxNormAttribute.atn == "NDC")
+            .order_by(RxNormAttribute.atv)
+        ).scalars()
+        return {"ndcGroup": {"rxnormId": rxcui, "ndcList": {"ndc": list(dict.fromkeys(ndcs))}}}
+
+    def get_rxnorm_version(self) -> Dict[str, Any]:
+        version = self.session.execute(
+            select(RxNormRelease.version).order_by(RxNormRelease.loaded_at.desc(), RxNormRelease.id.desc()).limit(1)
+        ).scalar()
+        return {"version": {"rxnormVersion": version}} if version else {}
+
+    def normalize_properties_to_drug(self, properties: Dict[str, Any]) -> DrugMaster:
+        version = self.get_rxnorm_version().get("version", {}).get("rxnormVersion")
+        return self._drug_from_properties(properties, version)
+
+    @staticmethod
+    def _concept_properties(concept: RxNormConcept) -> Dict[str, Any]:
+        return {
+            "rxcui": concept.rxcui,
+            "name": concept.name,
+            "synonym": concept.synonym or "",
+            "tty": concept.tty,
+            "language": "ENG",
+            "suppress": concept.suppress,
+            "umlscui": "",
+        }
+
+
+class AsyncLocalRxNormResolver:
+    """Awaitable facade over :class:`LocalRxNormResolver` for the asyncio sync pipeline.
+
+    Lookups are indexed local queries, so they run inline rather than in a thread.
+    """
+
+    extract_first_rxcui = staticmethod(RxNormNormalizer.extract_first_rxcui)
+
+    def __init__(self, resolver: LocalRxNormResolver) -> None:
+        self.resolver = resolver
+
+    async def __aenter__(self) -> "AsyncLocalRxNormResolver":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def find_rxcui_by_string(self, drug_name: str) -> Dict[str, Any]:
+        return self.resolver.find_rxcui_by_string(drug_name)
+
+    async def get_rx_concept_properties(self, rxcui: str) -> Dict[str, Any]:
+        return self.resolver.get_rx_concept_properties(rxcui)
+
+    async def normalize_properties_to_drug(self, properties: Dict[str, Any]) -> DrugMaster:
+        return self.resolver.normalize_properties_to_drug(properties)
+
+    def create_provenance(self, entity_type: str, payload: Dict[str, Any]) -> Provenance:
+        return self.resolver.create_provenance(entity_type, payload)
@@ -0,0 +1,350 @@
+"""Instrumentation for the external-source sync: request latency, cache use and database time.
+
+The HTTP clients and the sync job report into the :class:`SyncMetrics` that :func:`collect`
+activates for the current context (asyncio tasks inherit it), so nothing is recorded outside
+a sync run. A finished run renders as a structured summary for the task result and in the
+Prometheus text exposition format, written to ``SYNC_METRICS_PATH`` where a node_exporter
+textfile collector or the API's ``/metrics`` route picks it up.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "moh_sync"
+
+
+def endpoint_label(path: str) -> str:
+    """Collapse identifier segments (rxcuis, set ids, NDCs) so each endpoint is one label value."""
+
+    segments = []
+    for segment in path.split("/"):
+        stem, dot, suffix = segment.partition(".")
+        segments.append(f"{{id}}{dot}{suffix}" if any(char.isdigit() for char in stem) else segment)
+    return "/".join(segments)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (the maximum beyond the last bucket)."""
+
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50_seconds": round(self.quantile(0.5), 4),
+            "p95_seconds": round(self.quantile(0.95), 4),
+            "max_seconds": round(self.max, 4),
+        }
+
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class SyncMetrics:
+    """Measurements for one sync run; safe to update from several threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str], Histogram] = {}
+        self.statuses: Counter = Counter()
+        self.cache: Counter = Counter()
+        self.db: Dict[str, Histogram] = {}
+        self.lookups = Histogram()
+        # Exact per-name lookup times for the summary's percentiles; one float per distinct name,
+        # counting only time its requests were being served (see timed_lookup)
+        self.lookup_seconds: List[float] = []
+        self.drugs = 0
+        self.synced = 0
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def observe_request(self, upstream: str, path: str, status: Any, seconds: float) -> None:
+        endpoint = endpoint_label(path)
+        with self._lock:
+            self.requests.setdefault((upstream, endpoint), Histogram()).observe(seconds)
+            self.statuses[(upstream, endpoint, str(status))] += 1
+
+    def count_cache(self, upstream: str, layer: str, hit: bool) -> None:
+        with self._lock:
+            self.cache[(upstream, layer, "hit" if hit else "miss")] += 1
+
+    def observe_db(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            self.db.setdefault(operation, Histogram()).observe(seconds)
+
+    def observe_lookup(self, seconds: float) -> None:
+        with self._lock:
+            self.lookups.observe(seconds)
+            self.lookup_seconds.append(seconds)
+
+    def lookup_percentiles(self) -> Dict[str, float]:
+        samples = self.lookup_seconds
+        if len(samples) < 2:
+            value = round(samples[0], 4) if samples else 0.0
+            return {"count": len(samples), "p50_seconds": value, "p99_seconds": value}
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {"count": len(samples), "p50_seconds": round(cuts[49], 4), "p99_seconds": round(cuts[98], 4)}
+
+    def finish(self, drugs: int, synced: int) -> None:
+        self.drugs = drugs
+        self.synced = synced
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def drugs_per_second(self) -> float:
+        return self.drugs / self.duration if self.duration else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            upstreams: Dict[str, Dict[str, Any]] = {}
+            for (upstream, endpoint), histogram in sorted(self.requests.items()):
+                statuses = {
+                    status: count
+                    for (up, ep, status), count in sorted(self.statuses.items())
+                    if (up, ep) == (upstream, endpoint)
+                }
+                upstreams.setdefault(upstream, {})[endpoint] = {**histogram.summary(), "statuses": statuses}
+            cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (upstream, layer, result), count in sorted(self.cache.items()):
+                cache.setdefault(upstream, {}).setdefault(layer, {"hit": 0, "miss": 0})[result] = count
+            for layers in cache.values():
+                for counts in layers.values():
+                    lookups = counts["hit"] + counts["miss"]
+                    counts["hit_rate"] = round(counts["hit"] / lookups, 3) if lookups else 0.0
+            return {
+                "drugs": self.drugs,
+                "synced": self.synced,
+                "duration_seconds": round(self.duration or 0.0, 3),
+                "drugs_per_second": round(self.drugs_per_second, 2),
+                "lookups": self.lookup_percentiles(),
+                "requests": upstreams,
+                "cache": cache,
+                "db": {operation: histogram.summary() for operation, histogram in sorted(self.db.items())},
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition of this run."""
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def histogram(name: str, histogram: Histogram, **labels: Any) -> None:
+            for bound, total in histogram.cumulative():
+                lines.append(f"{PREFIX}_{name}_bucket{{{_labels(**labels, le=bound)}}} {total}")
+            lines.append(f'{PREFIX}_{name}_bucket{{{_labels(**labels, le="+Inf")}}} {histogram.count}')
+            lines.append(f"{PREFIX}_{name}_sum{{{_labels(**labels)}}} {histogram.sum:.6f}")
+            lines.append(f"{PREFIX}_{name}_count{{{_labels(**labels)}}} {histogram.count}")
+
+        with self._lock:
+            family("request_duration_seconds", "histogram", "Latency of external API requests.")
+            for (upstream, endpoint), values in sorted(self.requests.items()):
+                histogram("request_duration_seconds", values, upstream=upstream, endpoint=endpoint)
+            family("requests_total", "counter", "External API responses by status code.")
+            for (upstream, endpoint, status), count in sorted(self.statuses.items()):
+                lines.append(f"{PREFIX}_requests_total{{{_labels(upstream=upstream, endpoint=endpoint, status=status)}}} {count}")
+            family("cache_lookups_total", "counter", "Response cache lookups by layer and result.")
+            for (upstream, layer, result), count in sorted(self.cache.items()):
+                lines.append(f"{PREFIX}_cache_lookups_total{{{_labels(upstream=upstream, layer=layer, result=result)}}} {count}")
+            family(
+                "lookup_duration_seconds",
+                "histogram",
+                "Time one distinct drug name spent in admitted upstream requests.",
+            )
+            if self.lookups.count:
+                histogram("lookup_duration_seconds", self.lookups)
+            family("db_duration_seconds", "histogram", "Time spent in database flushes and commits.")
+            for operation, values in sorted(self.db.items()):
+                histogram("db_duration_seconds", values, operation=operation)
+
+        for name, help_text, value in (
+            ("last_run_drugs", "Local drugs looked up by the last run.", self.drugs),
+            ("last_run_synced", "Local drugs linked by the last run.", self.synced),
+            ("last_run_duration_seconds", "Wall time of the last run.", round(self.duration or 0.0, 6)),
+            ("last_run_drugs_per_second", "Throughput of the last run.", round(self.drugs_per_second, 6)),
+            ("last_run_timestamp_seconds", "Start time of the last run.", round(self.started_at, 3)),
+        ):
+            family(name, "gauge", help_text)
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_current: ContextVar[Optional[SyncMetrics]] = ContextVar("sync_metrics", default=None)
+
+
+def current() -> Optional[SyncMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def collect(metrics: Optional[SyncMetrics] = None) -> Iterator[SyncMetrics]:
+    """Route every measurement made in this context to ``metrics`` (a new one by default)."""
+
+    metrics = metrics or SyncMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def record_request(upstream: str, path: str, started: float, status: Any) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.observe_request(upstream, path, status, time.perf_counter() - started)
+
+
+def record_cache(upstream: str, layer: str, hit: bool) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count_cache(upstream, layer, hit)
+
+
+class _LookupClock:
+    """Wall time during which at least one of a lookup's requests was admitted and not paused."""
+
+    def __init__(self) -> None:
+        self.timed = False
+        self.active = 0
+        self.since = 0.0
+        self.busy = 0.0
+
+    def start(self) -> None:
+        self.timed = True
+        if self.active == 0:
+            self.since = time.perf_counter()
+        self.active += 1
+
+    def stop(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            self.busy += time.perf_counter() - self.since
+
+
+_lookup_clock: ContextVar[Optional[_LookupClock]] = ContextVar("sync_lookup_clock", default=None)
+
+
+@contextmanager
+def timed_lookup() -> Iterator[None]:
+    """Time one name lookup by how long its own requests were being served.
+
+    A sync run starts every lookup at once, and each request then queues behind every other
+    lookup for a client's concurrency slot and the upstream's rate limit. Only the wall time
+    in which at least one of the lookup's admitted requests is running counts, so the figure
+    does not grow with the run's size. Lookups answered without any request or cache read are
+    not timed.
+    """
+
+    clock = _LookupClock()
+    token = _lookup_clock.set(clock)
+    try:
+        yield
+    finally:
+        _lookup_clock.reset(token)
+        metrics = _current.get()
+        if metrics is not None and clock.timed:
+            metrics.observe_lookup(clock.busy)
+
+
+@contextmanager
+def lookup_request() -> Iterator[None]:
+    """Count the enclosed, already admitted request towards the current lookup's time."""
+
+    clock = _lookup_clock.get()
+    if clock is None:
+        yield
+        return
+    clock.start()
+    try:
+        yield
+    finally:
+        clock.stop()
+
+
+@contextmanager
+def lookup_paused() -> Iterator[None]:
+    """Leave a rate-limit pause inside an admitted request out of the current lookup's time."""
+
+    clock = _lookup_clock.get()
+    if clock is None or not clock.active:
+        yield
+        return
+    clock.stop()
+    try:
+        yield
+    finally:
+        clock.start()
+
+
+def lookup_cache_hit() -> None:
+    """Note that the current lookup was answered, without request time, from a cache."""
+
+    clock = _lookup_clock.get()
+    if clock is not None:
+        clock.timed = True
+
+
+@contextmanager
+def timed_db(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.observe_db(operation, time.perf_counter() - started)
+
+
+def write_textfile(metrics: SyncMetrics, path: str | os.PathLike) -> None:
+    """Replace ``path`` atomically so scrapers never read a half-written file."""
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    temporary.write_text(metrics.render(), encoding="utf-8")
+    os.replace(temporary, target)
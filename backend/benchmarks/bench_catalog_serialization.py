@@ -0,0 +1,70 @@
+"""Compare the ORM + pydantic catalog listing against the column projection + orjson fast path.
+
+Usage: ``python -m benchmarks.bench_catalog_serialization [--sizes 1000 10000 100000]``
+"""
+
+import argparse
+import time
+from dataclasses import replace
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.drug import DrugLocalKuwait
+from app.schemas.drug import DrugLocal
+from app.services.catalog_projection import catalog_projection, encode_drug_rows
+from benchmarks.synthetic_data import SyntheticCounts, generate
+
+DRUG_LIST = TypeAdapter(List[DrugLocal])
+
+
+def seed(session: Session, rows: int) -> None:
+    catalog_only = SyntheticCounts(users=0, patients=0, schedules=0, dose_logs=0, provenance=0)
+    generate(session, replace(catalog_only, masters=max(rows // 4, 1), locals=rows, matched_ratio=0.5))
+
+
+def orm_path(session: Session) -> bytes:
+    drugs = session.query(DrugLocalKuwait).options(joinedload(DrugLocalKuwait.matched_drug)).all()
+    payload = DRUG_LIST.dump_json(DRUG_LIST.validate_python(drugs, from_attributes=True))
+    session.expunge_all()
+    return payload
+
+
+def fast_path(session: Session) -> bytes:
+    return encode_drug_rows(session.connection().execute(catalog_projection()))
+
+
+def measure(label: str, func: Callable[[Session], bytes], session: Session, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(session)
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<10} {best * 1000:10.1f} ms  {rows / best:12,.0f} rows/s")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, rows)
+            print(f"{rows:,} rows")
+            orm = measure("orm", orm_path, session, rows, args.repeat)
+            fast = measure("fast", fast_path, session, rows, args.repeat)
+            print(f"  speed-up   {orm / fast:10.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Measure the external-source sync end to end against replayed upstreams.
+
+Seeds N unmatched local drugs into an in-memory SQLite database and runs the same code path
+as the ``drugs.sync_external_sources`` task, with RxNorm, DailyMed and openFDA replaced by
+:class:`~benchmarks.upstream_replay.ReplayTransport`. Reports drugs/sec, p50/p99 time each
+distinct drug name spent in its own upstream requests (queueing behind other names for
+concurrency slots and rate limits is left out), database time and the upstream answers seen,
+including injected faults.
+
+Usage: ``python -m benchmarks.bench_sync_throughput [--drugs 1000] [--latency 0.05] [--cassette FILE]``
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models.drug import DrugLocalKuwait
+from app.services.http_cache import MemoryResponseCache
+from benchmarks.upstream_replay import Cassette, ReplayTransport, UpstreamRouter
+from jobs.daily_sync import run_external_sync
+
+
+def seed(session: Session, drugs: int, distinct: int, unknown_rate: float) -> None:
+    unknown_every = round(1 / unknown_rate) if unknown_rate else 0
+    extracted = datetime(2024, 1, 1)
+    session.execute(
+        insert(DrugLocalKuwait),
+        [
+            {
+                "moh_code": f"KUW-{index:07d}",
+                "generic_name": (
+                    f"unknown{index % distinct}"
+                    if unknown_every and index % unknown_every == 0
+                    else f"generic{index % distinct}"
+                ),
+                "strength": "500mg",
+                "dosage_form": "Tablet",
+                "source_file": "bench.csv",
+                "extracted_at": extracted + timedelta(seconds=index),
+            }
+            for index in range(drugs)
+        ],
+    )
+    session.commit()
+
+
+def run_benchmark(
+    drugs: int = 1_000,
+    distinct: Optional[int] = None,
+    unknown_rate: float = 0.05,
+    latency: float = 0.05,
+    jitter: float = 0.02,
+    error_rate: float = 0.01,
+    throttle_rate: float = 0.01,
+    retry_after: float = 1.0,
+    rate_limited: bool = False,
+    cassette: Optional[Cassette] = None,
+    seed_value: int = 7,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> Dict[str, Any]:
+    """Sync ``drugs`` seeded rows (``distinct`` names, all distinct by default) and return the run summary."""
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    replay = ReplayTransport(
+        cassette,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        retry_after=retry_after,
+        seed=seed_value,
+        sleep=sleep,
+    )
+    transport = UpstreamRouter(replay, rate_limited=rate_limited, sleep=sleep)
+    try:
+        with Session(engine) as session:
+            seed(session, drugs, distinct or drugs, unknown_rate)
+            metrics = run_external_sync(session, drugs, transport=transport, response_cache=MemoryResponseCache())
+    finally:
+        engine.dispose()
+    summary = metrics.summary()
+    summary["upstream_statuses"] = {str(status): count for status, count in sorted(replay.statuses.items())}
+    summary["replayed_from_cassette"] = replay.replayed
+    return summary
+
+
+def report(summary: Dict[str, Any]) -> None:
+    lookups = summary["lookups"]
+    print(f"{summary['drugs']:,} drugs, {summary['synced']:,} linked in {summary['duration_seconds']:.2f} s")
+    print(f"  throughput   {summary['drugs_per_second']:10,.1f} drugs/s")
+    print(f"  per name     p50 {lookups['p50_seconds'] * 1000:8.1f} ms   p99 {lookups['p99_seconds'] * 1000:8.1f} ms")
+    for operation, timings in summary["db"].items():
+        total = timings["mean_seconds"] * timings["count"]
+        print(f"  db {operation:<9} {total * 1000:10.1f} ms over {timings['count']} call(s)")
+    for upstream, endpoints in summary["requests"].items():
+        for endpoint, timings in endpoints.items():
+            print(f"  {upstream:<9} {endpoint:<24} {timings['count']:7,} requests  {timings['statuses']}")
+    print(f"  upstream answers {summary['upstream_statuses']} ({summary['replayed_from_cassette']:,} from cassette)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drugs", type=int, default=1_000)
+    parser.add_argument("--distinct", type=int, help="Distinct drug names among the seeded rows (default: all)")
+    parser.add_argument("--unknown-rate", type=float, default=0.05, help="Share of names RxNorm does not know")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Share of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.01, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rate-limited", action="store_true", help="Apply the production per-upstream rate limits")
+    parser.add_argument("--cassette", help="Recorded answers from benchmarks.upstream_replay")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print the full summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the per-lookup warnings of the sync job")
+    args = parser.parse_args()
+    if not args.verbose:
+        # Injected faults and recall-free products log a warning per lookup
+        logging.getLogger("app").setLevel(logging.ERROR)
+        logging.getLogger("jobs").setLevel(logging.ERROR)
+
+    summary = run_benchmark(
+        drugs=args.drugs,
+        distinct=args.distinct,
+        unknown_rate=args.unknown_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        rate_limited=args.rate_limited,
+        cassette=Cassette.load(args.cassette) if args.cassette else None,
+        seed_value=args.seed,
+    )
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Deterministic synthetic datasets at production scale for load tests and benchmarks.
+
+:func:`generate` bulk-inserts users, patients, master and local drugs, schedules, dose logs
+and provenance with bilingual drug and patient names. Popularity is Zipf-skewed the way the
+real catalog is: a few drugs carry most schedules and a few schedules most dose logs. Ids are
+assigned up front, after any rows already present, so child rows reference their parents
+without reading anything back. The same seed and counts always produce the same rows.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as clock
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.security import get_password_hash
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.patient import Patient
+from app.models.provenance import Provenance
+from app.models.schedule import DoseLog, DrugSchedule
+from app.models.user import User
+
+BATCH_SIZE = 10_000
+EPOCH = datetime(2024, 1, 1)
+
+# (English generic, Arabic generic) and brands sold under each
+GENERICS: Sequence[Tuple[str, str, Sequence[Tuple[str, str]]]] = (
+    ("Paracetamol", "باراسيتامول", (("Panadol", "بانادول"), ("Adol", "أدول"), ("Tylenol", "تايلينول"))),
+    ("Ibuprofen", "ايبوبروفين", (("Brufen", "بروفين"), ("Advil", "أدفيل"), ("Nurofen", "نوروفين"))),
+    ("Amoxicillin", "أموكسيسيلين", (("Amoxil", "أموكسيل"), ("Ibiamox", "ايبياموكس"))),
+    ("Amoxicillin/Clavulanate", "أموكسيسيلين/كلافولانات", (("Augmentin", "أوجمنتين"), ("Klavox", "كلافوكس"))),
+    ("Metformin", "ميتفورمين", (("Glucophage", "جلوكوفاج"), ("Glucomin", "جلوكومين"))),
+    ("Atorvastatin", "أتورفاستاتين", (("Lipitor", "ليبيتور"), ("Atoreza", "أتوريزا"))),
+    ("Amlodipine", "أملوديبين", (("Norvasc", "نورفاسك"), ("Amlor", "أملور"))),
+    ("Omeprazole", "أوميبرازول", (("Losec", "لوسك"), ("Omez", "أوميز"))),
+    ("Salbutamol", "سالبيوتامول", (("Ventolin", "فنتولين"), ("Asthalin", "أستالين"))),
+    ("Losartan", "لوسارتان", (("Cozaar", "كوزار"),)),
+    ("Levothyroxine", "ليفوثيروكسين", (("Eltroxin", "التروكسين"), ("Euthyrox", "يوثيروكس"))),
+    ("Insulin Glargine", "انسولين جلارجين", (("Lantus", "لانتوس"), ("Toujeo", "توجيو"))),
+    ("Azithromycin", "أزيثرومايسين", (("Zithromax", "زيثروماكس"), ("Azomycin", "أزومايسين"))),
+    ("Cetirizine", "سيتريزين", (("Zyrtec", "زيرتك"), ("Cetrak", "سيتراك"))),
+    ("Clopidogrel", "كلوبيدوجريل", (("Plavix", "بلافيكس"),)),
+    ("Esomeprazole", "إيسوميبرازول", (("Nexium", "نيكسيوم"),)),
+    ("Sitagliptin", "سيتاجليبتين", (("Januvia", "جانوفيا"),)),
+    ("Diclofenac", "ديكلوفيناك", (("Voltaren", "فولتارين"), ("Cataflam", "كتافلام"))),
+    ("Montelukast", "مونتيلوكاست", (("Singulair", "سينجولير"),)),
+    ("Rosuvastatin", "روزوفاستاتين", (("Crestor", "كريستور"),)),
+)
+VARIANTS: Sequence[Tuple[str, str]] = (("", ""), ("Extra", "اكسترا"), ("Forte", "فورت"), ("Plus", "بلس"), ("XR", "اكس ار"))
+FORMS: Sequence[Tuple[str, str, Sequence[str]]] = (
+    ("Tablet", "أقراص", ("250mg", "500mg", "850mg", "1000mg", "10mg", "20mg", "40mg")),
+    ("Capsule", "كبسولات", ("250mg", "500mg", "20mg", "40mg")),
+    ("Syrup", "شراب", ("120mg/5ml", "250mg/5ml", "100mg/5ml")),
+    ("Suspension", "معلق", ("125mg/5ml", "250mg/5ml", "457mg/5ml")),
+    ("Injection", "حقن", ("100 units/ml", "1g", "500mg")),
+    ("Inhaler", "بخاخ", ("100mcg", "200mcg")),
+    ("Cream", "كريم", ("1%", "2%")),
+)
+FORM_WEIGHTS = (50, 20, 10, 6, 6, 5, 3)
+FIRST_NAMES: Sequence[Tuple[str, str]] = (
+    ("Mohammad", "محمد"),
+    ("Ahmad", "أحمد"),
+    ("Abdullah", "عبدالله"),
+    ("Fatima", "فاطمة"),
+    ("Noura", "نورة"),
+    ("Maryam", "مريم"),
+    ("Yousef", "يوسف"),
+    ("Sara", "سارة"),
+    ("Khaled", "خالد"),
+    ("Hessa", "حصة"),
+    ("Ali", "علي"),
+    ("Dana", "دانة"),
+)
+FAMILY_NAMES: Sequence[Tuple[str, str]] = (
+    ("Al-Sabah", "الصباح"),
+    ("Al-Mutairi", "المطيري"),
+    ("Al-Ajmi", "العجمي"),
+    ("Al-Enezi", "العنزي"),
+    ("Al-Rashidi", "الرشيدي"),
+    ("Al-Kandari", "الكندري"),
+    ("Al-Shammari", "الشمري"),
+    ("Al-Hajri", "الهاجري"),
+)
+FREQUENCIES = ("once daily", "twice daily", "three times daily", "every 8 hours", "at bedtime", "as needed")
+FREQUENCY_WEIGHTS = (40, 30, 12, 8, 6, 4)
+SOURCES = ("rxnorm", "dailymed", "openfda", "moh")
+SOURCE_WEIGHTS = (50, 20, 20, 10)
+
+
+@dataclass(frozen=True)
+class SyntheticCounts:
+    users: int = 1_000
+    patients: int = 2_000
+    masters: int = 5_000
+    locals: int = 20_000
+    schedules: int = 20_000
+    dose_logs: int = 1_000_000
+    provenance: int = 10_000
+    # Share of local drugs already linked to a master
+    matched_ratio: float = 0.6
+
+
+class Zipf:
+    """Draws 0-based ranks in ``range(n)`` with probability proportional to ``1 / (rank + 1) ** s``."""
+
+    def __init__(self, n: int, s: float = 1.1) -> None:
+        self.cumulative = list(itertools.accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+    def draw(self, rng: random.Random) -> int:
+        return bisect.bisect(self.cumulative, rng.random() * self.cumulative[-1])
+
+
+def _next_id(session: Session, model) -> int:
+    return (session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(session: Session, model, rows: Iterable[Dict[str, Any]]) -> int:
+    table = model.__table__
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(table), batch)
+        count += len(batch)
+    if count and session.get_bind().dialect.name == "postgresql":
+        # Explicit ids leave the serial sequence behind; later ORM inserts must not collide
+        session.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))")
+        )
+    return count
+
+
+def _drug_name(rng: random.Random) -> Dict[str, str]:
+    generic, generic_ar, brands = GENERICS[rng.randrange(len(GENERICS))]
+    brand, brand_ar = brands[rng.randrange(len(brands))]
+    variant, variant_ar = VARIANTS[0] if rng.random() < 0.6 else VARIANTS[rng.randrange(1, len(VARIANTS))]
+    form, form_ar, strengths = rng.choices(FORMS, weights=FORM_WEIGHTS)[0]
+    return {
+        "generic": generic,
+        "generic_ar": generic_ar,
+        "brand": f"{brand} {variant}".strip(),
+        "brand_ar": f"{brand_ar} {variant_ar}".strip(),
+        "form": form,
+        "form_ar": form_ar,
+        "strength": strengths[rng.randrange(len(strengths))],
+    }
+
+
+def _users(rng: random.Random, first_id: int, count: int, password_hash: str) -> Iterator[Dict[str, Any]]:
+    for user_id in range(first_id, first_id + count):
+        yield {
+            "id": user_id,
+            "email": f"user{user_id}@example.test" if rng.random() < 0.7 else None,
+            "phone_number": f"+965{5_0000000 + user_id:08d}",
+            "hashed_password": password_hash,
+            "is_active": rng.random() < 0.97,
+            "is_superuser": False,
+            "created_at": EPOCH + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+        }
+
+
+def _patients(rng: random.Random, first_id: int, count: int, user_ids: range) -> Iterator[Dict[str, Any]]:
+    # Most accounts manage one patient; caregivers manage several
+    owners = Zipf(len(user_ids), s=0.6)
+    for patient_id in range(first_id, first_id + count):
+        first, first_ar = FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]
+        family, family_ar = FAMILY_NAMES[rng.randrange(len(FAMILY_NAMES))]
+        yield {
+            "id": patient_id,
+            "user_id": user_ids[owners.draw(rng)],
+            "full_name": f"{first_ar} {family_ar}" if rng.random() < 0.7 else f"{first} {family}",
+            "date_of_birth": date(1940, 1, 1) + timedelta(days=rng.randrange(80 * 365)),
+            "medical_record_number": f"MRN-{patient_id:09d}",
+        }
+
+
+def _masters(rng: random.Random, first_id: int, count: int) -> Iterator[Dict[str, Any]]:
+    for master_id in range(first_id, first_id + count):
+        name = _drug_name(rng)
+        yield {
+            "id": master_id,
+            "rx_cui": str(1_000_000 + master_id),
+            "trade_name_en": name["brand"],
+            "trade_name_ar": name["brand_ar"] if rng.random() < 0.3 else None,
+            "generic_name": name["generic"],
+            "strength": name["strength"],
+            "dosage_form": name["form"],
+            "source": rng.choices(SOURCES, weights=SOURCE_WEIGHTS)[0],
+            "verified_status": "verified" if rng.random() < 0.4 else "unverified",
+            "last_updated": EPOCH + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+        }
+
+
+def _locals(
+    rng: random.Random, first_id: int, count: int, master_ids: range, matched_ratio: float
+) -> Iterator[Dict[str, Any]]:
+    popular = Zipf(len(master_ids)) if master_ids else None
+    for local_id in range(first_id, first_id + count):
+        name = _drug_name(rng)
+        matched = popular is not None and rng.random() < matched_ratio
+        yield {
+            "id": local_id,
+            "moh_code": f"KUW-{local_id:07d}",
+            "trade_name_ar": f"{name['brand_ar']} {name['strength']} {name['form_ar']}" if rng.random() < 0.9 else None,
+            # MOH exports mostly carry Latin generic names, some only the Arabic one
+            "generic_name": name["generic"] if rng.random() < 0.85 else name["generic_ar"],
+            "strength": name["strength"],
+            "dosage_form": name["form"],
+            "source_file": f"moh_export_{rng.randrange(1, 13):02d}.xlsx",
+            "extracted_at": EPOCH + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            "matched_drug_id": master_ids[popular.draw(rng)] if matched else None,
+            "match_confidence": round(rng.uniform(0.6, 1.0), 3) if matched else None,
+        }
+
+
+def _schedules(
+    rng: random.Random, first_id: int, count: int, patient_ids: range, local_ids: range, starts: List[date]
+) -> Iterator[Dict[str, Any]]:
+    patients = Zipf(len(patient_ids), s=0.5)
+    drugs = Zipf(len(local_ids))
+    for schedule_id in range(first_id, first_id + count):
+        start = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+        starts.append(start)
+        ongoing = rng.random() < 0.6
+        yield {
+            "id": schedule_id,
+            "patient_id": patient_ids[patients.draw(rng)],
+            "drug_id": local_ids[drugs.draw(rng)],
+            "dosage": rng.choice(("1 tablet", "2 tablets", "5 ml", "10 ml", "1 capsule", "2 puffs", "10 units")),
+            "frequency": rng.choices(FREQUENCIES, weights=FREQUENCY_WEIGHTS)[0],
+            "start_date": start,
+            "end_date": None if ongoing else start + timedelta(days=rng.randrange(5, 91)),
+            "instructions": rng.choice((None, "بعد الأكل", "قبل النوم", "Take with food", "Avoid alcohol")),
+            "reminder_time": clock(rng.choice((7, 8, 9, 13, 14, 20, 21, 22)), rng.choice((0, 15, 30, 45))),
+            "is_active": ongoing or rng.random() < 0.1,
+        }
+
+
+def _dose_logs(
+    rng: random.Random, first_id: int, count: int, schedule_ids: range, starts: List[date]
+) -> Iterator[Dict[str, Any]]:
+    schedules = Zipf(len(schedule_ids), s=0.8)
+    for log_id in range(first_id, first_id + count):
+        index = schedules.draw(rng)
+        taken_at = datetime.combine(starts[index], clock()) + timedelta(minutes=rng.randrange(120 * 24 * 60))
+        taken = rng.random() < 0.85
+        yield {
+            "id": log_id,
+            "schedule_id": schedule_ids[index],
+            "taken_at": taken_at,
+            "taken": taken,
+            "notes": None if taken or rng.random() < 0.7 else rng.choice(("نسيت الجرعة", "Felt nauseous", "Out of stock")),
+            "recorded_at": taken_at + timedelta(minutes=rng.randrange(0, 180)),
+        }
+
+
+def _provenance(
+    rng: random.Random, first_id: int, count: int, master_ids: range, user_ids: range
+) -> Iterator[Dict[str, Any]]:
+    masters = Zipf(len(master_ids), s=0.7)
+    for provenance_id in range(first_id, first_id + count):
+        source = rng.choices(SOURCES[:3], weights=SOURCE_WEIGHTS[:3])[0]
+        verified = user_ids and rng.random() < 0.2
+        yield {
+            "id": provenance_id,
+            "entity_type": "drug_master",
+            "entity_id": master_ids[masters.draw(rng)],
+            "source": source,
+            "fetched_at": EPOCH + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            "verified_by": user_ids[rng.randrange(len(user_ids))] if verified else None,
+            "notes": json.dumps({"source_version": f"2024-{rng.randrange(1, 13):02d}"}),
+        }
+
+
+def generate(
+    session: Session,
+    counts: SyntheticCounts = SyntheticCounts(),
+    seed: int = 0,
+    progress: Optional[Callable[[str, int, float], None]] = None,
+) -> Dict[str, int]:
+    """Append ``counts`` rows per table and commit; returns the rows inserted per table."""
+
+    rng = random.Random(seed)
+    inserted: Dict[str, int] = {}
+
+    def load(name: str, model, rows: Callable[[int], Iterable[Dict[str, Any]]]) -> range:
+        first_id = _next_id(session, model)
+        started = time.perf_counter()
+        inserted[name] = _insert(session, model, rows(first_id))
+        if progress is not None:
+            progress(name, inserted[name], time.perf_counter() - started)
+        return range(first_id, first_id + inserted[name])
+
+    # One hash for every account; bcrypt per row would dominate the run
+    password_hash = get_password_hash(f"synthetic-{seed}") if counts.users else ""
+    user_ids = load("users", User, lambda first: _users(rng, first, counts.users, password_hash))
+    patient_ids = (
+        load("patients", Patient, lambda first: _patients(rng, first, counts.patients, user_ids))
+        if user_ids
+        else range(0)
+    )
+    master_ids = load("masters", DrugMaster, lambda first: _masters(rng, first, counts.masters))
+    local_ids = load(
+        "locals", DrugLocalKuwait, lambda first: _locals(rng, first, counts.locals, master_ids, counts.matched_ratio)
+    )
+    starts: List[date] = []
+    schedule_ids = (
+        load(
+            "schedules",
+            DrugSchedule,
+            lambda first: _schedules(rng, first, counts.schedules, patient_ids, local_ids, starts),
+        )
+        if patient_ids and local_ids
+        else range(0)
+    )
+    if schedule_ids:
+        load("dose_logs", DoseLog, lambda first: _dose_logs(rng, first, counts.dose_logs, schedule_ids, starts))
+    if master_ids:
+        load("provenance", Provenance, lambda first: _provenance(rng, first, counts.provenance, master_ids, user_ids))
+    session.commit()
+    return inserted
+
@@ -0,0 +1,225 @@
+"""Record/replay stand-in for the RxNorm, DailyMed and openFDA APIs.
+
+:class:`ReplayTransport` answers the sync job's requests from a recorded cassette (or, for
+names the cassette does not cover, from deterministic synthetic payloads) after a simulated
+network delay, and injects 5xx errors and ``429`` throttling at configurable rates. Wrap it in
+:class:`UpstreamRouter` to exercise the production rate limits, retries and circuit breakers.
+
+Record a cassette from the live APIs:
+``python -m benchmarks.upstream_replay --out cassette.json panadol brufen augmentin``
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from app.services.http_resilience import (
+    AsyncResilientTransport,
+    CircuitBreaker,
+    RetryPolicy,
+    TokenBucket,
+    UPSTREAM_LIMITS,
+)
+
+UPSTREAM_HOSTS: Dict[str, str] = {
+    "rxnav.nlm.nih.gov": "rxnorm",
+    "dailymed.nlm.nih.gov": "dailymed",
+    "api.fda.gov": "openfda",
+}
+
+
+def request_key(request: httpx.Request) -> str:
+    url = request.url
+    query = urlencode(sorted(url.params.multi_items()))
+    return f"{request.method} {url.host}{url.path}" + (f"?{query}" if query else "")
+
+
+class Cassette:
+    """Recorded ``(status, JSON body)`` answers keyed by method, host, path and sorted query."""
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "Cassette":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8"))["entries"])
+
+    def save(self, path: str | os.PathLike) -> None:
+        Path(path).write_text(json.dumps({"entries": self.entries}, indent=1, sort_keys=True), encoding="utf-8")
+
+    def record(self, request: httpx.Request, status: int, body: Any) -> None:
+        self.entries[request_key(request)] = {"status": status, "body": body}
+
+    def lookup(self, request: httpx.Request) -> Optional[Tuple[int, Any]]:
+        entry = self.entries.get(request_key(request))
+        return (entry["status"], entry["body"]) if entry is not None else None
+
+
+def _rxcui(name: str) -> str:
+    return str(int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16) % 9_000_000 + 1_000_000)
+
+
+def synthetic_response(request: httpx.Request) -> Tuple[int, Any]:
+    """Plausible answers in the shape of each API; names containing "unknown" resolve to nothing."""
+
+    path = request.url.path
+    if path.endswith("/rxcui"):
+        name = request.url.params.get("name", "").strip().lower()
+        ids = [] if "unknown" in name else [_rxcui(name)]
+        return 200, {"idGroup": {"name": name, "rxnormId": ids}}
+    if path.endswith("/properties"):
+        rxcui = path.split("/")[-2]
+        return 200, {"properties": {"rxcui": rxcui, "name": f"Drug {rxcui}", "tty": "SBD"}}
+    if path.endswith("/version"):
+        return 200, {"version": {"rxnormVersion": "02-Mar-2024"}}
+    if path.endswith("/spls.json"):
+        name = request.url.params.get("drug_name", "")
+        return 200, {"data": [{"setid": f"set-{_rxcui(name.lower())}", "title": name.upper()}]}
+    if "/spls/" in path:
+        set_id = path.rsplit("/", 1)[-1].removesuffix(".json")
+        return 200, {"data": [{"setid": set_id, "title": "Label", "version": 1}]}
+    if request.url.host == "api.fda.gov":
+        if path.endswith("/enforcement.json"):
+            # Most products have no recalls; openFDA answers that with a 404
+            return 404, {"error": {"code": "NOT_FOUND", "message": "No matches found!"}}
+        search = request.url.params.get("search", "")
+        return 200, {"meta": {"results": {"total": 1}}, "results": [{"id": f"fda-{_rxcui(search)}"}]}
+    return 404, {"error": "not recorded"}
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded answers with simulated latency, jitter, errors and throttling.
+
+    Every request waits ``latency`` ± ``jitter`` seconds, then fails with ``429`` (carrying
+    ``Retry-After: retry_after``) with probability ``throttle_rate`` or with ``503`` with
+    probability ``error_rate``. Otherwise it gets the cassette's answer or, if the cassette
+    has none, ``fallback``'s. ``seed`` makes the injected faults reproducible.
+    """
+
+    def __init__(
+        self,
+        cassette: Optional[Cassette] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+        fallback: Callable[[httpx.Request], Tuple[int, Any]] = synthetic_response,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.cassette = cassette or Cassette()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.fallback = fallback
+        self.statuses: Counter = Counter()
+        self.replayed = 0
+        self._random = random.Random(seed)
+        self._sleep = sleep
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await self._sleep(delay)
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            response = httpx.Response(429, headers={"Retry-After": f"{self.retry_after:g}"}, request=request)
+        elif roll < self.throttle_rate + self.error_rate:
+            response = httpx.Response(503, request=request)
+        else:
+            answer = self.cassette.lookup(request)
+            if answer is not None:
+                self.replayed += 1
+            status, body = answer if answer is not None else self.fallback(request)
+            response = httpx.Response(status, json=body, request=request)
+        self.statuses[response.status_code] += 1
+        return response
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests to ``inner`` and records every JSON answer in ``cassette``."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Optional[Cassette] = None) -> None:
+        self.inner = inner
+        self.cassette = cassette or Cassette()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        try:
+            body = json.loads(content) if content else None
+        except ValueError:
+            return response
+        self.cassette.record(request, response.status_code, body)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class UpstreamRouter(httpx.AsyncBaseTransport):
+    """Sends each request through the :class:`AsyncResilientTransport` of its upstream.
+
+    The sync job hands one transport to all three clients, and a plain transport bypasses the
+    resilience layer, so this restores it per host. Each upstream gets one transport, built
+    up front and reused, so its token bucket and circuit breaker span the whole run. ``rate_limited=False`` keeps retries and
+    breakers but lifts the token buckets, to measure the pipeline rather than the API quotas.
+    """
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        rate_limited: bool = True,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.inner = inner
+        self.transports: Dict[str, AsyncResilientTransport] = {}
+        for upstream in UPSTREAM_HOSTS.values():
+            limit = UPSTREAM_LIMITS[upstream]
+            bucket = TokenBucket(limit.requests_per_second, limit.burst) if rate_limited else TokenBucket(1e9, 10**9)
+            self.transports[upstream] = AsyncResilientTransport(
+                upstream, inner=inner, bucket=bucket, breaker=CircuitBreaker(), retry=retry, sleep=sleep
+            )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = UPSTREAM_HOSTS.get(request.url.host)
+        transport = self.transports[upstream] if upstream else self.inner
+        return await transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def main() -> None:
+    from jobs.daily_sync import lookup_external_sources
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="+", help="Drug names to look up against the live APIs")
+    parser.add_argument("--out", required=True, help="Cassette file to write (entries are merged into it)")
+    args = parser.parse_args()
+
+    cassette = Cassette.load(args.out) if Path(args.out).exists() else Cassette()
+    recorder = RecordingTransport(UpstreamRouter(httpx.AsyncHTTPTransport()), cassette)
+    candidates = list(enumerate(args.names, start=1))
+    lookups = asyncio.run(lookup_external_sources(candidates, transport=recorder))
+    cassette.save(args.out)
+    print(f"Resolved {len(lookups)}/{len(candidates)} names; {len(cassette.entries)} entries in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
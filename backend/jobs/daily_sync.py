@@ -1,20 +1,51 @@
-"""Background job stubs for daily synchronization operations."""
+"""Celery tasks that keep the drug catalog in sync with its sources.
 
+The external sync resolves unmatched Kuwait drugs against RxNorm, DailyMed and openFDA (or
+their loaded local releases): names are looked up concurrently under per-upstream limits,
+results are linked in one flush, and every attempt is recorded so dead names back off. Full
+backfills are cut into resumable chunks that a chord fans out across workers. The module
+also schedules the MOH catalog load, offline batch matching and OTP challenge purging.
+"""
+
+import asyncio
 import logging
-from typing import List
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
 
 import httpx
-from celery import Celery
+from celery import Celery, chord
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
 from app.db.session import SessionLocal
 from app.models.drug import DrugLocalKuwait, DrugMaster
 from app.models.provenance import Provenance
-from app.services import DailyMedClient, OpenFDAClient, RxNormClient
+from app.models.sync import DrugLookupAttempt, SyncChunk, SyncRun
+from app.services import AsyncDailyMedClient, AsyncOpenFDAClient, AsyncRxNormClient
+from app.services.catalog import CatalogVersion, get_catalog_version
+from app.services.catalog_cache import catalog_cache
+from app.services.dailymed_local import AsyncLocalDailyMedResolver, LocalDailyMedResolver
+from app.services.catalog_projection import MASTER_FIELDS
+from app.services.drug_masters import upsert_masters_by_rx_cui
+from app.services.drug_matcher import run_batch_match
+from app.services.http_cache import ResponseCache, shared_response_cache
+from app.services.http_client import SingleFlight
+from app.services.kuwait_catalog import load_kuwait_catalog
+from app.services.name_resolution import NameResolver
+from app.services.openfda_local import AsyncLocalOpenFDAResolver, LocalOpenFDAResolver
+from app.services.otp_store import purge_challenges
+from app.services.rxnorm_local import AsyncLocalRxNormResolver, LocalRxNormResolver, name_key
+from app.services.sync_metrics import SyncMetrics, collect, timed_db, timed_lookup, write_textfile
 
 settings = get_settings()
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 celery_app = Celery(
     "moh_medication",
     broker="redis://localhost:6379/0",
@@ -23,90 +54,704 @@ celery_app = Celery(
 celery_app.conf.update(task_default_queue=f"{settings.app_name.lower().replace(' ', '-')}-daily")
 
 
-@celery_app.task(name="drugs.sync_external_sources")
-def sync_external_sources(limit: int = 25) -> str:
-    """Attempt to reconcile unmatched Kuwait drugs against public data sources."""
+@dataclass
+class ExternalLookup:
+    """Everything fetched for one local drug; built without touching the database."""
 
-    synced = 0
-    with SessionLocal() as session:
+    local_id: int
+    master: DrugMaster
+    provenance: List[Provenance] = field(default_factory=list)
+
+
+@dataclass
+class _ResolvedConcept:
+    master: DrugMaster
+    provenance: List[Provenance]
+
+
+@dataclass
+class _LabelSources:
+    spl: Optional[Dict]
+    fda_provenance: List[Provenance]
+
+
+def _copy_provenance(provenance: Provenance) -> Provenance:
+    # A Provenance row belongs to one master, so label results shared across masters are copied
+    return Provenance(
+        entity_type=provenance.entity_type,
+        source=provenance.source,
+        fetched_at=provenance.fetched_at,
+        notes=provenance.notes,
+    )
+
+
+class _SyncLookups:
+    """One sync run's lookups, deduplicated at every level that can repeat.
+
+    Local rows are grouped by :func:`name_key` before any request, concepts are resolved once
+    per rxcui and the DailyMed/openFDA label lookups run once per normalized label name, so
+    every distinct external request is made at most once per run. The underlying clients also
+    coalesce identical requests that are in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        rx_client: AsyncRxNormClient | AsyncLocalRxNormResolver,
+        dm_client: AsyncDailyMedClient | AsyncLocalDailyMedResolver,
+        fda_client: AsyncOpenFDAClient | AsyncLocalOpenFDAResolver,
+    ) -> None:
+        self.rx_client = rx_client
+        self.dm_client = dm_client
+        self.fda_client = fda_client
+        self.concepts: SingleFlight[Optional[_ResolvedConcept]] = SingleFlight(remember=True)
+        self.labels: SingleFlight[_LabelSources] = SingleFlight(remember=True)
+        # Names and rxcuis whose lookup hit an upstream error rather than finding nothing
+        self.failed_names: Set[str] = set()
+        self._failed_concepts: Set[str] = set()
+
+    async def resolve_name(self, candidate_name: str) -> Optional[_ResolvedConcept]:
+        with timed_lookup():
+            return await self._resolve_name(candidate_name)
+
+    async def _resolve_name(self, candidate_name: str) -> Optional[_ResolvedConcept]:
+        try:
+            lookup = await self.rx_client.find_rxcui_by_string(candidate_name)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("RxNorm lookup failed for %s: %s", candidate_name, exc)
+            self.failed_names.add(candidate_name)
+            return None
+
+        rxcui = AsyncRxNormClient.extract_first_rxcui(lookup)
+        if not rxcui:
+            return None
+        # Different local spellings often land on the same concept
+        resolved = await self.concepts.do(rxcui, lambda: self._resolve_concept(rxcui, candidate_name))
+        if resolved is None and rxcui in self._failed_concepts:
+            self.failed_names.add(candidate_name)
+        return resolved
+
+    async def _resolve_concept(self, rxcui: str, candidate_name: str) -> Optional[_ResolvedConcept]:
+        try:
+            properties = await self.rx_client.get_rx_concept_properties(rxcui)
+        except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
+            LOGGER.warning("RxNorm properties lookup failed for %s: %s", rxcui, exc)
+            self._failed_concepts.add(rxcui)
+            return None
+
+        master = await self.rx_client.normalize_properties_to_drug(properties)
+        label_name = master.trade_name_en or candidate_name
+        labels = await self.labels.do(name_key(label_name), lambda: self._label_sources(label_name))
+
+        provenance_entries: List[Provenance] = [self.rx_client.create_provenance("drug_master", properties)]
+        if labels.spl:
+            provenance_entries.append(self.dm_client.create_provenance("drug_master", labels.spl))
+        provenance_entries.extend(_copy_provenance(prov) for prov in labels.fda_provenance)
+        return _ResolvedConcept(master=master, provenance=provenance_entries)
+
+    async def _label_sources(self, label_name: str) -> _LabelSources:
+        # DailyMed and the three openFDA endpoints only need the name, so they run side by side
+        spl, *fda_provenance = await asyncio.gather(
+            self.dm_client.safe_get_spl(label_name),
+            self.fda_client.safe_label_lookup(label_name),
+            self.fda_client.safe_enforcement_lookup(label_name),
+            self.fda_client.safe_ndc_lookup(label_name),
+        )
+        return _LabelSources(spl=spl, fda_provenance=[prov for prov in fda_provenance if prov])
+
+
+@dataclass
+class UpstreamClients:
+    """One API client per upstream, so their caches, pools and in-flight sharing can outlive a lookup."""
+
+    rxnorm: AsyncRxNormClient
+    dailymed: AsyncDailyMedClient
+    openfda: AsyncOpenFDAClient
+
+    @classmethod
+    def open(
+        cls, transport: Optional[httpx.AsyncBaseTransport] = None, response_cache: Optional[ResponseCache] = None
+    ) -> "UpstreamClients":
+        options = {"transport": transport, "response_cache": response_cache}
+        return cls(
+            rxnorm=AsyncRxNormClient(max_concurrency=settings.rxnorm_max_concurrency, **options),
+            dailymed=AsyncDailyMedClient(max_concurrency=settings.dailymed_max_concurrency, **options),
+            openfda=AsyncOpenFDAClient(max_concurrency=settings.openfda_max_concurrency, **options),
+        )
+
+    async def aclose(self) -> None:
+        for client in (self.rxnorm, self.dailymed, self.openfda):
+            await client.aclose()
+
+
+async def lookup_external_sources(
+    candidates: Sequence[Tuple[int, str]],
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    response_cache: Optional[ResponseCache] = None,
+    rxnorm: Optional[LocalRxNormResolver] = None,
+    openfda: Optional[LocalOpenFDAResolver] = None,
+    dailymed: Optional[LocalDailyMedResolver] = None,
+    failed: Optional[Set[int]] = None,
+    clients: Optional[UpstreamClients] = None,
+) -> List[ExternalLookup]:
+    """Resolve ``(local_id, name)`` pairs concurrently, bounded by one semaphore per upstream.
+
+    Each distinct normalized name is looked up once and the result fans out to every local
+    row sharing it. With ``rxnorm`` set, names and properties come from the loaded RxNorm
+    release instead of RxNav; with ``openfda`` set, loaded openFDA bulk endpoints answer
+    instead of the API, and with ``dailymed`` set, SPLs come from the loaded DailyMed releases.
+    If ``failed`` is given, it receives the local ids whose lookup hit an upstream error, as
+    opposed to finding nothing. Passed ``clients`` are used instead of ``transport`` and
+    ``response_cache`` and are left open for the caller to reuse.
+    """
+
+    local_ids_by_key: Dict[str, List[int]] = {}
+    names_by_key: Dict[str, str] = {}
+    for local_id, name in candidates:
+        key = name_key(name)
+        local_ids_by_key.setdefault(key, []).append(local_id)
+        names_by_key.setdefault(key, name)
+
+    owned = clients is None
+    if clients is None:
+        clients = UpstreamClients.open(transport, response_cache)
+    rx_client = AsyncLocalRxNormResolver(rxnorm) if rxnorm is not None else clients.rxnorm
+    dm_client = AsyncLocalDailyMedResolver(dailymed) if dailymed is not None else clients.dailymed
+    fda_client = AsyncLocalOpenFDAResolver(openfda, clients.openfda) if openfda is not None else clients.openfda
+    try:
+        run = _SyncLookups(rx_client, dm_client, fda_client)
+        results = await asyncio.gather(*(run.resolve_name(names_by_key[key]) for key in local_ids_by_key))
+    finally:
+        if owned:
+            await clients.aclose()
+
+    LOGGER.info(
+        "Looked up %d local drugs as %d names, %d concepts and %d label names",
+        len(candidates),
+        len(local_ids_by_key),
+        run.concepts.calls,
+        run.labels.calls,
+    )
+    if failed is not None:
+        failed.update(
+            local_id
+            for key in local_ids_by_key
+            if names_by_key[key] in run.failed_names
+            for local_id in local_ids_by_key[key]
+        )
+    # Locals sharing a key share the master and its provenance; apply_external_lookups links
+    # them all to the one master and records the provenance once.
+    return [
+        ExternalLookup(local_id=local_id, master=resolved.master, provenance=resolved.provenance)
+        for key, resolved in zip(local_ids_by_key, results)
+        if resolved is not None
+        for local_id in local_ids_by_key[key]
+    ]
+
+
+def apply_external_lookups(session: Session, lookups: Sequence[ExternalLookup]) -> int:
+    """Link locals to new or existing masters and record provenance in one flush.
+
+    Masters with an ``rx_cui`` are upserted in one statement, so parallel chunks that resolve
+    different spellings to the same new concept share its row instead of colliding on the
+    unique constraint. Stored fields win; a lookup only fills the ones still empty.
+    """
+
+    if not lookups:
+        return 0
+    locals_by_id = {
+        local.id: local
+        for local in session.query(DrugLocalKuwait).filter(DrugLocalKuwait.id.in_([item.local_id for item in lookups]))
+    }
+
+    # Linking a new variant counts as a change so catalog watermarks pick it up
+    now = datetime.utcnow()
+    linked = [item for item in lookups if item.local_id in locals_by_id]
+    rows_by_rx_cui: Dict[str, Dict[str, Any]] = {}
+    for item in linked:
+        master = item.master
+        if not master.rx_cui:
+            session.add(master)
+            continue
+        row = {name: getattr(master, name) for name in MASTER_FIELDS}
+        row["verified_status"] = master.verified_status or "unverified"
+        row["last_updated"] = now
+        existing = rows_by_rx_cui.setdefault(master.rx_cui, row)
+        existing.update({name: value for name, value in row.items() if existing[name] is None})
+
+    with timed_db("flush"):
+        master_ids = (
+            upsert_masters_by_rx_cui(session, list(rows_by_rx_cui.values()), overwrite=False)
+            if rows_by_rx_cui
+            else {}
+        )
+        session.flush()
+    for item in linked:
+        master_id = master_ids[item.master.rx_cui] if item.master.rx_cui else item.master.id
+        locals_by_id[item.local_id].matched_drug_id = master_id
+        for provenance in item.provenance:
+            provenance.entity_id = master_id
+            session.add(provenance)
+    return len(linked)
+
+
+# How long a worker may keep using a name dictionary built before later matches changed the catalog
+RESOLVER_MAX_AGE_SECONDS = 600.0
+
+
+class SyncWorker(threading.local):
+    """State one worker thread keeps between the sync chunks it runs.
+
+    Chunks share one event loop and one set of :class:`UpstreamClients`, so connection pools,
+    TTL caches and in-flight request sharing stay warm from one chunk to the next. The
+    :class:`NameResolver` is rebuilt only for a different database, or once the catalog has
+    changed and the dictionary is older than ``RESOLVER_MAX_AGE_SECONDS``: the sync's own
+    links change the catalog every chunk, and a slightly stale dictionary only delays a
+    translation to a later run.
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clients: Optional[UpstreamClients] = None
+        self._clients_for: Tuple[Any, Any] = (None, None)
+        self._resolver: Optional[NameResolver] = None
+        self._resolver_for: Tuple[Any, Optional[CatalogVersion]] = (None, None)
+        self._resolver_built = 0.0
+
+    def name_resolver(self, session: Session) -> NameResolver:
+        bind, version = session.get_bind(), get_catalog_version(session)
+        cached_bind, cached_version = self._resolver_for
+        stale = version != cached_version and time.monotonic() - self._resolver_built >= RESOLVER_MAX_AGE_SECONDS
+        if self._resolver is None or bind is not cached_bind or stale:
+            self._resolver = NameResolver.from_session(session)
+            self._resolver_for = (bind, version)
+            self._resolver_built = time.monotonic()
+        return self._resolver
+
+    def run(
+        self,
+        lookup: Callable[[UpstreamClients], Awaitable[T]],
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> T:
+        """Run ``lookup`` on this thread's loop with clients for ``transport`` and ``response_cache``."""
+
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        cached_transport, cached_cache = self._clients_for
+        if self._clients is None or transport is not cached_transport or response_cache is not cached_cache:
+            if self._clients is not None:
+                self._loop.run_until_complete(self._clients.aclose())
+            self._clients = UpstreamClients.open(transport, response_cache)
+            self._clients_for = (transport, response_cache)
+        return self._loop.run_until_complete(lookup(self._clients))
+
+
+sync_worker = SyncWorker()
+
+
+def sync_local_drugs(
+    session: Session,
+    local_drugs: Sequence[DrugLocalKuwait],
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    response_cache: Optional[ResponseCache] = None,
+) -> int:
+    """Look ``local_drugs`` up externally, link them and log each attempt; the caller owns the transaction.
+
+    Each drug is queried by its English name from :class:`NameResolver`; drugs without one
+    are recorded as attempted without spending any request. The resolver, event loop and
+    API clients are reused across calls on the same thread (see :class:`SyncWorker`).
+    """
+
+    resolver = sync_worker.name_resolver(session)
+    attempted = [(local.id, local.trade_name_ar or local.generic_name) for local in local_drugs]
+    candidates = [(local.id, query) for local in local_drugs if (query := resolver.query_name(local))]
+    skipped = {local_id for local_id, _ in attempted} - {local_id for local_id, _ in candidates}
+    if skipped:
+        LOGGER.info("Skipping %d local drugs without an English name to look up", len(skipped))
+    failed: Set[int] = set()
+    if not candidates:
+        record_lookup_attempts(session, attempted, matched=set(), failed=failed, skipped=skipped)
+        return 0
+    rxnorm = LocalRxNormResolver(session) if LocalRxNormResolver.is_loaded(session) else None
+    openfda = LocalOpenFDAResolver(session) if LocalOpenFDAResolver.is_loaded(session) else None
+    dailymed = LocalDailyMedResolver(session) if LocalDailyMedResolver.is_loaded(session) else None
+    lookups = sync_worker.run(
+        lambda clients: lookup_external_sources(
+            candidates, rxnorm=rxnorm, openfda=openfda, dailymed=dailymed, failed=failed, clients=clients
+        ),
+        transport=transport,
+        response_cache=response_cache,
+    )
+    if response_cache is not None:
+        LOGGER.info("HTTP response cache after sync: %s", response_cache.stats())
+    synced = apply_external_lookups(session, lookups)
+    record_lookup_attempts(
+        session, attempted, matched={item.local_id for item in lookups}, failed=failed, skipped=skipped
+    )
+    return synced
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Wait before looking a name up again after ``attempts`` consecutive empty lookups."""
+
+    base = timedelta(hours=settings.sync_retry_base_hours)
+    return min(base * 2 ** max(attempts - 1, 0), timedelta(days=settings.sync_retry_max_days))
+
+
+def record_lookup_attempts(
+    session: Session,
+    attempted: Sequence[Tuple[int, Optional[str]]],
+    matched: Set[int],
+    failed: Set[int],
+    skipped: Set[int] = frozenset(),
+    now: Optional[datetime] = None,
+) -> None:
+    """Update the ledger for ``(local_id, name)`` pairs that were just looked up.
+
+    Drugs that found nothing, or had no English name to look up (``skipped``), back off
+    exponentially; an upstream error leaves the drug eligible for the next run without
+    counting against it.
+    """
+
+    now = now or datetime.utcnow()
+    ids = [local_id for local_id, _ in attempted]
+    ledger = {
+        entry.local_id: entry
+        for entry in session.query(DrugLookupAttempt).filter(DrugLookupAttempt.local_id.in_(ids))
+    }
+    for local_id, name in attempted:
+        entry = ledger.get(local_id)
+        if entry is None:
+            entry = DrugLookupAttempt(local_id=local_id, attempts=0)
+            session.add(entry)
+        elif entry.name != name:
+            entry.attempts = 0
+        entry.name = name
+        entry.last_attempt_at = now
+        if local_id in matched:
+            entry.outcome, entry.attempts, entry.next_attempt_at = "matched", 0, None
+        elif local_id in failed:
+            entry.outcome, entry.next_attempt_at = "error", None
+        else:
+            entry.outcome = "no_english_name" if local_id in skipped else "unresolved"
+            entry.attempts += 1
+            entry.next_attempt_at = now + retry_delay(entry.attempts)
+
+
+def select_sync_candidates(session: Session, limit: int, now: Optional[datetime] = None) -> List[DrugLocalKuwait]:
+    """The ``limit`` unmatched drugs most worth a lookup now.
+
+    Drugs never looked up come first, oldest extraction first; then drugs whose backoff has
+    expired, fewest failed attempts first. A drug whose name changed since its last attempt
+    counts as never looked up.
+    """
+
+    now = now or datetime.utcnow()
+    lookup_name = func.coalesce(func.nullif(DrugLocalKuwait.trade_name_ar, ""), DrugLocalKuwait.generic_name)
+    fresh = or_(DrugLookupAttempt.local_id.is_(None), DrugLookupAttempt.name.is_distinct_from(lookup_name))
+    return (
+        session.query(DrugLocalKuwait)
+        .outerjoin(DrugLookupAttempt, DrugLookupAttempt.local_id == DrugLocalKuwait.id)
+        .filter(DrugLocalKuwait.matched_drug_id.is_(None))
+        .filter(or_(fresh, DrugLookupAttempt.next_attempt_at.is_(None), DrugLookupAttempt.next_attempt_at <= now))
+        .order_by(
+            case((fresh, 0), else_=1),
+            case((fresh, 0), else_=DrugLookupAttempt.attempts),
+            DrugLocalKuwait.extracted_at.asc(),
+            DrugLocalKuwait.id,
+        )
+        .limit(limit)
+        .all()
+    )
+
+
+def start_sync_run(session: Session, chunk_size: int) -> SyncRun:
+    """Resume the latest unfinished run, or start a new one from the lowest local id."""
+
+    run = (
+        session.query(SyncRun)
+        .filter(SyncRun.status != "completed")
+        .order_by(SyncRun.started_at.desc(), SyncRun.id.desc())
+        .first()
+    )
+    if run is None:
+        run = SyncRun(chunk_size=chunk_size, cursor=0)
+        session.add(run)
+    run.status = "running"
+    run.finished_at = None
+    session.commit()
+    return run
+
+
+def _stale_before(now: datetime) -> datetime:
+    return now - timedelta(seconds=settings.sync_chunk_stale_seconds)
+
+
+def _chunk_idle(stale_before: datetime):
+    """Chunks nobody is working on: not running and not queued, or held by a presumed-dead worker."""
+
+    return or_(
+        and_(
+            SyncChunk.status.in_(("pending", "failed")),
+            or_(
+                SyncChunk.dispatched_at.is_(None),
+                SyncChunk.dispatched_at < stale_before,
+                # The last dispatch has been picked up by a worker already
+                SyncChunk.dispatched_at <= SyncChunk.started_at,
+            ),
+        ),
+        and_(SyncChunk.status == "running", SyncChunk.started_at < stale_before),
+    )
+
+
+def _chunk_in_flight(stale_before: datetime):
+    """Chunks a live worker is running or that sit queued from a recent dispatch."""
+
+    return or_(
+        and_(SyncChunk.status == "running", SyncChunk.started_at >= stale_before),
+        and_(
+            SyncChunk.status.in_(("pending", "failed")),
+            SyncChunk.dispatched_at >= stale_before,
+            or_(SyncChunk.started_at.is_(None), SyncChunk.dispatched_at > SyncChunk.started_at),
+        ),
+    )
+
+
+def plan_sync_chunks(session: Session, run: SyncRun, now: Optional[datetime] = None) -> List[int]:
+    """Cut the unmatched drugs past ``run.cursor`` into chunks and return the chunk ids to dispatch.
+
+    The cursor is committed with every chunk, so a coordinator that dies part way through
+    continues from the last recorded page. Chunks that failed, never started, or have been
+    running for longer than ``sync_chunk_stale_seconds`` (their worker is presumed dead) are
+    dispatched again. Returned chunks are marked dispatched, so a coordinator that runs again
+    while they are still queued does not send them a second time.
+    """
+
+    while True:
+        ids = (
+            session.execute(
+                select(DrugLocalKuwait.id)
+                .where(DrugLocalKuwait.matched_drug_id.is_(None), DrugLocalKuwait.id > run.cursor)
+                .order_by(DrugLocalKuwait.id)
+                .limit(run.chunk_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        session.add(SyncChunk(run_id=run.id, first_local_id=ids[0], last_local_id=ids[-1]))
+        run.cursor = ids[-1]
+        session.commit()
+
+    now = now or datetime.utcnow()
+    chunk_ids = (
+        session.execute(
+            select(SyncChunk.id)
+            .where(SyncChunk.run_id == run.id, _chunk_idle(_stale_before(now)))
+            .order_by(SyncChunk.first_local_id)
+        )
+        .scalars()
+        .all()
+    )
+    if chunk_ids:
+        session.execute(update(SyncChunk).where(SyncChunk.id.in_(chunk_ids)).values(dispatched_at=now))
+    session.commit()
+    return chunk_ids
+
+
+def sync_run_in_flight(session: Session, run_id: int, now: Optional[datetime] = None) -> bool:
+    """Whether any chunk of the run is running or queued, i.e. a chord is still working on it."""
+
+    stale_before = _stale_before(now or datetime.utcnow())
+    return session.query(
+        session.query(SyncChunk).filter(SyncChunk.run_id == run_id, _chunk_in_flight(stale_before)).exists()
+    ).scalar()
+
+
+def run_sync_chunk(
+    session: Session,
+    chunk_id: int,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    response_cache: Optional[ResponseCache] = None,
+) -> int:
+    """Sync one chunk and commit its links together with its ``done`` status.
+
+    The chunk is claimed with one conditional ``UPDATE``, so when the same chunk was queued
+    twice only one worker runs it; the other returns without doing anything. The result is
+    only written while the claim still holds. Failures are recorded on the chunk rather than
+    raised, so the rest of the run (and the chord callback) carries on; the next coordinator
+    run picks failed chunks up again.
+    """
+
+    started_at = datetime.utcnow()
+    claimed = session.execute(
+        update(SyncChunk)
+        .where(
+            SyncChunk.id == chunk_id,
+            or_(
+                SyncChunk.status.in_(("pending", "failed")),
+                and_(SyncChunk.status == "running", SyncChunk.started_at < _stale_before(started_at)),
+            ),
+        )
+        .values(status="running", started_at=started_at, attempts=SyncChunk.attempts + 1, error=None)
+    ).rowcount
+    session.commit()
+    if claimed != 1:
+        return 0
+    chunk = session.get(SyncChunk, chunk_id, populate_existing=True)
+    first_local_id, last_local_id = chunk.first_local_id, chunk.last_local_id
+    ours = and_(SyncChunk.id == chunk_id, SyncChunk.status == "running", SyncChunk.started_at == started_at)
+
+    try:
         local_drugs = (
             session.query(DrugLocalKuwait)
-            .filter(DrugLocalKuwait.matched_drug_id.is_(None))
-            .order_by(DrugLocalKuwait.extracted_at.asc())
-            .limit(limit)
+            .filter(
+                DrugLocalKuwait.matched_drug_id.is_(None),
+                DrugLocalKuwait.id.between(first_local_id, last_local_id),
+            )
+            .order_by(DrugLocalKuwait.id)
             .all()
         )
-        if not local_drugs:
-            return "No unmatched drugs to sync"
-
-        with RxNormClient() as rx_client, DailyMedClient() as dm_client, OpenFDAClient() as fda_client:
-            for local in local_drugs:
-                candidate_name = local.trade_name_ar or local.generic_name
-                if not candidate_name:
-                    continue
-
-                try:
-                    lookup = rx_client.find_rxcui_by_string(candidate_name)
-                except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
-                    LOGGER.warning("RxNorm lookup failed for %s: %s", candidate_name, exc)
-                    continue
-
-                rxcui = RxNormClient.extract_first_rxcui(lookup)
-                if not rxcui:
-                    continue
-
-                try:
-                    properties = rx_client.get_rx_concept_properties(rxcui)
-                except httpx.HTTPError as exc:  # pragma: no cover - network failure guard
-                    LOGGER.warning("RxNorm properties lookup failed for %s: %s", rxcui, exc)
-                    continue
-
-                master = rx_client.normalize_properties_to_drug(properties)
-                existing = (
-                    session.query(DrugMaster)
-                    .filter(DrugMaster.rx_cui == master.rx_cui)
-                    .first()
-                )
-                if existing:
-                    existing.trade_name_en = existing.trade_name_en or master.trade_name_en
-                    existing.generic_name = existing.generic_name or master.generic_name
-                    existing.dosage_form = existing.dosage_form or master.dosage_form
-                    existing.strength = existing.strength or master.strength
-                    master = existing
-                else:
-                    session.add(master)
-                    session.flush()
-
-                local.matched_drug_id = master.id
-                provenance_entries: List[Provenance] = [
-                    rx_client.create_provenance("drug_master", properties),
-                ]
-
-                spl = dm_client.safe_get_spl(master.trade_name_en or candidate_name)
-                if spl:
-                    provenance_entries.append(dm_client.create_provenance("drug_master", spl))
-
-                for prov in (
-                    fda_client.safe_label_lookup(master.trade_name_en or candidate_name),
-                    fda_client.safe_enforcement_lookup(master.trade_name_en or candidate_name),
-                    fda_client.safe_ndc_lookup(master.trade_name_en or candidate_name),
-                ):
-                    if prov:
-                        provenance_entries.append(prov)
-
-                for provenance in provenance_entries:
-                    provenance.entity_id = master.id
-                    session.add(provenance)
-
-                synced += 1
-
+        synced = sync_local_drugs(session, local_drugs, transport=transport, response_cache=response_cache)
+        finished = session.execute(
+            update(SyncChunk).where(ours).values(status="done", synced=synced, finished_at=datetime.utcnow())
+        )
+        if finished.rowcount != 1:
+            # A coordinator took this chunk for stale and another worker has it now
+            session.rollback()
+            return 0
+        with timed_db("commit"):
+            session.commit()
+    except Exception as exc:
+        session.rollback()
+        LOGGER.exception("Sync chunk %s (locals %s-%s) failed", chunk_id, first_local_id, last_local_id)
+        session.execute(
+            update(SyncChunk).where(ours).values(status="failed", error=repr(exc), finished_at=datetime.utcnow())
+        )
         session.commit()
+        return 0
+    return synced
+
+
+def finish_sync_run(session: Session, run_id: int) -> SyncRun:
+    """Close the run once none of its chunks is in flight; otherwise leave it to the chord still working on it."""
+
+    run = session.get(SyncRun, run_id)
+    if sync_run_in_flight(session, run_id):
+        return run
+    unfinished = session.query(SyncChunk).filter(SyncChunk.run_id == run_id, SyncChunk.status != "done").count()
+    run.status = "failed" if unfinished else "completed"
+    run.finished_at = datetime.utcnow()
+    session.commit()
+    return run
+
 
-    return f"Synced {synced} drug records"
+def run_external_sync(
+    session: Session,
+    limit: int,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    response_cache: Optional[ResponseCache] = None,
+) -> SyncMetrics:
+    """Sync up to ``limit`` unmatched drugs due for a lookup and commit; returns the run's metrics."""
+
+    with collect() as metrics:
+        local_drugs = select_sync_candidates(session, limit)
+        synced = 0
+        if local_drugs:
+            synced = sync_local_drugs(session, local_drugs, transport=transport, response_cache=response_cache)
+            with timed_db("commit"):
+                session.commit()
+        metrics.finish(drugs=len(local_drugs), synced=synced)
+    return metrics
+
+
+@celery_app.task(name="drugs.sync_external_sources")
+def sync_external_sources(limit: int = 25) -> Dict[str, Any]:
+    """Attempt to reconcile unmatched Kuwait drugs against public data sources.
+
+    Returns the run summary (per-endpoint latency, cache hit rates, DB time, throughput) and
+    writes the same measurements to ``SYNC_METRICS_PATH`` in Prometheus text format.
+    """
+
+    with SessionLocal() as session:
+        metrics = run_external_sync(session, limit, response_cache=shared_response_cache())
+
+    if settings.sync_metrics_path:
+        write_textfile(metrics, settings.sync_metrics_path)
+    summary = metrics.summary()
+    LOGGER.info("Sync run summary: %s", summary)
+    if metrics.synced:
+        # Workers serving the API notice the new catalog version on their next check; this
+        # covers an in-process cache when the task runs eagerly.
+        catalog_cache.invalidate()
+    return summary
+
+
+@celery_app.task(name="drugs.sync_catalog")
+def sync_catalog(chunk_size: Optional[int] = None) -> str:
+    """Fan a full backfill of unmatched drugs out to the workers as one chord of chunk tasks.
+
+    Rate limits and concurrency caps apply per worker process, so size the worker pool with
+    the upstream allowances in mind. Calling it again while a chord is running only sends the
+    chunks that are neither running nor queued, and nothing at all if every chunk is.
+    """
+
+    with SessionLocal() as session:
+        run = start_sync_run(session, chunk_size or settings.sync_chunk_size)
+        chunk_ids = plan_sync_chunks(session, run)
+        run_id = run.id
+        in_flight = not chunk_ids and sync_run_in_flight(session, run_id)
+    if in_flight:
+        return f"Sync run {run_id} is already being worked on"
+    if not chunk_ids:
+        return finish_sync_catalog(run_id)
+    chord(sync_catalog_chunk.s(chunk_id) for chunk_id in chunk_ids)(finish_sync_catalog.si(run_id))
+    return f"Dispatched {len(chunk_ids)} chunks for sync run {run_id}"
+
+
+@celery_app.task(name="drugs.sync_catalog_chunk", acks_late=True)
+def sync_catalog_chunk(chunk_id: int) -> int:
+    with collect() as metrics, SessionLocal() as session:
+        synced = run_sync_chunk(session, chunk_id, response_cache=shared_response_cache())
+    LOGGER.info("Sync chunk %s summary: %s", chunk_id, metrics.summary())
+    return synced
+
+
+@celery_app.task(name="drugs.finish_sync_catalog")
+def finish_sync_catalog(run_id: int) -> str:
+    with SessionLocal() as session:
+        run = finish_sync_run(session, run_id)
+        synced = sum(chunk.synced for chunk in run.chunks)
+        status = run.status
+    catalog_cache.invalidate()
+    return f"Sync run {run_id} {status}: synced {synced} drug records"
+
+
+@celery_app.task(name="drugs.batch_match")
+def batch_match_local_drugs(top_k: int = 3, min_confidence: float = 0.5) -> str:
+    """Score every unmatched Kuwait drug against the master catalog without network calls."""
+
+    with SessionLocal() as session:
+        written = run_batch_match(session, top_k=top_k, min_confidence=min_confidence)
+    return f"Wrote {written} match candidates"
 
 
 @celery_app.task(name="drugs.sync_kuwait_catalog")
-def sync_kuwait_catalog() -> str:
-    """Placeholder task that will eventually synchronize Kuwait drug data."""
-    LOGGER.info("Scheduled sync_kuwait_catalog placeholder execution")
-    return "sync scheduled"
+def sync_kuwait_catalog(path: Optional[str] = None) -> Dict[str, Any]:
+    """Load the latest MOH catalog export (``KUWAIT_CATALOG_PATH`` by default) and report the row counts."""
+
+    with SessionLocal() as session:
+        stats = load_kuwait_catalog(session, path or settings.kuwait_catalog_path)
+    if stats.new or stats.changed:
+        catalog_cache.invalidate()
+    return asdict(stats)
+
+
+@celery_app.task(name="auth.purge_otp_challenges")
+def purge_otp_challenges() -> str:
+    """Delete OTP challenges that expired more than ``OTP_RETENTION_HOURS`` ago."""
+
+    with SessionLocal() as session:
+        purged = purge_challenges(session)
+    return f"Purged {purged} OTP challenges"
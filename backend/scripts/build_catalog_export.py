@@ -0,0 +1,12 @@
+"""Build the binary catalog export for the current catalog version ahead of the first download."""
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.catalog_export import ensure_catalog_export
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    with SessionLocal() as session:
+        export = ensure_catalog_export(session, settings.catalog_export_dir)
+        print(f"Catalog export {export.version_token}: {export.path} ({export.size} bytes, sha256 {export.sha256})")
@@ -0,0 +1,17 @@
+"""Load a DailyMed SPL release zip (full or incremental) into the local DailyMed tables."""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.dailymed_local import load_dailymed_release
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", help="release zips, oldest first when loading incrementals")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        for path in args.files:
+            stats = load_dailymed_release(session, path)
+            print(f"Loaded {stats.file_name}: {stats.documents} SPL documents, {stats.stored} stored")
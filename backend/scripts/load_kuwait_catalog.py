@@ -0,0 +1,20 @@
+"""Load MOH Kuwait catalog exports (CSV or XLSX) into drugs_local_kuwait, updating rows by MOH code."""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.kuwait_catalog import load_kuwait_catalog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", help="catalog exports, oldest first")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        for path in args.files:
+            stats = load_kuwait_catalog(session, path)
+            print(
+                f"Loaded {stats.file_name}: {stats.rows} rows, {stats.new} new, {stats.changed} changed, "
+                f"{stats.unchanged} unchanged, {stats.skipped} without a code, {stats.duplicates} duplicates"
+            )
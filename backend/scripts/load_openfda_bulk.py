@@ -0,0 +1,19 @@
+"""Load openFDA drug bulk downloads (drug-label/ndc/enforcement-*.json.zip) into the local openFDA tables."""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.openfda_local import load_openfda_bulk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", help="every partition of each endpoint being replaced")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        for stats in load_openfda_bulk(session, args.files):
+            print(
+                f"Loaded {stats.file_name} ({stats.endpoint}, updated {stats.last_updated}): "
+                f"{stats.records} records, {stats.keys} index keys"
+            )
@@ -0,0 +1,20 @@
+"""Load an unpacked monthly RxNorm release (its ``rrf`` directory) into the local RxNorm tables."""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.rxnorm_local import load_rxnorm_release
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="directory containing RXNCONSO.RRF, RXNSAT.RRF and RXNREL.RRF")
+    parser.add_argument("--version", default=None, help="defaults to the release folder name")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        stats = load_rxnorm_release(session, args.directory, version=args.version)
+    print(
+        f"Loaded RxNorm {stats.version}: {stats.concepts} concepts, {stats.names} names, "
+        f"{stats.attributes} attributes, {stats.relations} relations"
+    )
@@ -0,0 +1,18 @@
+"""Run the offline batch matcher across all CPU cores and store the top candidates."""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.drug_matcher import run_batch_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--min-confidence", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        written = run_batch_match(session, top_k=args.top_k, min_confidence=args.min_confidence, workers=args.workers)
+        print(f"Wrote {written} match candidates")
@@ -3,7 +3,7 @@
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
-from app.models.drug import DrugLocalKuwait
+from app.services.kuwait_catalog import KuwaitCatalogLoadStats, load_catalog_records
 
 SAMPLE_DRUGS = [
     {
@@ -33,16 +33,11 @@ SAMPLE_DRUGS = [
 ]
 
 
-def seed_drugs(session: Session) -> None:
-    for drug in SAMPLE_DRUGS:
-        exists = session.query(DrugLocalKuwait).filter(DrugLocalKuwait.moh_code == drug["moh_code"]).first()
-        if exists:
-            continue
-        session.add(DrugLocalKuwait(**drug))
-    session.commit()
+def seed_drugs(session: Session) -> KuwaitCatalogLoadStats:
+    return load_catalog_records(session, SAMPLE_DRUGS, "sample.csv")
 
 
 if __name__ == "__main__":
     with SessionLocal() as session:
-        seed_drugs(session)
-        print(f"Seeded {len(SAMPLE_DRUGS)} Kuwait drugs")
+        stats = seed_drugs(session)
+        print(f"Seeded {len(SAMPLE_DRUGS)} Kuwait drugs: {stats.new} new, {stats.changed} changed")
@@ -1,6 +1,42 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 BACKEND_PATH = Path(__file__).resolve().parents[1] / "backend"
 if str(BACKEND_PATH) not in sys.path:
     sys.path.insert(0, str(BACKEND_PATH))
+
+
+@pytest.fixture()
+def make_session():
+    """Open sessions on fresh in-memory SQLite databases with every table created."""
+
+    # Imported here so modules that skip without SQLAlchemy still collect
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.base import Base
+
+    sessions = []
+
+    def make():
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+        )
+        TestingSessionLocal = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        sessions.append(TestingSessionLocal())
+        return sessions[-1]
+
+    try:
+        yield make
+    finally:
+        for db_session in sessions:
+            db_session.close()
+
+
+@pytest.fixture()
+def session(make_session):
+    return make_session()
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from fastapi import Response
+from sqlalchemy import event
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.api.routes.admin import (
+    REMAINING_COUNT_HEADER,
+    TOTAL_COUNT_HEADER,
+    import_drugs,
+    list_unmatched_drugs,
+)
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.user import User
+from app.schemas.drug import DrugImportRequest
+from app.services.catalog_cache import catalog_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_catalog_cache():
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+
+
+@pytest.fixture()
+def unmatched(session):
+    master = DrugMaster(rx_cui="161", trade_name_en="Panadol", verified_status="verified")
+    session.add(master)
+    session.flush()
+    session.add_all(
+        [
+            DrugLocalKuwait(moh_code="KUW-001", trade_name_ar="باراسيتامول", matched_drug_id=master.id),
+            DrugLocalKuwait(moh_code="KUW-002", trade_name_ar="أموكسيسيلين", dosage_form="Capsule", source_file="a.pdf"),
+            DrugLocalKuwait(moh_code="KUW-003", trade_name_ar="سالبيوتامول", dosage_form="Inhaler", source_file="a.pdf"),
+            DrugLocalKuwait(moh_code="KUW-004", trade_name_ar="سالبيوتامول", dosage_form="Tablet", source_file="b.pdf"),
+            DrugLocalKuwait(moh_code="KUW-005", trade_name_ar=None, dosage_form="Tablet", source_file="b.pdf"),
+        ]
+    )
+    session.commit()
+    return session
+
+
+def _unmatched(session, response, cursor=None, limit=2, dosage_form=None, source_file=None, fast=False):
+    return list_unmatched_drugs(
+        response,
+        cursor=cursor,
+        limit=limit,
+        dosage_form=dosage_form,
+        source_file=source_file,
+        fast=fast,
+        db=session,
+        current_user=User(),
+    )
+
+
+def test_unmatched_queue_pages_with_counts(unmatched):
+    first_response = Response()
+    first = _unmatched(unmatched, first_response)
+    assert [drug.moh_code for drug in first] == ["KUW-002", "KUW-003"]
+    assert first_response.headers[TOTAL_COUNT_HEADER] == "4"
+    assert first_response.headers[REMAINING_COUNT_HEADER] == "2"
+
+    second_response = Response()
+    second = _unmatched(unmatched, second_response, cursor=first_response.headers[NEXT_CURSOR_HEADER])
+    assert [drug.moh_code for drug in second] == ["KUW-004", "KUW-005"]
+    assert second_response.headers[TOTAL_COUNT_HEADER] == "4"
+    assert second_response.headers[REMAINING_COUNT_HEADER] == "0"
+    assert NEXT_CURSOR_HEADER not in second_response.headers
+
+
+def test_unmatched_queue_filters_and_fast_path_agree(unmatched):
+    slow = _unmatched(unmatched, Response(), limit=10, dosage_form="Tablet", source_file="b.pdf")
+    fast = _unmatched(unmatched, Response(), limit=10, dosage_form="Tablet", source_file="b.pdf", fast=True)
+
+    assert [drug.moh_code for drug in slow] == ["KUW-004", "KUW-005"]
+    assert [item["moh_code"] for item in json.loads(fast.body)] == ["KUW-004", "KUW-005"]
+    assert fast.headers[TOTAL_COUNT_HEADER] == "2"
+
+
+def test_import_upserts_masters_in_constant_round_trips(unmatched):
+    def _request(local_ids):
+        items = [
+            {"local_id": 2, "master": {"rx_cui": "161", "generic_name": "Paracetamol", "verified_status": "verified"}},
+            {"local_id": 3, "master": {"rx_cui": "745", "trade_name_en": "Ventolin"}, "match_confidence": "0.900"},
+            {"local_id": 4, "master": {"rx_cui": "745", "strength": "100 mcg"}},
+            {"local_id": 5, "master": {"trade_name_en": "Brufen"}},
+        ]
+        return DrugImportRequest(items=[item for item in items if item["local_id"] in local_ids])
+
+    statements = []
+    event.listen(unmatched.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    imported = import_drugs(_request({2, 3, 4, 5}), db=unmatched, current_user=User())
+
+    assert [drug.id for drug in imported] == [2, 3, 4, 5]
+    panadol = unmatched.query(DrugMaster).filter(DrugMaster.rx_cui == "161").one()
+    assert panadol.trade_name_en == "Panadol" and panadol.generic_name == "Paracetamol"
+    ventolin = unmatched.query(DrugMaster).filter(DrugMaster.rx_cui == "745").one()
+    assert (ventolin.trade_name_en, ventolin.strength) == ("Ventolin", "100 mcg")
+    assert imported[1].matched_drug_id == imported[2].matched_drug_id == ventolin.id
+    assert imported[3].matched_drug.trade_name_en == "Brufen"
+    assert str(imported[1].match_confidence) == "0.900"
+    writes = [sql for sql in statements if not sql.lstrip().upper().startswith("SELECT")]
+    assert len(writes) == 3  # one upsert, one insert for rx_cui-less masters, one executemany update
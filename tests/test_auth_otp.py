@@ -1,4 +1,3 @@
-import json
 from datetime import datetime, timedelta
 
 import pytest
@@ -8,59 +7,54 @@ pytest.importorskip("sqlalchemy")
 pytest.importorskip("fastapi")
 pytest.importorskip("email_validator")
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import HTTPException
+from sqlalchemy import update
 
-from app.api.routes.auth import verify_otp
+from app.api.routes.auth import login_phone, verify_otp
+from app.core.config import get_settings
 from app.core.security import get_password_hash
-from app.db.base import Base
+from app.models.otp import OTPChallengeRecord
 from app.models.provenance import Provenance
 from app.models.user import User
-from app.schemas.token import OTPVerify
+from app.schemas.token import OTPVerify, PhoneLoginRequest
+from app.services import otp_store
+from app.services.otp_store import consume_challenge, purge_challenges
 
-
-@pytest.fixture()
-def session():
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-    )
-    TestingSessionLocal = sessionmaker(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    db_session = TestingSessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
+settings = get_settings()
 
 
-def _create_user_with_otp(session, code: str = "123456"):
+def _create_user_with_otp(session, code: str = "123456", expires_in: timedelta = timedelta(minutes=5)):
     # create user
     user = User(phone_number="96555500001", is_active=True)
     session.add(user)
     session.commit()
     session.refresh(user)
 
-    # create otp provenance
+    # create otp challenge
     request_id = "req-123"
-    metadata = {
-        "phone_number": user.phone_number,
-        "code_hash": get_password_hash(code),
-        "request_id": request_id,
-        "expires_at": (datetime.utcnow() + timedelta(minutes=5)).isoformat(),
-    }
-    prov = Provenance(
-        entity_type="otp",
-        entity_id=user.id,
-        source="test",
-        notes=json.dumps(metadata),
+    session.add(
+        OTPChallengeRecord(
+            request_id=request_id,
+            user_id=user.id,
+            phone_number=user.phone_number,
+            code_hash=get_password_hash(code),
+            expires_at=datetime.utcnow() + expires_in,
+        )
     )
-    session.add(prov)
     session.commit()
 
     return user, request_id, code
 
 
+def test_login_phone_stores_a_challenge(session):
+    challenge = login_phone(PhoneLoginRequest(phone_number="96555500002"), db=session)
+
+    stored = session.get(OTPChallengeRecord, challenge.request_id)
+    assert stored.phone_number == "96555500002"
+    assert (stored.used_at, stored.attempts) == (None, 0)
+    assert session.query(Provenance).count() == 0
+
+
 def test_verify_otp_marks_code_as_used(session):
     user, request_id, code = _create_user_with_otp(session)
 
@@ -69,19 +63,10 @@ def test_verify_otp_marks_code_as_used(session):
         request_id=request_id,
         code=code,
     )
-    verify_otp(payload, db=session)
-
-    prov = (
-        session.query(Provenance)
-        .filter(
-            Provenance.entity_id == user.id,
-            Provenance.entity_type == "otp",
-        )
-        .first()
-    )
-    data = json.loads(prov.notes)
+    token = verify_otp(payload, db=session)
 
-    assert data.get("used_at") is not None
+    assert token.access_token
+    assert session.get(OTPChallengeRecord, request_id).used_at is not None
 
 
 def test_verify_otp_rejects_reuse(session):
@@ -101,3 +86,88 @@ def test_verify_otp_rejects_reuse(session):
 
     # نتأكد أن الرسالة فعلاً تقول إنه مستعمل
     assert "used" in str(excinfo.value).lower() or "otp" in str(excinfo.value).lower()
+
+
+def test_consume_is_a_compare_and_set(session, monkeypatch):
+    user, request_id, code = _create_user_with_otp(session)
+
+    def racing_verify(plain, hashed):
+        # A concurrent verification consumes the row while this one is checking the hash
+        session.execute(update(OTPChallengeRecord).values(used_at=datetime.utcnow()))
+        return True
+
+    monkeypatch.setattr(otp_store, "verify_password", racing_verify)
+
+    with pytest.raises(ValueError, match="already used"):
+        consume_challenge(session, request_id, user.id, code)
+
+
+def test_wrong_codes_lock_the_challenge(session):
+    user, request_id, code = _create_user_with_otp(session)
+    wrong = OTPVerify(phone_number=user.phone_number, request_id=request_id, code="000000")
+
+    for _ in range(settings.otp_max_attempts):
+        with pytest.raises(HTTPException, match="Invalid OTP"):
+            verify_otp(wrong, db=session)
+
+    assert session.get(OTPChallengeRecord, request_id).attempts == settings.otp_max_attempts
+    # حتى الكود الصحيح ما يمشي بعد ما تخلص المحاولات
+    right = OTPVerify(phone_number=user.phone_number, request_id=request_id, code=code)
+    with pytest.raises(HTTPException, match="locked"):
+        verify_otp(right, db=session)
+
+
+def test_parallel_guesses_cannot_exceed_the_attempt_limit(session, monkeypatch):
+    user, request_id, _ = _create_user_with_otp(session)
+    pending = list(range(settings.otp_max_attempts + 3))
+    evaluated = []
+    outcomes = []
+
+    def guess():
+        pending.pop()
+        try:
+            consume_challenge(session, request_id, user.id, "000000")
+        except ValueError as exc:
+            outcomes.append(str(exc))
+
+    def slow_verify(plain, hashed):
+        # Every other guess arrives while this one is still hashing
+        evaluated.append(plain)
+        while pending:
+            guess()
+        return False
+
+    monkeypatch.setattr(otp_store, "verify_password", slow_verify)
+    guess()
+
+    assert len(evaluated) == settings.otp_max_attempts
+    assert outcomes.count("OTP locked after too many attempts") == 3
+    assert session.get(OTPChallengeRecord, request_id).attempts == settings.otp_max_attempts
+
+
+def test_expired_and_foreign_challenges_are_rejected(session):
+    user, request_id, code = _create_user_with_otp(session, expires_in=timedelta(minutes=-1))
+
+    with pytest.raises(ValueError, match="expired"):
+        consume_challenge(session, request_id, user.id, code)
+    with pytest.raises(ValueError, match="Invalid request"):
+        consume_challenge(session, request_id, user.id + 1, code)
+    with pytest.raises(ValueError, match="Invalid request"):
+        consume_challenge(session, "missing", user.id, code)
+
+
+def test_purge_deletes_challenges_past_retention(session):
+    user, request_id, _ = _create_user_with_otp(session, expires_in=timedelta(hours=-2))
+    session.add(
+        OTPChallengeRecord(
+            request_id="fresh",
+            user_id=user.id,
+            phone_number=user.phone_number,
+            code_hash="x",
+            expires_at=datetime.utcnow() - timedelta(minutes=10),
+        )
+    )
+    session.commit()
+
+    assert purge_challenges(session, retention=timedelta(hours=1)) == 1
+    assert [row.request_id for row in session.query(OTPChallengeRecord)] == ["fresh"]
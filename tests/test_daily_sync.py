@@ -0,0 +1,318 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("celery")
+
+import httpx
+from sqlalchemy import event
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.provenance import Provenance
+from app.models.sync import DrugLookupAttempt, SyncChunk, SyncRun
+from app.services import AsyncRxNormClient
+from app.services.name_resolution import NameResolver
+from jobs.daily_sync import (
+    apply_external_lookups,
+    finish_sync_run,
+    lookup_external_sources,
+    plan_sync_chunks,
+    retry_delay,
+    run_external_sync,
+    run_sync_chunk,
+    select_sync_candidates,
+    start_sync_run,
+    sync_run_in_flight,
+)
+
+LATENCY = 0.05
+
+
+class FakeUpstreams:
+    """Answers RxNorm, DailyMed and openFDA paths after a fixed delay, tracking concurrency per host."""
+
+    def __init__(self, trade_names=None):
+        self.trade_names = trade_names or {}
+        self.in_flight = Counter()
+        self.peak = Counter()
+        self.requests = Counter()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests[str(request.url)] += 1
+        self.in_flight[host] += 1
+        self.peak[host] = max(self.peak[host], self.in_flight[host])
+        try:
+            await asyncio.sleep(LATENCY)
+            return httpx.Response(200, json=self._payload(request))
+        finally:
+            self.in_flight[host] -= 1
+
+    def _payload(self, request: httpx.Request) -> dict:
+        path = request.url.path
+        if path.endswith("/rxcui"):
+            name = request.url.params["name"]
+            return {"idGroup": {"rxnormId": [] if name == "unknown" else [f"rx-{name}"]}}
+        if path.endswith("/properties"):
+            rxcui = path.split("/")[-2]
+            name = self.trade_names.get(rxcui, rxcui.removeprefix("rx-").title())
+            return {"properties": {"rxcui": rxcui, "name": name}}
+        if path.endswith("/version"):
+            return {"version": {"rxnormVersion": "2024-03"}}
+        if path.endswith("/spls.json"):
+            return {"data": [{"setid": "set-1"}]}
+        if "/spls/" in path:
+            return {"data": [{"setid": "set-1", "title": "Label"}]}
+        return {"results": [{"id": "fda-1"}]}
+
+
+def test_lookups_run_concurrently_within_per_upstream_limits(session):
+    upstreams = FakeUpstreams()
+    session.add(DrugMaster(rx_cui="rx-drug0", trade_name_en=None))
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}") for index in range(1, 12))
+    session.commit()
+    candidates = [(index, f"drug{index % 10}") for index in range(1, 11)] + [(11, "unknown")]
+
+    started = time.perf_counter()
+    lookups = asyncio.run(lookup_external_sources(candidates, transport=httpx.MockTransport(upstreams)))
+    elapsed = time.perf_counter() - started
+
+    assert len(lookups) == 10
+    # 10 drugs x 7 round trips sequentially would take ~70 latencies
+    assert elapsed < 25 * LATENCY
+    assert 1 < upstreams.peak["rxnav.nlm.nih.gov"] <= 8
+    assert 1 < upstreams.peak["api.fda.gov"] <= 4
+    assert upstreams.peak["dailymed.nlm.nih.gov"] <= 4
+
+    assert apply_external_lookups(session, lookups) == 10
+    session.commit()
+    linked = {local.id: local.matched_drug for local in session.query(DrugLocalKuwait) if local.matched_drug}
+    assert len(linked) == 10
+    assert linked[10].rx_cui == "rx-drug0" and linked[10].trade_name_en == "Drug0"
+    assert linked[1].source_version == "2024-03"
+    assert session.query(DrugMaster).count() == 10
+    # RxNorm + DailyMed + three openFDA entries per linked drug
+    assert session.query(Provenance).count() == 50
+
+
+def test_each_distinct_request_is_made_once_per_run(session):
+    # Two spellings of "brufen" and a generic name whose concept carries the same trade name
+    upstreams = FakeUpstreams(trade_names={"rx-ibuprofen": "Brufen"})
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}") for index in range(1, 8))
+    session.commit()
+    candidates = [
+        (1, "Panadol"),
+        (2, "panadol "),
+        (3, "PANADOL"),
+        (4, "Brufen"),
+        (5, " brufen"),
+        (6, "ibuprofen"),
+        (7, "unknown"),
+    ]
+
+    lookups = asyncio.run(lookup_external_sources(candidates, transport=httpx.MockTransport(upstreams)))
+
+    assert sorted(lookup.local_id for lookup in lookups) == [1, 2, 3, 4, 5, 6]
+    assert set(upstreams.requests.values()) == {1}
+    paths = Counter(url.split("?")[0].rsplit("/", 1)[-1] for url in upstreams.requests)
+    # panadol, brufen, ibuprofen and unknown by name; the two resolved labels once each
+    assert paths["rxcui"] == 4
+    assert paths["properties"] == 3
+    assert paths["spls.json"] == 2
+    assert paths["label.json"] == 2
+
+    assert apply_external_lookups(session, lookups) == 6
+    session.commit()
+    masters = {local.id: local.matched_drug.rx_cui for local in session.query(DrugLocalKuwait) if local.matched_drug}
+    assert masters == {1: "rx-Panadol", 2: "rx-Panadol", 3: "rx-Panadol", 4: "rx-Brufen", 5: "rx-Brufen", 6: "rx-ibuprofen"}
+    # Provenance is recorded per master, not per local row, and label results are not shared rows
+    assert session.query(Provenance).count() == 3 * 5
+    assert session.query(Provenance).filter(Provenance.entity_id.is_(None)).count() == 0
+
+
+def test_chunks_racing_on_a_new_concept_share_its_master(session):
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}") for index in (1, 2))
+    session.commit()
+    lookups = asyncio.run(
+        lookup_external_sources([(1, "Panadol"), (2, "panadol")], transport=httpx.MockTransport(FakeUpstreams()))
+    )
+    raced = []
+
+    @event.listens_for(session.get_bind(), "before_cursor_execute")
+    def another_chunk_inserts_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO drugs_master") and not raced:
+            raced.append(statement)
+            cursor.execute(
+                "INSERT INTO drugs_master (rx_cui, generic_name, verified_status, last_updated)"
+                " VALUES ('rx-Panadol', 'paracetamol', 'verified', '2024-01-01 00:00:00')"
+            )
+
+    assert apply_external_lookups(session, lookups) == 2
+    session.commit()
+
+    assert raced
+    master = session.query(DrugMaster).one()
+    assert {local.matched_drug_id for local in session.query(DrugLocalKuwait)} == {master.id}
+    # The stored row wins field by field; the lookup only fills what it lacked
+    assert (master.generic_name, master.verified_status, master.trade_name_en) == ("paracetamol", "verified", "Panadol")
+    assert session.query(Provenance).filter(Provenance.entity_id != master.id).count() == 0
+
+
+def test_concurrent_identical_requests_share_one_round_trip():
+    upstreams = FakeUpstreams()
+
+    async def fetch_versions():
+        async with AsyncRxNormClient(transport=httpx.MockTransport(upstreams)) as client:
+            return await asyncio.gather(*(client.get_rxnorm_version() for _ in range(5)))
+
+    versions = asyncio.run(fetch_versions())
+
+    assert versions == [{"version": {"rxnormVersion": "2024-03"}}] * 5
+    assert sum(upstreams.requests.values()) == 1
+
+
+def test_chunked_sync_records_progress_and_resumes_failed_chunks(session):
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}", generic_name=f"drug{index}") for index in range(1, 8))
+    session.commit()
+
+    def broken(request):
+        raise RuntimeError("upstream exploded")
+
+    run = start_sync_run(session, chunk_size=3)
+    chunk_ids = plan_sync_chunks(session, run)
+    chunks = [session.get(SyncChunk, chunk_id) for chunk_id in chunk_ids]
+    assert [(chunk.first_local_id, chunk.last_local_id) for chunk in chunks] == [(1, 3), (4, 6), (7, 7)]
+    assert run.cursor == 7
+
+    assert run_sync_chunk(session, chunk_ids[0], transport=httpx.MockTransport(broken)) == 0
+    assert run_sync_chunk(session, chunk_ids[1], transport=httpx.MockTransport(FakeUpstreams())) == 3
+    assert run_sync_chunk(session, chunk_ids[2], transport=httpx.MockTransport(FakeUpstreams())) == 1
+    assert finish_sync_run(session, run.id).status == "failed"
+    assert chunks[0].status == "failed" and "upstream exploded" in chunks[0].error
+    # The failed chunk rolled back on its own; the other chunks stayed committed
+    assert session.query(DrugLocalKuwait).filter(DrugLocalKuwait.matched_drug_id.isnot(None)).count() == 4
+
+    # A late arrival and the failed chunk are all the resumed run has left to do
+    session.add(DrugLocalKuwait(id=8, moh_code="KUW-8", generic_name="drug8"))
+    session.commit()
+    resumed = start_sync_run(session, chunk_size=3)
+    assert resumed.id == run.id
+    remaining = plan_sync_chunks(session, resumed)
+    assert remaining[0] == chunk_ids[0] and len(remaining) == 2
+    for chunk_id in remaining:
+        run_sync_chunk(session, chunk_id, transport=httpx.MockTransport(FakeUpstreams()))
+
+    finished = finish_sync_run(session, run.id)
+    assert finished.status == "completed"
+    assert session.get(SyncChunk, chunk_ids[0]).attempts == 2
+    assert sum(chunk.synced for chunk in finished.chunks) == 8
+    assert session.query(DrugLocalKuwait).filter(DrugLocalKuwait.matched_drug_id.is_(None)).count() == 0
+    assert session.query(SyncRun).count() == 1
+
+
+def test_chunks_on_one_worker_share_the_resolver_and_warm_clients(session, monkeypatch):
+    session.add_all(
+        DrugLocalKuwait(id=index, moh_code=f"KUW-{index}", generic_name=f"drug{index % 3}") for index in range(1, 7)
+    )
+    session.commit()
+    built = []
+    from_session = NameResolver.from_session
+    monkeypatch.setattr(NameResolver, "from_session", lambda db: built.append(db) or from_session(db))
+    upstreams = FakeUpstreams()
+    transport = httpx.MockTransport(upstreams)
+
+    run = start_sync_run(session, chunk_size=3)
+    chunk_ids = plan_sync_chunks(session, run)
+    assert [run_sync_chunk(session, chunk_id, transport=transport) for chunk_id in chunk_ids] == [3, 3]
+
+    # The second chunk links the catalog but reuses the dictionary and the first chunk's responses
+    assert len(built) == 1
+    assert set(upstreams.requests.values()) == {1}
+    assert finish_sync_run(session, run.id).status == "completed"
+
+
+def test_chunks_are_dispatched_and_claimed_once(session):
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}", generic_name=f"drug{index}") for index in range(1, 5))
+    session.commit()
+    transport = httpx.MockTransport(FakeUpstreams())
+
+    run = start_sync_run(session, chunk_size=2)
+    first, second = plan_sync_chunks(session, run)
+    # A coordinator running again while the chord is queued sends nothing and leaves the run open
+    assert start_sync_run(session, chunk_size=2).id == run.id
+    assert plan_sync_chunks(session, run) == []
+    assert sync_run_in_flight(session, run.id)
+
+    # Another worker holds the second chunk; a duplicate delivery leaves it alone
+    session.get(SyncChunk, second).status = "running"
+    session.get(SyncChunk, second).started_at = datetime.utcnow()
+    session.commit()
+    assert run_sync_chunk(session, second, transport=transport) == 0
+    assert session.get(SyncChunk, second).attempts == 0
+
+    assert run_sync_chunk(session, first, transport=transport) == 2
+    assert run_sync_chunk(session, first, transport=transport) == 0
+    assert session.get(SyncChunk, first).attempts == 1
+    assert finish_sync_run(session, run.id).status == "running"
+
+    # Once the holder is presumed dead the chunk is dispatched and claimed again
+    later = datetime.utcnow() + timedelta(hours=2)
+    assert plan_sync_chunks(session, run, now=later) == [second]
+    session.get(SyncChunk, second).started_at = later - timedelta(hours=3)
+    session.commit()
+    assert run_sync_chunk(session, second, transport=transport) == 2
+    assert finish_sync_run(session, run.id).status == "completed"
+
+
+def test_unresolvable_drugs_back_off_instead_of_starving_the_queue(session):
+    extracted = datetime(2024, 1, 1)
+    session.add_all(
+        [
+            DrugLocalKuwait(id=1, moh_code="KUW-1", trade_name_ar="unknown", extracted_at=extracted),
+            DrugLocalKuwait(id=2, moh_code="KUW-2", generic_name="drug2", extracted_at=extracted),
+            DrugLocalKuwait(id=3, moh_code="KUW-3", generic_name="flaky", extracted_at=extracted),
+            DrugLocalKuwait(id=4, moh_code="KUW-4", extracted_at=extracted),
+        ]
+    )
+    session.commit()
+    upstreams = FakeUpstreams()
+
+    async def flaky_rxnorm(request):
+        if request.url.params.get("name") == "flaky":
+            return httpx.Response(503)
+        return await upstreams(request)
+
+    metrics = run_external_sync(session, limit=10, transport=httpx.MockTransport(flaky_rxnorm))
+    assert (metrics.drugs, metrics.synced) == (4, 1)
+    ledger = {entry.local_id: entry for entry in session.query(DrugLookupAttempt)}
+    assert {local_id: (entry.outcome, entry.attempts) for local_id, entry in ledger.items()} == {
+        1: ("unresolved", 1),
+        2: ("matched", 0),
+        3: ("error", 0),
+        4: ("no_english_name", 1),
+    }
+    assert ledger[1].next_attempt_at - ledger[1].last_attempt_at == retry_delay(1)
+
+    # A new arrival goes first; the transient failure is retried right away, the dead names wait
+    session.add(DrugLocalKuwait(id=5, moh_code="KUW-5", generic_name="drug5", extracted_at=extracted + timedelta(days=1)))
+    session.commit()
+    assert [local.id for local in select_sync_candidates(session, 10)] == [5, 3]
+    later = datetime.utcnow() + retry_delay(1) + timedelta(minutes=1)
+    assert [local.id for local in select_sync_candidates(session, 10, now=later)] == [5, 3, 1, 4]
+
+    # Learning a new name for a drug makes it worth looking up again immediately
+    session.get(DrugLocalKuwait, 1).trade_name_ar = "drug1"
+    session.commit()
+    assert [local.id for local in select_sync_candidates(session, 2)] == [1, 5]
+    assert run_external_sync(session, limit=2, transport=httpx.MockTransport(upstreams)).synced == 2
+    assert session.get(DrugLookupAttempt, 1).outcome == "matched"
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    assert [retry_delay(attempts) for attempts in (1, 2, 3)] == [timedelta(hours=24), timedelta(hours=48), timedelta(hours=96)]
+    assert retry_delay(20) == timedelta(days=30)
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+import httpx
+
+from app.models.dailymed import DailyMedSPL
+from app.services.dailymed_local import LocalDailyMedResolver, load_dailymed_release, parse_spl
+from jobs.daily_sync import lookup_external_sources
+
+FIXTURES = Path(__file__).parent / "fixtures" / "dailymed"
+
+
+def _release(path, *documents):
+    """Build a release the way DailyMed ships it: a zip of per-document zips with images."""
+
+    with zipfile.ZipFile(path, "w") as release:
+        for name in documents:
+            nested = io.BytesIO()
+            with zipfile.ZipFile(nested, "w", compression=zipfile.ZIP_DEFLATED) as spl:
+                spl.write(FIXTURES / name, arcname=f"{Path(name).stem}.xml")
+                spl.writestr("label-image.jpg", b"\xff\xd8\xff")
+            release.writestr(f"prescription/20240301_{Path(name).stem}.zip", nested.getvalue())
+    return path
+
+
+def test_parse_spl_extracts_product_and_sections():
+    with (FIXTURES / "panadol_v2.xml").open("rb") as stream:
+        document = parse_spl(stream)
+
+    assert (document.set_id, document.version, document.effective_time) == ("set-panadol", 2, "20230412")
+    assert document.title == "PANADOL- acetaminophen tablet, film coated Haleon"
+    assert (document.product_name, document.generic_name) == ("Panadol", "acetaminophen")
+    assert (document.strength, document.dosage_form) == ("500 mg", "TABLET, FILM COATED")
+    assert document.sections["indications_and_usage"].endswith("Temporary relief of minor aches and pains.")
+    # Text of nested subsections belongs to the enclosing key section
+    assert "severe liver damage" in document.sections["warnings_and_precautions"]
+    assert set(document.sections) == {"indications_and_usage", "warnings_and_precautions", "dosage_and_administration"}
+
+    with (FIXTURES / "brufen_v1.xml").open("rb") as stream:
+        assert parse_spl(stream).strength == "100 mg/5 mL"
+
+
+def test_releases_keep_the_newest_version_of_each_set(session, tmp_path):
+    full = load_dailymed_release(session, _release(tmp_path / "full.zip", "panadol_v2.xml", "brufen_v1.xml"))
+    # An older incremental loaded afterwards must not roll the label back
+    stale = load_dailymed_release(session, _release(tmp_path / "stale.zip", "panadol_v1.xml"))
+
+    assert (full.documents, full.stored) == (2, 2)
+    assert (stale.documents, stale.stored) == (1, 0)
+    assert session.get(DailyMedSPL, "set-panadol").version == 2
+
+    resolver = LocalDailyMedResolver(session)
+    assert LocalDailyMedResolver.is_loaded(session)
+    assert resolver.search_spls("ACETAMINOPHEN")["data"][0]["setid"] == "set-panadol"
+    spl = resolver.safe_get_spl(" panadol ")
+    assert spl["data"][0]["strength"] == "500 mg"
+    assert resolver.safe_get_spl("unknown") is None
+
+    drug = resolver.normalize_spl_to_drug(resolver.get_spl_details("set-brufen"))
+    assert (drug.generic_name, drug.strength, drug.dosage_form, drug.source_version) == (
+        "ibuprofen",
+        "100 mg/5 mL",
+        "SUSPENSION",
+        "1",
+    )
+    notes = json.loads(resolver.create_provenance("drug_master", spl).notes)
+    assert "severe liver damage" in notes["warnings"]
+    assert notes["last_updated"] == "20230412"
+
+
+def test_sync_uses_loaded_spls_without_calling_dailymed(session, tmp_path):
+    load_dailymed_release(session, _release(tmp_path / "full.zip", "panadol_v2.xml"))
+    hosts = []
+
+    def upstreams(request):
+        hosts.append(request.url.host)
+        if request.url.path.endswith("/rxcui"):
+            return httpx.Response(200, json={"idGroup": {"rxnormId": ["161"]}})
+        if request.url.path.endswith("/properties"):
+            return httpx.Response(200, json={"properties": {"rxcui": "161", "name": "Panadol"}})
+        return httpx.Response(404)
+
+    lookups = asyncio.run(
+        lookup_external_sources(
+            [(1, "panadol")],
+            transport=httpx.MockTransport(upstreams),
+            dailymed=LocalDailyMedResolver(session),
+        )
+    )
+
+    assert "dailymed.nlm.nih.gov" not in hosts
+    sources = [provenance.source for provenance in lookups[0].provenance]
+    assert sources == ["rxnorm", "dailymed"]
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.models.drug import DrugLocalKuwait, DrugMatchCandidate, DrugMaster
+from app.services.drug_matcher import normalize_generic_name, parse_strengths, run_batch_match
+
+
+def test_normalization_strips_strength_and_form():
+    assert normalize_generic_name("Amoxicillin 250mg Capsules") == "amoxicillin"
+    assert parse_strengths("0.5 g") == parse_strengths("500 mg")
+    assert parse_strengths("100 mcg/dose") == frozenset({(0.1, "mg")})
+
+
+def test_run_batch_match_ranks_candidates(session):
+    session.add_all(
+        [
+            DrugMaster(id=1, rx_cui="1", generic_name="Amoxicillin", strength="250 mg", dosage_form="Capsule"),
+            DrugMaster(id=2, rx_cui="2", generic_name="Amoxicillin", strength="500 mg", dosage_form="Capsule"),
+            DrugMaster(id=3, rx_cui="3", generic_name="Salbutamol", strength="100 mcg", dosage_form="Inhaler"),
+            DrugLocalKuwait(id=10, moh_code="KUW-010", generic_name="Amoxicilin", strength="250mg", dosage_form="Caps"),
+            DrugLocalKuwait(id=11, moh_code="KUW-011", generic_name="Unknownium", strength="5mg"),
+            DrugLocalKuwait(id=12, moh_code="KUW-012", generic_name="Salbutamol", matched_drug_id=3),
+        ]
+    )
+    session.commit()
+
+    written = run_batch_match(session, top_k=2, workers=1)
+    candidates = session.query(DrugMatchCandidate).order_by(DrugMatchCandidate.rank).all()
+
+    assert written == 2
+    assert [(c.local_id, c.master_id, c.rank) for c in candidates] == [(10, 1, 1), (10, 2, 2)]
+    assert candidates[0].confidence > candidates[1].confidence
+
+    # re-running replaces rather than duplicates the matcher's rows
+    assert run_batch_match(session, top_k=2, workers=1) == 2
+    assert session.query(DrugMatchCandidate).count() == 2
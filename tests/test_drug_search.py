@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from app.api.routes.drugs import search_drugs
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.user import User
+from app.services.drug_search import DrugSearchIndex, drug_search_index, normalize_text
+
+
+def test_normalize_text_folds_arabic_variants():
+    assert normalize_text("أَمُوكسِيسِيلـــين") == normalize_text("اموكسيسيلين")
+    assert normalize_text("إبوبروفين") == "ابوبروفين"
+    assert normalize_text("مستشفى") == normalize_text("مستشفي")
+    assert normalize_text("حبة") == "حبه"
+    assert normalize_text("Panadol-Extra") == "panadol extra"
+
+
+def test_search_matches_prefix_and_trigram_and_hides_unverified(session):
+    verified = DrugMaster(rx_cui="161", trade_name_en="Panadol Extra", verified_status="verified")
+    unverified = DrugMaster(rx_cui="723", trade_name_en="Amoxil", verified_status="unverified")
+    session.add_all([verified, unverified])
+    session.flush()
+    paracetamol = DrugLocalKuwait(moh_code="KUW-001", trade_name_ar="باراسيتامول", matched_drug_id=verified.id)
+    amoxicillin = DrugLocalKuwait(moh_code="KUW-002", trade_name_ar="أموكسيسيلين", matched_drug_id=unverified.id)
+    ibuprofen = DrugLocalKuwait(moh_code="KUW-003", trade_name_ar="إيبوبروفين", generic_name="Ibuprofen")
+    session.add_all([paracetamol, amoxicillin, ibuprofen])
+    session.commit()
+
+    index = DrugSearchIndex()
+    index.ensure_current(session)
+
+    assert index.search("بارا") == [paracetamol.id]
+    assert index.search("panad") == [paracetamol.id]
+    assert index.search("ايبو") == [ibuprofen.id]
+    assert index.search("buprofen") == [ibuprofen.id]
+    assert index.search("اموكس") == []
+
+    unverified.verified_status = "verified"
+    session.commit()
+    index.refresh_rows(session, [amoxicillin.id])
+
+    assert index.search("اموكس") == [amoxicillin.id]
+
+
+def _search(session, q):
+    return search_drugs(q=q, limit=20, db=session, current_user=User())
+
+
+def test_search_route_rechecks_visibility_in_the_database(session):
+    master = DrugMaster(rx_cui="161", trade_name_en="Panadol", verified_status="verified")
+    session.add(master)
+    session.flush()
+    panadol = DrugLocalKuwait(moh_code="KUW-001", trade_name_ar="بانادول", matched_drug_id=master.id)
+    panadol_night = DrugLocalKuwait(moh_code="KUW-002", trade_name_ar="بانادول نايت")
+    session.add_all([panadol, panadol_night])
+    session.commit()
+    drug_search_index.clear()
+    try:
+        assert sorted(drug.moh_code for drug in _search(session, "بانادول")) == ["KUW-001", "KUW-002"]
+
+        # Hidden and deleted before the index's next periodic refresh
+        master.verified_status = "unverified"
+        session.delete(panadol_night)
+        session.commit()
+
+        assert _search(session, "بانادول") == []
+        assert drug_search_index.search("بانادول") == []
+        assert len(drug_search_index) == 1
+    finally:
+        drug_search_index.clear()
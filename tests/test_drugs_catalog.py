@@ -0,0 +1,339 @@
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from fastapi import BackgroundTasks, HTTPException, Response
+from sqlalchemy import event
+
+from app.api.pagination import DEFAULT_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_phases
+from app.api.routes import drugs as drug_routes
+from app.api.routes.drugs import (
+    _stream_drug_array,
+    _stream_drugs,
+    export_drugs,
+    get_drug,
+    list_drug_changes,
+    list_drugs,
+)
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.user import User
+from app.schemas.drug import DrugLocal
+from app.services import catalog_cache as catalog_cache_module
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_export import decode_catalog, ensure_catalog_export
+
+
+@pytest.fixture(autouse=True)
+def clean_catalog_cache():
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+
+
+@pytest.fixture()
+def catalog(session):
+    verified = DrugMaster(rx_cui="161", trade_name_en="Panadol", verified_status="verified")
+    unverified = DrugMaster(rx_cui="723", trade_name_en="Amoxil", verified_status="unverified")
+    session.add_all([verified, unverified])
+    session.flush()
+    session.add_all(
+        [
+            DrugLocalKuwait(moh_code="KUW-001", trade_name_ar="باراسيتامول", matched_drug_id=verified.id),
+            DrugLocalKuwait(moh_code="KUW-002", trade_name_ar="أموكسيسيلين", matched_drug_id=unverified.id),
+            DrugLocalKuwait(moh_code="KUW-003", trade_name_ar="سالبيوتامول"),
+            DrugLocalKuwait(moh_code="KUW-004", trade_name_ar="سالبيوتامول"),
+            DrugLocalKuwait(moh_code="KUW-005", trade_name_ar=None, generic_name="Ibuprofen"),
+        ]
+    )
+    session.commit()
+    return session
+
+
+def _list(session, response, cursor=None, limit=2, if_none_match=None, fast=False):
+    return list_drugs(
+        response,
+        cursor=cursor,
+        limit=limit,
+        stream=False,
+        fast=fast,
+        if_none_match=if_none_match,
+        db=session,
+        current_user=User(),
+    )
+
+
+def _page(session, cursor=None, limit=2):
+    response = Response()
+    drugs = _list(session, response, cursor=cursor, limit=limit)
+    return [drug.moh_code for drug in drugs], response.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_list_drugs_pages_with_cursor(catalog):
+    seen = []
+    cursor = None
+    while True:
+        codes, cursor = _page(catalog, cursor)
+        seen.extend(codes)
+        if cursor is None:
+            break
+
+    # unverified matches are hidden and NULL names sort last
+    assert seen == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+
+
+def test_keyset_pages_walk_named_rows_then_the_null_tail(catalog):
+    named, unnamed = keyset_phases(("سالبيوتامول", "KUW-003"))
+    assert "(drugs_local_kuwait.trade_name_ar, drugs_local_kuwait.moh_code) >" in str(named)
+    assert " OR " not in str(named)
+
+    seen = []
+    cursor = None
+    while True:
+        response = _list(catalog, Response(), cursor=cursor, limit=1, fast=True)
+        seen.extend(item["moh_code"] for item in json.loads(response.body))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert seen == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+    streamed = _stream_drugs(catalog.get_bind(), ("سالبيوتامول", "KUW-003"))
+    assert [json.loads(line)["moh_code"] for line in streamed] == ["KUW-004", "KUW-005"]
+
+
+def test_list_drugs_rejects_garbage_cursor(catalog):
+    with pytest.raises(HTTPException) as excinfo:
+        _page(catalog, cursor="not-a-cursor")
+    assert excinfo.value.status_code == 400
+
+
+def test_stream_drugs_emits_ndjson(catalog):
+    lines = list(_stream_drugs(catalog.get_bind(), None))
+    rows = [json.loads(line) for line in lines]
+
+    assert [row["moh_code"] for row in rows] == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+    assert rows[0]["matched_drug"]["trade_name_en"] == "Panadol"
+
+
+def test_list_drugs_without_cursor_or_limit_returns_the_whole_catalog(catalog):
+    response = _list(catalog, Response(), limit=None)
+
+    assert response.media_type == "application/json"
+    assert NEXT_CURSOR_HEADER not in response.headers
+    paged = Response()
+    _list(catalog, paged, limit=DEFAULT_PAGE_SIZE)
+    assert response.headers["ETag"] != paged.headers["ETag"]
+    for fast in (False, True):
+        rows = json.loads(b"".join(_stream_drug_array(catalog.get_bind(), fast=fast)))
+        assert [row["moh_code"] for row in rows] == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+
+
+def test_list_drugs_answers_matching_etag_with_304(catalog):
+    response = Response()
+    _list(catalog, response)
+    etag = response.headers["ETag"]
+
+    result = _list(catalog, Response(), if_none_match=etag)
+
+    assert result.status_code == 304
+    assert result.headers["ETag"] == etag
+
+
+def test_catalog_etag_changes_when_a_master_is_updated(catalog):
+    first = get_drug(1, Response(), if_none_match=None, db=catalog, current_user=User())
+
+    master = catalog.query(DrugMaster).filter(DrugMaster.rx_cui == "161").one()
+    master.trade_name_en = "Panadol Advance"
+    catalog.commit()
+
+    result = get_drug(1, Response(), if_none_match=first.headers["ETag"], db=catalog, current_user=User())
+
+    assert json.loads(result.body)["matched_drug"]["trade_name_en"] == "Panadol Advance"
+    assert result.headers["ETag"] != first.headers["ETag"]
+
+
+def test_catalog_cache_serves_lookups_without_queries(catalog):
+    catalog_cache.get(catalog, 1)
+    statements = []
+    event.listen(catalog.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    visible = catalog_cache.get(catalog, 1)
+    unverified = catalog_cache.get(catalog, 2)
+    unknown = catalog_cache.get(catalog, 99)
+
+    assert statements == []
+    assert json.loads(visible.payload)["moh_code"] == "KUW-001"
+    assert unverified.visible is False
+    assert unknown is None
+    assert catalog_cache.stats()["misses"] == 1
+
+
+def test_catalog_cache_load_does_not_block_other_threads(catalog, monkeypatch):
+    serialize = catalog_cache_module._serialize
+    seen = []
+
+    def serialize_while_another_thread_reads(local):
+        if not seen:
+            reader = threading.Thread(target=lambda: seen.append(catalog_cache.stats()))
+            reader.start()
+            reader.join(timeout=5)
+        return serialize(local)
+
+    monkeypatch.setattr(catalog_cache_module, "_serialize", serialize_while_another_thread_reads)
+    loads = catalog_cache.stats()["loads"]
+    catalog_cache.get(catalog, 1)
+
+    # The reader ran mid-load and saw the empty cache instead of waiting for the load
+    assert [(stats["loads"], stats["entries"]) for stats in seen] == [(loads, 0)]
+    assert catalog_cache.stats()["loads"] == loads + 1
+
+
+def test_get_drug_rejects_ids_outside_the_cached_range(catalog):
+    get_drug(1, Response(), if_none_match=None, db=catalog, current_user=User())
+
+    for drug_id in (-5, -1, 0, 10_000):
+        assert catalog_cache.get(catalog, drug_id) is None
+        with pytest.raises(HTTPException) as excinfo:
+            get_drug(drug_id, Response(), if_none_match=None, db=catalog, current_user=User())
+        assert excinfo.value.status_code == 404
+
+
+def _changes(session, since=None, page=None, limit=100, response=None):
+    return list_drug_changes(
+        response or Response(), since=since, page=page, limit=limit, db=session, current_user=User()
+    )
+
+
+def test_drug_changes_reports_updates_and_tombstones(catalog):
+    snapshot = _changes(catalog)
+    assert sorted(drug.moh_code for drug in snapshot.added) == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+
+    master = catalog.query(DrugMaster).filter(DrugMaster.rx_cui == "161").one()
+    master.verified_status = "unverified"
+    catalog.add(DrugLocalKuwait(moh_code="KUW-006", trade_name_ar="ديكلوفيناك"))
+    catalog.commit()
+
+    changes = _changes(catalog, since=snapshot.cursor)
+
+    assert [drug.moh_code for drug in changes.added] == ["KUW-006"]
+    assert changes.updated == []
+    assert changes.removed == [1]
+
+    unchanged = _changes(catalog, since=changes.cursor)
+    assert (unchanged.added, unchanged.updated, unchanged.removed) == ([], [], [])
+
+
+def test_drug_changes_rereads_the_overlap_for_late_commits(catalog):
+    first = _changes(catalog, since=_changes(catalog).cursor)
+    latest = catalog.query(DrugLocalKuwait).order_by(DrugLocalKuwait.extracted_at.desc()).first()
+
+    # Stamped before rows the last delta already served, but committed only now
+    catalog.add(
+        DrugLocalKuwait(
+            moh_code="KUW-007", trade_name_ar="لوراتادين", extracted_at=latest.extracted_at - timedelta(seconds=1)
+        )
+    )
+    catalog.commit()
+
+    late = _changes(catalog, since=first.cursor)
+    assert [drug.moh_code for drug in late.added] == ["KUW-007"]
+    assert _changes(catalog, since=late.cursor).added == []
+
+
+def test_drug_changes_snapshot_is_paged_with_one_change_cursor(catalog):
+    codes, cursors, page = [], set(), None
+    while True:
+        response = Response()
+        snapshot = _changes(catalog, page=page, limit=1, response=response)
+        codes.extend(drug.moh_code for drug in snapshot.added)
+        cursors.add(snapshot.cursor)
+        page = response.headers.get(NEXT_CURSOR_HEADER)
+        if page is None:
+            break
+
+    assert codes == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+    assert len(cursors) == 1
+    with pytest.raises(HTTPException):
+        _changes(catalog, page="not-a-page")
+
+
+def test_catalog_export_round_trips_and_is_built_once_per_version(catalog, tmp_path):
+    export = ensure_catalog_export(catalog, tmp_path)
+    token, rows = decode_catalog(export.path.read_bytes())
+
+    assert token == export.version_token
+    assert [row["moh_code"] for row in rows] == ["KUW-001", "KUW-003", "KUW-004", "KUW-005"]
+    assert rows[0]["trade_name_en"] == "Panadol"
+    assert rows[3]["trade_name_ar"] is None and rows[3]["matched_drug_id"] is None
+
+    mtime = export.path.stat().st_mtime_ns
+    assert ensure_catalog_export(catalog, tmp_path).path.stat().st_mtime_ns == mtime
+
+
+def test_export_without_a_digest_is_rebuilt(catalog, tmp_path):
+    export = ensure_catalog_export(catalog, tmp_path)
+    export.path.with_suffix(".sha256").unlink()  # e.g. a crash between the two renames
+
+    rebuilt = ensure_catalog_export(catalog, tmp_path)
+
+    assert rebuilt.sha256 == export.sha256
+    assert sorted(path.name for path in tmp_path.iterdir()) == [export.path.name, export.path.with_suffix(".sha256").name]
+
+
+def _run(tasks):
+    # Inline rather than on the threadpool: every thread gets its own in-memory database
+    for task in tasks.tasks:
+        task.func(*task.args, **task.kwargs)
+
+
+def test_export_route_serves_the_last_build_while_the_next_one_runs(catalog, tmp_path, monkeypatch):
+    monkeypatch.setattr(drug_routes.settings, "catalog_export_dir", str(tmp_path))
+
+    def export(tasks):
+        return export_drugs(tasks, range_header=None, if_none_match=None, db=catalog, current_user=User())
+
+    tasks = BackgroundTasks()
+    with pytest.raises(HTTPException) as excinfo:
+        export(tasks)
+    assert excinfo.value.status_code == 503
+    _run(tasks)
+
+    first = export(BackgroundTasks())
+    catalog.add(DrugLocalKuwait(moh_code="KUW-006", trade_name_ar="ديكلوفيناك"))
+    catalog.commit()
+
+    tasks = BackgroundTasks()
+    stale = export(tasks)
+    assert stale.headers["ETag"] == first.headers["ETag"]
+    _run(tasks)
+
+    fresh = export(BackgroundTasks())
+    assert fresh.headers["X-Catalog-Version"] != first.headers["X-Catalog-Version"]
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+
+
+def test_fast_path_matches_model_serialization(catalog):
+    catalog.query(DrugLocalKuwait).filter(DrugLocalKuwait.moh_code == "KUW-003").update({"match_confidence": Decimal("0.875")})
+    catalog.commit()
+
+    expected = [
+        json.loads(DrugLocal.model_validate(drug, from_attributes=True).model_dump_json())
+        for drug in _list(catalog, Response(), limit=10)
+    ]
+    fast = list_drugs(
+        Response(),
+        cursor=None,
+        limit=10,
+        stream=False,
+        fast=True,
+        if_none_match=None,
+        db=catalog,
+        current_user=User(),
+    )
+
+    assert json.loads(fast.body) == expected
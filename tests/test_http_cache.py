@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("cachetools")
+
+import httpx
+
+from app.services import AsyncRxNormClient
+from app.services.http_cache import DAY, MemoryResponseCache, ResponseCache, SQLiteResponseCache, endpoint_ttl
+
+
+def _rxnorm_transport(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("/version"):
+            return httpx.Response(200, json={"version": {"rxnormVersion": "2024-03"}})
+        return httpx.Response(200, json={"idGroup": {"rxnormId": ["161"]}})
+
+    return httpx.MockTransport(handler)
+
+
+async def _lookup(cache, calls):
+    async with AsyncRxNormClient(transport=_rxnorm_transport(calls), response_cache=cache) as client:
+        return await client.find_rxcui_by_string("Panadol"), await client.get_rxnorm_version()
+
+
+def test_sqlite_cache_is_shared_between_client_instances(tmp_path):
+    calls = []
+    first_run = asyncio.run(_lookup(SQLiteResponseCache(tmp_path / "http.sqlite3"), calls))
+
+    # A new cache object on the same file stands in for the next day's run or another worker
+    cache = SQLiteResponseCache(tmp_path / "http.sqlite3")
+    second_run = asyncio.run(_lookup(cache, calls))
+
+    assert first_run == second_run
+    assert calls == ["/REST/rxcui", "/REST/version"]
+    assert cache.stats() == {"hits": 2, "misses": 0, "writes": 0, "evictions": 0, "entries": 2}
+
+
+def test_endpoint_ttls_outlive_the_default():
+    rules = AsyncRxNormClient.CACHE_TTLS
+    assert endpoint_ttl(rules, "/version", 3600) == 3 * DAY
+    assert endpoint_ttl(rules, "/rxcui/161/properties", 3600) == 7 * DAY
+    assert endpoint_ttl(rules, "/unknown", 3600) == 3600
+
+
+def test_caches_evict_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.http_cache.EVICTION_INTERVAL", 1)
+    for cache in (MemoryResponseCache(max_entries=2), SQLiteResponseCache(tmp_path / "lru.sqlite3", max_entries=2)):
+        cache.set("a", {"value": 1}, ttl=60)
+        cache.set("b", {"value": 2}, ttl=60)
+        assert cache.get("a") == {"value": 1}
+        cache.set("c", {"value": 3}, ttl=60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"value": 1}
+        assert cache.stats()["evictions"] == 1
+
+        cache.set("expired", {"value": 4}, ttl=-1)
+        assert cache.get("expired") is None
+
+
+def test_incomplete_cache_implementations_fail_at_construction():
+    class GetOnlyCache(ResponseCache):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        GetOnlyCache()
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+import httpx
+
+from app.services.http_resilience import (
+    AsyncResilientTransport,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientTransport,
+    RetryPolicy,
+    TokenBucket,
+)
+
+
+def _scripted(statuses, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        status, headers = statuses.pop(0)
+        return httpx.Response(status, headers=headers, json={})
+
+    return handler
+
+
+def _transport(handler, sleeps, **kwargs):
+    return ResilientTransport(
+        "test",
+        inner=httpx.MockTransport(handler),
+        bucket=kwargs.pop("bucket", TokenBucket(rate=1000.0, capacity=1000)),
+        breaker=kwargs.pop("breaker", CircuitBreaker()),
+        retry=RetryPolicy(max_attempts=3, backoff_base=0.5),
+        sleep=sleeps.append,
+        **kwargs,
+    )
+
+
+def test_server_errors_are_retried_with_jittered_backoff():
+    calls, sleeps = [], []
+    handler = _scripted([(503, {}), (502, {}), (200, {})], calls)
+    with httpx.Client(transport=_transport(handler, sleeps)) as client:
+        assert client.get("https://example.test/x").status_code == 200
+
+    assert calls == ["GET", "GET", "GET"]
+    assert len(sleeps) == 2 and 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+
+
+def test_non_idempotent_requests_are_not_retried():
+    calls, sleeps = [], []
+    handler = _scripted([(503, {}), (200, {})], calls)
+    with httpx.Client(transport=_transport(handler, sleeps)) as client:
+        assert client.post("https://example.test/x").status_code == 503
+    assert calls == ["POST"]
+
+
+def test_retry_after_pauses_the_shared_bucket():
+    calls, sleeps = [], []
+    bucket = TokenBucket(rate=10.0, capacity=10)
+    handler = _scripted([(429, {"Retry-After": "2"}), (200, {})], calls)
+    with httpx.Client(transport=_transport(handler, sleeps, bucket=bucket)) as client:
+        assert client.get("https://example.test/x").status_code == 200
+
+    # The retry waited on the bucket, not on a separate backoff
+    assert sleeps[0] == 0.0 and sleeps[1] == pytest.approx(2.1, abs=0.05)
+
+
+def test_long_retry_after_is_honoured_in_full_and_not_retried():
+    calls, sleeps = [], []
+    bucket = TokenBucket(rate=10.0, capacity=10)
+    handler = _scripted([(429, {"Retry-After": "300"}), (200, {})], calls)
+    with httpx.Client(transport=_transport(handler, sleeps, bucket=bucket)) as client:
+        assert client.get("https://example.test/x").status_code == 429
+
+    assert calls == ["GET"]
+    # Nobody calls the throttling upstream again before it asked
+    assert bucket.reserve() == pytest.approx(300.1, abs=0.05)
+
+
+def test_circuit_opens_after_repeated_failures_and_probes_after_timeout():
+    calls, sleeps = [], []
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+    handler = _scripted([(503, {})] * 3, calls)
+    with httpx.Client(transport=_transport(handler, sleeps, breaker=breaker)) as client:
+        assert client.get("https://example.test/x").status_code == 503
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            client.get("https://example.test/x")
+    assert len(calls) == 3
+
+    breaker.reset_timeout = 0.0
+    assert breaker.state == "half-open"
+    breaker.before_request("test")
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request("test")  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_async_transport_retries_connection_errors():
+    attempts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    async def no_sleep(_):
+        return None
+
+    async def run():
+        transport = AsyncResilientTransport(
+            "test",
+            inner=httpx.MockTransport(handler),
+            bucket=TokenBucket(rate=1000.0, capacity=1000),
+            breaker=CircuitBreaker(),
+            sleep=no_sleep,
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            return (await client.get("https://example.test/y")).json()
+
+    assert asyncio.run(run()) == {"ok": True}
+    assert attempts == ["/y", "/y"]
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    hang = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if not hang:
+            hang.append(request.url.path)
+            await asyncio.Event().wait()
+        return httpx.Response(200, json={})
+
+    async def no_sleep(_):
+        return None
+
+    async def run():
+        transport = AsyncResilientTransport(
+            "test",
+            inner=httpx.MockTransport(handler),
+            bucket=TokenBucket(rate=1000.0, capacity=1000),
+            breaker=breaker,
+            sleep=no_sleep,
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            probe = asyncio.create_task(client.get("https://example.test/probe"))
+            while not hang:
+                await asyncio.sleep(0)
+            assert breaker.state == "half-open"
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            # The abandoned probe leaves the breaker open, ready for the next probe
+            return (await client.get("https://example.test/next")).status_code
+
+    assert asyncio.run(run()) == 200
+    assert breaker.state == "closed"
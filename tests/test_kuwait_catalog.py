@@ -0,0 +1,97 @@
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.services.kuwait_catalog import iter_catalog_records, load_kuwait_catalog
+
+CATALOG = """﻿رقم الصنف,Trade Name (AR),Generic Name,Strength,Dosage Form,Notes
+KUW-001,باراسيتامول 500 مجم,Paracetamol,500mg,Tablet,unchanged
+KUW-002, أموكسيسيلين  250 مجم ,Amoxicillin,500mg,Capsule,strength changed
+KUW-004,بروفين,Ibuprofen,400mg,Tablet,new
+,بدون رمز,Nothing,,,no code
+KUW-004,بروفين مكرر,Ibuprofen,200mg,Tablet,repeat
+KUW-005,فنتولين,Salbutamol,100mcg,Inhaler,new
+"""
+
+
+@pytest.fixture()
+def existing(session):
+    session.add(DrugMaster(id=1, rx_cui="723", trade_name_en="Amoxil"))
+    session.add_all(
+        [
+            DrugLocalKuwait(
+                moh_code="KUW-001",
+                trade_name_ar="باراسيتامول 500 مجم",
+                generic_name="Paracetamol",
+                strength="500mg",
+                dosage_form="Tablet",
+            ),
+            DrugLocalKuwait(
+                moh_code="KUW-002",
+                trade_name_ar="أموكسيسيلين 250 مجم",
+                generic_name="Amoxicillin",
+                strength="250mg",
+                dosage_form="Capsule",
+                matched_drug_id=1,
+            ),
+        ]
+    )
+    session.commit()
+
+
+def test_csv_rows_are_diffed_by_moh_code(session, existing, tmp_path):
+    path = tmp_path / "moh_catalog.csv"
+    path.write_text(CATALOG, encoding="utf-8")
+
+    stats = load_kuwait_catalog(session, path, batch_size=2)
+
+    assert (stats.rows, stats.new, stats.changed, stats.unchanged, stats.skipped, stats.duplicates) == (6, 2, 1, 1, 1, 1)
+    drugs = {drug.moh_code: drug for drug in session.query(DrugLocalKuwait)}
+    assert sorted(drugs) == ["KUW-001", "KUW-002", "KUW-004", "KUW-005"]
+    changed = drugs["KUW-002"]
+    # Whitespace is normalized, the match survives and the row is marked as re-extracted
+    assert (changed.trade_name_ar, changed.strength, changed.matched_drug_id) == ("أموكسيسيلين 250 مجم", "500mg", 1)
+    assert changed.source_file == "moh_catalog.csv"
+    assert drugs["KUW-001"].source_file is None
+    assert drugs["KUW-004"].trade_name_ar == "بروفين"
+
+    again = load_kuwait_catalog(session, path)
+    assert (again.new, again.changed, again.unchanged) == (0, 0, 4)
+
+
+def test_headers_must_include_a_code_column(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("Name,Strength\nPanadol,500mg\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="No MOH code column"):
+        list(iter_catalog_records(path))
+    with pytest.raises(ValueError, match="Unsupported"):
+        iter_catalog_records(tmp_path / "catalog.pdf")
+
+
+def test_xlsx_exports_stream_from_the_first_sheet(session, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Catalog")
+    sheet.append([None, None])
+    sheet.append(["MOH Code", "الاسم التجاري", "الاسم العلمي", "التركيز", "الشكل الصيدلاني"])
+    sheet.append([1001.0, "بانادول", "Paracetamol", "500 mg", "Tablet"])
+    sheet.append(["KUW-1002", "بروفين", "Ibuprofen", None, "Tablet"])
+    path = tmp_path / "catalog.xlsx"
+    workbook.save(path)
+
+    stats = load_kuwait_catalog(session, path)
+
+    assert (stats.rows, stats.new) == (2, 2)
+    first = session.query(DrugLocalKuwait).filter(DrugLocalKuwait.moh_code == "1001").one()
+    assert (first.generic_name, first.strength) == ("Paracetamol", "500 mg")
+
+
+def test_xlsx_without_openpyxl_fails_before_loading(session, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "openpyxl", None)
+
+    with pytest.raises(RuntimeError, match="requires openpyxl"):
+        load_kuwait_catalog(session, tmp_path / "catalog.xlsx")
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("celery")
+
+import httpx
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.sync import DrugLookupAttempt
+from app.services.name_resolution import NameResolver, english_query
+from jobs.daily_sync import sync_local_drugs
+
+
+def _matched(session):
+    panadol = DrugMaster(id=1, rx_cui="161", trade_name_en="Panadol", generic_name="Acetaminophen")
+    brufen = DrugMaster(id=2, rx_cui="5640", trade_name_en="Brufen", generic_name="Ibuprofen")
+    session.add_all([panadol, brufen])
+    session.add_all(
+        [
+            DrugLocalKuwait(id=1, moh_code="KUW-1", trade_name_ar="بانادول", generic_name="باراسيتامول", matched_drug_id=1),
+            DrugLocalKuwait(id=2, moh_code="KUW-2", trade_name_ar="بانادول", matched_drug_id=1),
+            # One pharmacist linked the name elsewhere; the majority still wins
+            DrugLocalKuwait(id=3, moh_code="KUW-3", trade_name_ar="بانادول", matched_drug_id=2),
+        ]
+    )
+    session.commit()
+
+
+def test_english_query_strips_strength_and_dosage_form():
+    assert english_query("Panadol Extra 500 mg Film Coated Tablets") == "panadol extra"
+    assert english_query("Amoxicillin 250mg/5ml Suspension") == "amoxicillin"
+    assert english_query("بانادول") is None
+    assert english_query("500 mg") is None
+    assert english_query(None) is None
+
+
+def test_dictionary_learned_from_matched_pairs(session):
+    _matched(session)
+    resolver = NameResolver.from_session(session)
+
+    assert resolver.dictionary == {"بانادول": "panadol", "باراسيتامول": "acetaminophen"}
+    # Arabic spelling variants and dosage-form words fold onto the learned key
+    assert resolver.query_name(DrugLocalKuwait(trade_name_ar="بانادول أقراص")) == "panadol"
+    assert resolver.query_name(DrugLocalKuwait(trade_name_ar="دواء جديد", generic_name="باراسيتامول 500 ملجم")) == "acetaminophen"
+    # A Latin name on the row beats a translation
+    assert resolver.query_name(DrugLocalKuwait(trade_name_ar="Panadol Night", generic_name="باراسيتامول")) == "panadol night"
+    assert resolver.query_name(DrugLocalKuwait(trade_name_ar="دواء جديد")) is None
+
+
+def test_sync_spends_no_requests_on_names_without_an_english_query(session):
+    _matched(session)
+    session.add_all(
+        [
+            DrugLocalKuwait(id=10, moh_code="KUW-10", trade_name_ar="بانادول شراب"),
+            DrugLocalKuwait(id=11, moh_code="KUW-11", trade_name_ar="دواء جديد"),
+        ]
+    )
+    session.commit()
+    names = []
+
+    def upstreams(request):
+        if request.url.path.endswith("/rxcui"):
+            names.append(request.url.params["name"])
+            return httpx.Response(200, json={"idGroup": {"rxnormId": ["161"]}})
+        if request.url.path.endswith("/properties"):
+            return httpx.Response(200, json={"properties": {"rxcui": "161", "name": "Panadol"}})
+        return httpx.Response(404)
+
+    pending = session.query(DrugLocalKuwait).filter(DrugLocalKuwait.id.in_([10, 11])).all()
+    assert sync_local_drugs(session, pending, transport=httpx.MockTransport(upstreams)) == 1
+    session.commit()
+
+    assert names == ["panadol"]
+    assert session.get(DrugLocalKuwait, 10).matched_drug_id == 1
+    skipped = session.get(DrugLookupAttempt, 11)
+    assert (skipped.outcome, skipped.name, skipped.attempts) == ("no_english_name", "دواء جديد", 1)
@@ -0,0 +1,118 @@
+import asyncio
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+import httpx
+
+from app.models.openfda import OpenFDAKey, OpenFDARecord
+from app.services import AsyncOpenFDAClient
+from app.services.openfda_local import (
+    AsyncLocalOpenFDAResolver,
+    LocalOpenFDAResolver,
+    iter_json_array,
+    load_openfda_bulk,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "openfda"
+
+
+def _zipped(tmp_path, *names):
+    """Zip each fixture the way openFDA ships its partitions: one JSON document per archive."""
+
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.zip"
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(FIXTURES / name, arcname=name)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture()
+def resolver(session, tmp_path):
+    files = _zipped(
+        tmp_path,
+        "drug-label-0001-of-0001.json",
+        "drug-ndc-0001-of-0001.json",
+        "drug-enforcement-0001-of-0001.json",
+    )
+    stats = load_openfda_bulk(session, files, read_size=64)
+    assert [(item.endpoint, item.last_updated, item.records) for item in stats] == [
+        ("label", "2024-03-01", 3),
+        ("ndc", "2024-03-02", 2),
+        ("enforcement", "2024-03-03", 2),
+    ]
+    return LocalOpenFDAResolver(session)
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 1 << 20])
+def test_stream_decoder_matches_json_load(read_size):
+    text = (FIXTURES / "drug-label-0001-of-0001.json").read_text()
+    meta = {}
+
+    records = list(iter_json_array(io.StringIO(text), meta=meta, read_size=read_size))
+
+    expected = json.loads(text)
+    assert records == expected["results"]
+    # meta carries its own "results" member, which must not be mistaken for the records
+    assert meta == {"meta": expected["meta"]}
+    assert list(iter_json_array(io.StringIO('{"meta": {}, "results": []}'))) == []
+    assert list(iter_json_array(io.StringIO('{"results": [1, 22, 333]}'), read_size=2)) == [1, 22, 333]
+
+
+def test_lookups_by_brand_generic_and_ndc(resolver):
+    labels = resolver.get_drug_label("  panadol ")["results"]
+    # Newest label first, like the API's best match
+    assert [label["id"] for label in labels] == ["label-panadol-2023", "label-panadol-2019"]
+    assert resolver.get_drug_label("Ibuprofen", limit=1)["results"][0]["id"] == "label-brufen"
+    assert resolver.get_drug_label("unknown") == {"results": []}
+
+    assert resolver.get_ndc("ACETAMINOPHEN")["results"][0]["labeler_name"] == "Haleon"
+    assert resolver.get_by_product_ndc("ndc", "0002-0001")["results"][0]["brand_name"] == "Brufen"
+    assert resolver.get_by_product_ndc("label", "0001-0001")["results"][0]["id"] == "label-panadol-2019"
+
+    recalls = resolver.get_drug_enforcement("Ibuprofen")["results"]
+    assert [recall["recall_number"] for recall in recalls] == ["D-0202-2023", "D-0101-2021"]
+    assert [r["recall_number"] for r in resolver.get_drug_enforcement("brufen tablets")["results"]] == ["D-0101-2021"]
+
+    provenance = resolver.safe_label_lookup("Panadol")
+    assert provenance.source == "openfda"
+    assert json.loads(provenance.notes)["warnings"] == ["Liver warning"]
+    assert json.loads(resolver.safe_enforcement_lookup("Brufen").notes)["recall_number"] == "D-0101-2021"
+    assert resolver.safe_ndc_lookup("unknown") is None
+
+
+def test_reloading_an_endpoint_replaces_only_its_records(resolver, session, tmp_path):
+    load_openfda_bulk(session, _zipped(tmp_path, "drug-ndc-0001-of-0001.json"))
+
+    assert session.query(OpenFDARecord).filter(OpenFDARecord.endpoint == "ndc").count() == 2
+    assert session.query(OpenFDARecord).count() == 7
+    orphaned = session.query(OpenFDAKey).filter(~OpenFDAKey.record_id.in_(session.query(OpenFDARecord.id))).count()
+    assert orphaned == 0
+
+
+def test_async_facade_falls_back_to_the_api_for_unloaded_endpoints(session, tmp_path):
+    load_openfda_bulk(session, _zipped(tmp_path, "drug-label-0001-of-0001.json"))
+    requested = []
+
+    def api(request):
+        requested.append(request.url.path)
+        return httpx.Response(200, json={"results": [{"product_ndc": "9999-0001"}]})
+
+    async def lookups():
+        fallback = AsyncOpenFDAClient(transport=httpx.MockTransport(api))
+        async with AsyncLocalOpenFDAResolver(LocalOpenFDAResolver(session), fallback) as client:
+            return await client.safe_label_lookup("Brufen"), await client.safe_ndc_lookup("Brufen")
+
+    label, ndc = asyncio.run(lookups())
+
+    assert json.loads(label.notes)["id"] == "label-brufen"
+    assert json.loads(ndc.notes)["ndc"] == "9999-0001"
+    assert requested == ["/drug/ndc.json"]
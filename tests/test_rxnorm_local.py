@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+import httpx
+
+from app.models.rxnorm import RxNormName
+from app.services.rxnorm_local import LocalRxNormResolver, load_rxnorm_release
+
+RELEASE = Path(__file__).parent / "fixtures" / "rxnorm_release" / "rrf"
+
+
+@pytest.fixture()
+def resolver(session):
+    stats = load_rxnorm_release(session, RELEASE)
+    assert (stats.version, stats.concepts, stats.names, stats.attributes, stats.relations) == (
+        "rxnorm_release",
+        5,
+        7,
+        3,
+        4,
+    )
+    return LocalRxNormResolver(session)
+
+
+def test_name_lookup_matches_rxnav_shape(resolver):
+    assert resolver.find_rxcui_by_string("  ACETAMINOPHEN ") == {
+        "idGroup": {"name": "  ACETAMINOPHEN ", "rxnormId": ["161"]}
+    }
+    # The active brand concept wins over the obsolete one sharing its name
+    assert LocalRxNormResolver.extract_first_rxcui(resolver.find_rxcui_by_string("tylenol")) == "202433"
+    assert resolver.find_rxcui_by_string("unknown") == {"idGroup": {"name": "unknown"}}
+
+
+def test_properties_and_normalization(resolver):
+    properties = resolver.get_rx_concept_properties("161")
+    assert properties["properties"]["name"] == "acetaminophen"
+    assert properties["properties"]["synonym"] == "APAP"
+    assert properties["properties"]["tty"] == "IN"
+
+    drug = resolver.normalize_properties_to_drug(resolver.get_rx_concept_properties("313782"))
+    assert (drug.rx_cui, drug.trade_name_en, drug.source_version) == (
+        "313782",
+        "acetaminophen 325 MG Oral Tablet",
+        "rxnorm_release",
+    )
+    assert resolver.get_rx_concept_properties("000") == {}
+
+
+def test_attributes_and_relations(resolver):
+    assert resolver.get_ndcs("313782")["ndcGroup"]["ndcList"]["ndc"] == ["00904198861"]
+    related = resolver.get_related_by_type("313782", "IN SBD")["relatedGroup"]["conceptGroup"]
+    assert [[c["rxcui"] for c in group["conceptProperties"]] for group in related] == [["161"], ["209387"]]
+
+
+def test_reload_replaces_previous_release(resolver, session):
+    load_rxnorm_release(session, RELEASE, version="2024-04")
+    assert session.query(RxNormName).count() == 7
+    assert resolver.get_rxnorm_version() == {"version": {"rxnormVersion": "2024-04"}}
+
+
+def test_sync_pipeline_uses_local_release(resolver):
+    pytest.importorskip("celery")
+    from jobs.daily_sync import lookup_external_sources
+
+    def offline(request):
+        if "rxnav" in request.url.host:
+            raise AssertionError("RxNav must not be called when a release is loaded")
+        return httpx.Response(404)
+
+    lookups = asyncio.run(
+        lookup_external_sources([(1, "acetaminophen")], transport=httpx.MockTransport(offline), rxnorm=resolver)
+    )
+    assert [lookup.master.rx_cui for lookup in lookups] == ["161"]
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("celery")
+
+import httpx
+
+from app.models.drug import DrugLocalKuwait
+from app.services.http_cache import MemoryResponseCache
+from app.services.sync_metrics import Histogram, SyncMetrics, collect, endpoint_label, write_textfile
+from jobs import daily_sync
+from jobs.daily_sync import apply_external_lookups, lookup_external_sources
+
+
+def upstreams(request):
+    path = request.url.path
+    if path.endswith("/rxcui"):
+        return httpx.Response(200, json={"idGroup": {"rxnormId": ["161"]}})
+    if path.endswith("/properties"):
+        return httpx.Response(200, json={"properties": {"rxcui": "161", "name": "Panadol"}})
+    if path.endswith("/version"):
+        return httpx.Response(200, json={"version": {"rxnormVersion": "2024-03"}})
+    if "api.fda.gov" == request.url.host and path.endswith("/enforcement.json"):
+        return httpx.Response(404, json={"error": {"code": "NOT_FOUND"}})
+    return httpx.Response(200, json={"data": [], "results": [{"id": "fda-1"}]})
+
+
+def test_endpoint_labels_collapse_identifiers():
+    assert endpoint_label("/rxcui/161/properties") == "/rxcui/{id}/properties"
+    assert endpoint_label("/spls/0b0be196-0c62-461c-94f4-9a35339b4501.json") == "/spls/{id}.json"
+    assert endpoint_label("/label.json") == "/label.json"
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.95) == 3.0
+    assert histogram.summary()["count"] == 4
+
+
+def test_sync_run_records_requests_cache_and_db_time(session, tmp_path):
+    session.add_all(DrugLocalKuwait(id=index, moh_code=f"KUW-{index}") for index in (1, 2))
+    session.commit()
+    cache = MemoryResponseCache()
+
+    async def run_twice():
+        transport = httpx.MockTransport(upstreams)
+        await lookup_external_sources([(1, "panadol")], transport=transport, response_cache=cache)
+        return await lookup_external_sources([(2, "panadol")], transport=transport, response_cache=cache)
+
+    with collect() as metrics:
+        lookups = asyncio.run(run_twice())
+        apply_external_lookups(session, lookups)
+        metrics.finish(drugs=2, synced=1)
+    summary = metrics.summary()
+
+    rxnorm = summary["requests"]["rxnorm"]
+    assert rxnorm["/rxcui"]["count"] == 1 and rxnorm["/rxcui"]["statuses"] == {"200": 1}
+    assert set(rxnorm) == {"/rxcui", "/rxcui/{id}/properties", "/version"}
+    assert summary["requests"]["openfda"]["/enforcement.json"]["statuses"] == {"404": 2}
+    # The second run is served entirely from the persistent cache, except the 404 that is never stored
+    assert summary["cache"]["rxnorm"]["persistent"] == {"hit": 3, "miss": 3, "hit_rate": 0.5}
+    assert summary["cache"]["openfda"]["persistent"]["miss"] == 4
+    assert summary["db"]["flush"]["count"] == 1
+    assert (summary["drugs"], summary["synced"]) == (2, 1)
+    assert summary["drugs_per_second"] > 0
+
+    path = tmp_path / "metrics" / "sync.prom"
+    write_textfile(metrics, path)
+    text = path.read_text()
+    assert '# TYPE moh_sync_request_duration_seconds histogram' in text
+    assert 'moh_sync_request_duration_seconds_count{upstream="rxnorm",endpoint="/rxcui"} 1' in text
+    assert 'moh_sync_requests_total{upstream="openfda",endpoint="/enforcement.json",status="404"} 2' in text
+    assert 'moh_sync_cache_lookups_total{upstream="rxnorm",layer="persistent",result="hit"} 3' in text
+    assert "moh_sync_last_run_drugs 2" in text
+    assert list(tmp_path.joinpath("metrics").iterdir()) == [path]
+
+
+def test_lookup_time_leaves_out_queueing_behind_other_names(monkeypatch):
+    for name in ("rxnorm", "dailymed", "openfda"):
+        monkeypatch.setattr(daily_sync.settings, f"{name}_max_concurrency", 1)
+
+    async def slow_upstreams(request):
+        await asyncio.sleep(0.01)
+        return upstreams(request)
+
+    candidates = [(index, f"drug{index}") for index in range(20)]
+    with collect() as metrics:
+        asyncio.run(lookup_external_sources(candidates, transport=httpx.MockTransport(slow_upstreams)))
+        metrics.finish(drugs=20, synced=0)
+    lookups = metrics.summary()["lookups"]
+
+    # Each name queues behind the other 19 for every request, but only its own requests count
+    assert lookups["count"] == 20
+    assert lookups["p99_seconds"] < metrics.duration / 4
+
+
+def test_nothing_is_recorded_outside_a_run():
+    metrics = SyncMetrics()
+    asyncio.run(lookup_external_sources([(1, "panadol")], transport=httpx.MockTransport(upstreams)))
+
+    assert metrics.summary()["requests"] == {}
+
+
+def test_metrics_route_serves_the_last_run(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    from app import main
+
+    metrics = SyncMetrics()
+    metrics.finish(drugs=3, synced=2)
+    path = tmp_path / "sync.prom"
+    monkeypatch.setattr(main.settings, "sync_metrics_path", str(path))
+
+    assert main.sync_metrics().body == b""
+    write_textfile(metrics, path)
+    response = main.sync_metrics()
+    assert response.media_type.startswith("text/plain; version=0.0.4")
+    assert b"moh_sync_last_run_synced 2" in response.body
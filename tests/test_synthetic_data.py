@@ -0,0 +1,60 @@
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("passlib")
+
+from sqlalchemy import select
+
+from app.models.drug import DrugLocalKuwait, DrugMaster
+from app.models.patient import Patient
+from app.models.provenance import Provenance
+from app.models.schedule import DoseLog, DrugSchedule
+from app.models.user import User
+from benchmarks.synthetic_data import SyntheticCounts, generate
+
+COUNTS = SyntheticCounts(users=20, patients=30, masters=40, locals=200, schedules=300, dose_logs=3000, provenance=50)
+
+
+def _dump(session, model):
+    table = model.__table__
+    return session.execute(select(table).order_by(table.c.id)).all()
+
+
+def test_same_seed_same_rows(make_session):
+    first, second, other = make_session(), make_session(), make_session()
+    generate(first, COUNTS, seed=1)
+    generate(second, COUNTS, seed=1)
+    generate(other, COUNTS, seed=2)
+
+    for model in (Patient, DrugMaster, DrugLocalKuwait, DrugSchedule, DoseLog, Provenance):
+        assert _dump(first, model) == _dump(second, model)
+    assert _dump(first, DoseLog) != _dump(other, DoseLog)
+    # Only the bcrypt salt differs between runs
+    assert [user.email for user in first.query(User)] == [user.email for user in second.query(User)]
+
+
+def test_rows_are_appended_with_valid_references_and_skew(session):
+    assert generate(session, COUNTS, seed=3) == {
+        "users": 20,
+        "patients": 30,
+        "masters": 40,
+        "locals": 200,
+        "schedules": 300,
+        "dose_logs": 3000,
+        "provenance": 50,
+    }
+    generate(session, SyntheticCounts(users=1, patients=1, masters=1, locals=1, schedules=1, dose_logs=1, provenance=1))
+
+    assert session.query(DoseLog).count() == 3001
+    assert session.query(DoseLog).filter(~DoseLog.schedule_id.in_(select(DrugSchedule.id))).count() == 0
+    assert session.query(DrugSchedule).filter(~DrugSchedule.drug_id.in_(select(DrugLocalKuwait.id))).count() == 0
+    matched = session.query(DrugLocalKuwait).filter(DrugLocalKuwait.matched_drug_id.isnot(None)).count()
+    assert 0.4 < matched / 201 < 0.8
+
+    per_drug = Counter(drug_id for (drug_id,) in session.query(DrugSchedule.drug_id))
+    (_, top_count), *_ = per_drug.most_common(1)
+    assert top_count > 10 * sorted(per_drug.values())[len(per_drug) // 2]
+    names = [name for (name,) in session.query(DrugLocalKuwait.trade_name_ar) if name]
+    assert any("؀" <= char <= "ۿ" for char in names[0])
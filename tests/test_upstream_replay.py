@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("celery")
+
+import httpx
+
+from benchmarks.bench_sync_throughput import run_benchmark
+from benchmarks.upstream_replay import Cassette, RecordingTransport, ReplayTransport, UpstreamRouter
+
+
+async def _no_sleep(seconds):
+    return None
+
+
+def _get(transport, url):
+    async def fetch():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(url)
+
+    return asyncio.run(fetch())
+
+
+def test_recorded_answers_replay_and_unrecorded_ones_are_synthesized(tmp_path):
+    def live(request):
+        return httpx.Response(200, json={"idGroup": {"rxnormId": ["161"]}})
+
+    recorder = RecordingTransport(httpx.MockTransport(live))
+    _get(recorder, "https://rxnav.nlm.nih.gov/REST/rxcui?name=panadol&search=2")
+    path = tmp_path / "cassette.json"
+    recorder.cassette.save(path)
+
+    replay = ReplayTransport(Cassette.load(path))
+    # Query order does not matter to the cassette key
+    recorded = _get(replay, "https://rxnav.nlm.nih.gov/REST/rxcui?search=2&name=panadol")
+    synthetic = _get(replay, "https://rxnav.nlm.nih.gov/REST/rxcui?name=brufen")
+    unknown = _get(replay, "https://rxnav.nlm.nih.gov/REST/rxcui?name=unknown%20tablet")
+
+    assert recorded.json() == {"idGroup": {"rxnormId": ["161"]}}
+    assert replay.replayed == 1
+    again = _get(replay, "https://rxnav.nlm.nih.gov/REST/rxcui?name=Brufen")
+    assert synthetic.json()["idGroup"]["rxnormId"] == again.json()["idGroup"]["rxnormId"] != []
+    assert unknown.json()["idGroup"]["rxnormId"] == []
+
+
+def test_injected_faults_are_reproducible_and_retried():
+    throttled = ReplayTransport(throttle_rate=1.0, retry_after=2.5, sleep=_no_sleep)
+    response = _get(throttled, "https://api.fda.gov/drug/label.json")
+    assert (response.status_code, response.headers["Retry-After"]) == (429, "2.5")
+
+    def statuses(seed):
+        replay = ReplayTransport(error_rate=0.3, throttle_rate=0.2, seed=seed, sleep=_no_sleep)
+        return [_get(replay, "https://api.fda.gov/drug/ndc.json").status_code for _ in range(20)]
+
+    assert statuses(3) == statuses(3)
+    assert {429, 503, 200} <= set(statuses(3))
+
+    # Behind the production resilience layer every fault is retried away
+    flaky = ReplayTransport(error_rate=0.1, throttle_rate=0.1, seed=3, sleep=_no_sleep)
+    router = UpstreamRouter(flaky, rate_limited=False, sleep=_no_sleep)
+    assert all(_get(router, "https://api.fda.gov/drug/ndc.json").status_code == 200 for _ in range(10))
+    assert flaky.statuses[200] == 10 and flaky.statuses[429] + flaky.statuses[503] > 0
+
+
+def test_benchmark_reports_throughput_latency_and_db_time():
+    summary = run_benchmark(drugs=40, distinct=10, unknown_rate=0.2, latency=0.0, jitter=0.0, sleep=_no_sleep)
+
+    # Rows sharing a name are looked up once; every fifth row carries a name unknown to RxNorm
+    assert (summary["drugs"], summary["synced"]) == (40, 32)
+    assert summary["lookups"]["count"] == 10
+    assert summary["lookups"]["p99_seconds"] >= summary["lookups"]["p50_seconds"] > 0
+    assert summary["drugs_per_second"] > 0
+    assert set(summary["db"]) == {"commit", "flush"}
+    assert summary["requests"]["rxnorm"]["/rxcui"]["count"] == 10
+    assert summary["upstream_statuses"]["404"] == 8